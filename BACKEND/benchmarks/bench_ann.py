@@ -0,0 +1,150 @@
+# backend/benchmarks/bench_ann.py
+#
+# Recall-vs-latency benchmark for the index types in rag/index_factory.py,
+# on synthetic clustered corpora (real embeddings are clustered by topic,
+# uniform random vectors would make every ANN index look bad).
+#
+# Also compares compact storage: VECTOR_ENCODING (float32 / float16 / int8)
+# and EMBEDDING_DIM (vectors cut to their leading dimensions and renormalized,
+# as the embedding model does; the corpus then gets a decaying spectrum, see
+# make_corpus). Recall is always measured against exact float32 search at the
+# full dimension. RAM is how much the process grew while building the index
+# (rough: memory freed by earlier rows gets reused).
+#
+# Run from the backend folder:
+#   python benchmarks/bench_ann.py --sizes 10000,100000
+#   python benchmarks/bench_ann.py --sizes 100000 --types flat,hnsw --encodings float32,float16,int8 --dims 768,256
+#   python benchmarks/bench_ann.py --sizes 1000000 --dim 256   (1M x 768 floats needs ~3 GB)
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import faiss
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag import index_factory
+
+# Search-time settings swept for each index type
+SWEEPS = {
+    "flat": [None],
+    "hnsw": [16, 32, 64, 128],        # efSearch
+    "ivf_flat": [1, 4, 16, 64],       # nprobe
+    "ivf_pq": [1, 4, 16, 64],         # nprobe
+}
+
+
+def make_corpus(n, dim, n_queries, seed=0, decay=0.0):
+    """
+    Gaussian clusters around random topic centres, normalized like real embeddings.
+    decay > 0 scales dimension i by (i + 1) ** -decay, so the leading
+    dimensions carry most of the signal, as in embeddings trained to be cut
+    short (Matryoshka); without it, reduced dimensions would just lose recall.
+    """
+    rng = np.random.default_rng(seed)
+    n_clusters = max(10, n // 1000)
+    centres = rng.standard_normal((n_clusters, dim)).astype("float32")
+    labels = rng.integers(0, n_clusters, n + n_queries)
+    data = centres[labels] + 0.6 * rng.standard_normal((n + n_queries, dim)).astype("float32")
+    if decay:
+        data *= (np.arange(1, dim + 1, dtype="float32") ** -decay)
+    faiss.normalize_L2(data)
+    return data[:n], data[n:]
+
+
+def recall_at_k(found, truth, k):
+    hits = sum(len(set(f[:k]) & set(t[:k])) for f, t in zip(found, truth))
+    return hits / (len(truth) * k)
+
+
+def rss_mb():
+    """Resident memory of this process in MB (Linux), or None."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        return None
+
+
+def reduce_dims(vectors, dim):
+    """The leading `dim` dimensions, renormalized (what the embedding model returns for a smaller EMBEDDING_DIM)."""
+    return index_factory.normalize(vectors[:, :dim])
+
+
+def time_queries(index, queries, k):
+    """Latency of one query at a time, like the chat endpoint does it."""
+    latencies = []
+    results = []
+    for q in queries:
+        started = time.perf_counter()
+        _, ids = index.search(q.reshape(1, -1), k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        results.append(ids[0])
+    return np.array(results), np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ANN index types: recall@k vs latency.")
+    parser.add_argument("--sizes", default="10000,100000", help="Comma-separated corpus sizes")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--types", default=",".join(index_factory.INDEX_TYPES))
+    parser.add_argument("--encodings", default="float32", help=f"Comma-separated, from {tuple(index_factory.ENCODINGS)}")
+    parser.add_argument("--dims", default="", help="Comma-separated reduced dimensions to try (default: only --dim)")
+    parser.add_argument("--decay", type=float, default=None, help="Spectrum decay of the corpus (default: 0, or 0.5 with --dims)")
+    args = parser.parse_args()
+
+    encodings = [index_factory.check_encoding(encoding) for encoding in args.encodings.split(",")]
+    dims = [int(dim) for dim in args.dims.split(",")] if args.dims else [args.dim]
+    decay = args.decay if args.decay is not None else (0.5 if args.dims else 0.0)
+    rows = []
+    for n in [int(size) for size in args.sizes.split(",")]:
+        print(f"\n--- Corpus of {n} vectors x {args.dim} dims ---")
+        full_corpus, full_queries = make_corpus(n, args.dim, args.queries, decay=decay)
+        ids = np.arange(n, dtype="int64")
+
+        exact = faiss.IndexFlatIP(args.dim)
+        exact.add(full_corpus)
+        _, truth = exact.search(full_queries, args.k)
+        del exact
+
+        for dim in dims:
+            corpus, queries = (full_corpus, full_queries) if dim == args.dim else (reduce_dims(full_corpus, dim), reduce_dims(full_queries, dim))
+            for index_type in args.types.split(","):
+                actual_type = index_factory.resolve_index_type(index_type, n)
+                if actual_type != index_type:
+                    print(f"Skipping {index_type}: corpus too small to train it")
+                    continue
+
+                # IVF-PQ has its own compression, so the encodings don't apply to it
+                for encoding in encodings if index_type != "ivf_pq" else encodings[:1]:
+                    memory_before = rss_mb()
+                    started = time.perf_counter()
+                    index = index_factory.build_index(index_type, corpus, ids, encoding)
+                    build_seconds = time.perf_counter() - started
+                    memory_mb = rss_mb() - memory_before if memory_before is not None else float("nan")
+                    size_mb = faiss.serialize_index(index).nbytes / (1024 * 1024)
+                    label = index_factory.encoding_of(index)
+
+                    for knob in SWEEPS[index_type]:
+                        index_factory.set_search_params(index, nprobe=knob, ef_search=knob)
+                        found, p50, p99 = time_queries(index, queries, args.k)
+                        recall = recall_at_k(found, truth, args.k)
+                        rows.append((n, dim, index_type, label, knob, recall, p50, p99, build_seconds, size_mb, memory_mb))
+                        print(f"{index_type:<9} {label:<8} dim={dim:<4} knob={str(knob):<5} recall@{args.k}={recall:.3f} p50={p50:.3f}ms p99={p99:.3f}ms")
+                    del index
+
+    print(f"\n=== Recall@{args.k} vs latency ===")
+    print(f"{'vectors':>9} {'dim':>5} {'index':<9} {'storage':<8} {'knob':>5} {'recall':>7} {'p50 ms':>8} {'p99 ms':>8} {'build s':>8} {'size MB':>8} {'RAM MB':>8}")
+    for n, dim, index_type, label, knob, recall, p50, p99, build_seconds, size_mb, memory_mb in rows:
+        print(f"{n:>9} {dim:>5} {index_type:<9} {label:<8} {str(knob or '-'):>5} {recall:>7.3f} {p50:>8.3f} {p99:>8.3f} {build_seconds:>8.1f} {size_mb:>8.1f} {memory_mb:>8.1f}")
+    print("knob = efSearch for hnsw, nprobe for ivf_*; recall is against exact float32 search at full dimension")
+
+
+if __name__ == "__main__":
+    main()
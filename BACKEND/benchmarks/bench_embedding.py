@@ -0,0 +1,75 @@
+# backend/benchmarks/bench_embedding.py
+#
+# Measures embedding throughput (chunks/sec) of the ingest pipeline
+# against a local fake Gemini server, so no API key or quota is needed.
+#
+# Run from the backend folder:
+#   python benchmarks/bench_embedding.py --chunks 2000 --latency 0.05
+
+import argparse
+import os
+import sys
+import time
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_gemini import start_fake_gemini, point_genai_at
+from llm.gemini_client import embed_text
+from rag import process_data
+
+
+def make_chunks(n):
+    return [{"text": f"Synthetic chunk {i} about admissions, exams and hostel fees.", "source": "bench"} for i in range(n)]
+
+
+def run_serial(chunks):
+    """The old one-request-per-chunk loop, as a baseline."""
+    started = time.perf_counter()
+    for chunk in chunks:
+        embed_text(chunk["text"])
+    return time.perf_counter() - started
+
+
+def run_batched(chunks, batch_size, workers):
+    started = time.perf_counter()
+    embeddings, kept = process_data.embed_chunks(chunks, batch_size=batch_size, workers=workers)
+    elapsed = time.perf_counter() - started
+    assert len(embeddings) == len(kept) == len(chunks), "some batches failed"
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched embedding throughput.")
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake server latency per request (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of fake 429 responses")
+    parser.add_argument("--serial-chunks", type=int, default=200, help="Chunks for the serial baseline (it is slow)")
+    args = parser.parse_args()
+
+    server = start_fake_gemini(latency=args.latency, error_rate=args.error_rate)
+    point_genai_at(server)
+    process_data.BACKOFF_BASE = 0.05  # Keep retries short against the local server
+
+    print(f"Fake server at {server.url}, latency={args.latency}s, error_rate={args.error_rate}\n")
+    results = []
+
+    serial_chunks = make_chunks(args.serial_chunks)
+    elapsed = run_serial(serial_chunks)
+    results.append(("serial (old)", 1, 1, len(serial_chunks) / elapsed))
+
+    chunks = make_chunks(args.chunks)
+    for batch_size, workers in [(20, 1), (100, 1), (100, 4), (100, 8)]:
+        elapsed = run_batched(chunks, batch_size, workers)
+        results.append(("batched", batch_size, workers, len(chunks) / elapsed))
+
+    server.shutdown()
+
+    print("\n=== Embedding throughput ===")
+    print(f"{'mode':<14}{'batch':>7}{'workers':>9}{'chunks/sec':>13}")
+    for mode, batch_size, workers, rate in results:
+        print(f"{mode:<14}{batch_size:>7}{workers:>9}{rate:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
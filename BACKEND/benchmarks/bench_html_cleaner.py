@@ -0,0 +1,184 @@
+# backend/benchmarks/bench_html_cleaner.py
+#
+# Micro-benchmark of the clean_html backends (selectolax, lxml, html.parser).
+#
+# data/html only keeps the cleaned text of each page, so by default every
+# stored page is wrapped back into a typical site template (menus, scripts,
+# footer) to get realistic HTML. Real pages are used instead when available:
+#   --crawl-db   raw HTML the crawler cached in data/crawl_state.db
+#   --html-dir   a folder of saved .html files
+#
+# Before timing, every installed backend is checked against FIXTURES (what
+# must be kept and what must go) and against each other on the pages: all
+# of them are meant to give the same text. Differences are printed and the
+# exit code is 1.
+#
+# Run from the backend folder:
+#   python benchmarks/bench_html_cleaner.py --repeat 5
+
+import argparse
+import html
+import os
+import sqlite3
+import sys
+import time
+import zlib
+
+import numpy as np
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crawler.html_cleaner import BACKENDS, clean_html, resolve_backend
+from crawler.crawl_store import CRAWL_DB_FILE
+
+MENU = "".join(f'<li class="menu-item"><a href="/page{i}.php">Menu entry {i}</a></li>' for i in range(80))
+TEMPLATE = """<!DOCTYPE html>
+<html><head><title>{title}</title>
+<style>.menu-item {{ display: inline; }} body {{ margin: 0; }}</style>
+<script>window.dataLayer = window.dataLayer || []; function gtag() {{ dataLayer.push(arguments); }}</script>
+</head><body>
+<header><div class="logo">Vignan University</div></header>
+<nav class="navbar"><ul>{menu}</ul></nav>
+<div class="breadcrumb"><a href="/">Home</a> / {title}</div>
+<main><div class="container"><div class="row">{body}</div></div></main>
+<div class="site-footer"><p>Vadlamudi, Guntur, Andhra Pradesh</p><ul class="social-links">{menu}</ul></div>
+<script src="/js/jquery.min.js"></script><script>$(function() {{ $(".menu-item").hover(); }});</script>
+</body></html>"""
+
+LONG_TEXT = "Admission to the B.Tech programme is based on the entrance exam rank. " * 4
+
+# (name, html, text that must be kept, text that must be removed)
+FIXTURES = [
+    (
+        "menus and footer",
+        f'<body><nav class="navbar"><a href="/">Home</a></nav><div class="menu-item">Menu entry</div>'
+        f'<p>{LONG_TEXT}</p><div class="site-footer">Vadlamudi</div><ul class="social-links"><li>Share</li></ul></body>',
+        ["Admission to the B.Tech"], ["Home", "Menu entry", "Vadlamudi", "Share"],
+    ),
+    (
+        "wrapper class that looks like a menu",
+        f'<body><div class="page nav-open"><div id="main-sidebar-layout"><p>{LONG_TEXT}</p></div></div></body>',
+        ["Admission to the B.Tech"], [],
+    ),
+    (
+        "main inside a boilerplate-looking wrapper",
+        f'<body><div class="menu"><main><p>{LONG_TEXT}</p><div class="breadcrumb">Home / Admissions</div></main></div></body>',
+        ["Admission to the B.Tech"], ["Home / Admissions"],
+    ),
+    (
+        "short main falls back to the page",
+        '<body><main><p>Fee structure</p></main><div class="content"><p>Hostel fees are paid per semester.</p></div>'
+        '<div role="navigation">Quick links</div></body>',
+        ["Fee structure", "Hostel fees"], ["Quick links"],
+    ),
+    (
+        "scripts, styles and nested chrome",
+        '<html><head><title>Exams</title><style>p { color: red; }</style></head><body><header><nav><a href="/a">A</a></nav></header>'
+        '<p>Exam timetable</p><script>var x = 1;</script></body></html>',
+        ["Exams", "Exam timetable"], ["color: red", "var x"],
+    ),
+]
+
+
+def check_backends(backends, pages):
+    """
+    Checks each backend against FIXTURES and all backends against each
+    other on the pages. Returns a list of problems (empty if none).
+    """
+    problems = []
+    for name, page, keep, drop in FIXTURES:
+        for backend in backends:
+            text = clean_html(page, backend)
+            problems += [f"{backend}, {name}: lost {wanted!r}" for wanted in keep if wanted not in text]
+            problems += [f"{backend}, {name}: kept {unwanted!r}" for unwanted in drop if unwanted in text]
+
+    fixtures = [page for _, page, _, _ in FIXTURES]
+    for number, page in enumerate(fixtures + pages):
+        reference = clean_html(page, backends[0])
+        for backend in backends[1:]:
+            if clean_html(page, backend) != reference:
+                what = FIXTURES[number][0] if number < len(fixtures) else f"page {number - len(fixtures)}"
+                problems.append(f"{backend} differs from {backends[0]} on {what}")
+    return problems
+
+
+def pages_from_text(folder):
+    """Rebuilds HTML pages from the cleaned text files in data/html."""
+    pages = []
+    for filename in sorted(os.listdir(folder)):
+        if not filename.endswith(".txt"):
+            continue
+        with open(os.path.join(folder, filename), "r", encoding="utf-8") as f:
+            lines = [line for line in f.read().splitlines() if line.strip()]
+        body = "\n".join(f"<p>{html.escape(line)}</p>" for line in lines)
+        pages.append(TEMPLATE.format(title=html.escape(filename), menu=MENU, body=body))
+    return pages
+
+
+def pages_from_crawl_db(path):
+    db = sqlite3.connect(path)
+    rows = db.execute("SELECT body FROM urls WHERE kind = 'page' AND body IS NOT NULL").fetchall()
+    db.close()
+    return [zlib.decompress(body).decode("utf-8", errors="replace") for (body,) in rows]
+
+
+def pages_from_html_dir(folder):
+    pages = []
+    for filename in sorted(os.listdir(folder)):
+        if filename.endswith((".html", ".htm")):
+            with open(os.path.join(folder, filename), "r", encoding="utf-8", errors="replace") as f:
+                pages.append(f.read())
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark clean_html backends.")
+    parser.add_argument("--html-dir", help="Folder of .html files")
+    parser.add_argument("--crawl-db", nargs="?", const=CRAWL_DB_FILE, help="Use raw HTML cached by the crawler")
+    parser.add_argument("--text-dir", default="data/html", help="Cleaned text to wrap in a template (default)")
+    parser.add_argument("--repeat", type=int, default=5, help="Passes over all pages per backend")
+    args = parser.parse_args()
+
+    if args.crawl_db:
+        pages, origin = pages_from_crawl_db(args.crawl_db), args.crawl_db
+    elif args.html_dir:
+        pages, origin = pages_from_html_dir(args.html_dir), args.html_dir
+    else:
+        pages, origin = pages_from_text(args.text_dir), f"{args.text_dir} (templated)"
+    if not pages:
+        sys.exit("No pages found.")
+    total_mb = sum(len(page.encode("utf-8")) for page in pages) / (1024 * 1024)
+    print(f"{len(pages)} pages, {total_mb:.1f} MB of HTML from {origin}\n")
+
+    installed = [backend for backend in BACKENDS if resolve_backend(backend) == backend]
+    for backend in sorted(set(BACKENDS) - set(installed)):
+        print(f"Skipping {backend}: not installed")
+    problems = check_backends(installed, pages)
+    for problem in problems:
+        print(f"MISMATCH {problem}")
+    if not problems:
+        print(f"{', '.join(installed)}: same text on all {len(FIXTURES)} fixtures and {len(pages)} pages\n")
+
+    rows = []
+    for backend in installed:
+        clean_html(pages[0], backend)  # Warm up
+        timings = []
+        for _ in range(args.repeat):
+            for page in pages:
+                started = time.perf_counter()
+                clean_html(page, backend)
+                timings.append((time.perf_counter() - started) * 1000)
+        output_kb = sum(len(clean_html(page, backend)) for page in pages) / 1024
+        rows.append((backend, np.mean(timings), np.percentile(timings, 50), np.percentile(timings, 99), total_mb * args.repeat / (sum(timings) / 1000), output_kb))
+
+    print("=== clean_html per page ===")
+    print(f"{'backend':<13}{'mean ms':>9}{'p50 ms':>9}{'p99 ms':>9}{'MB/sec':>9}{'text KB':>9}")
+    for backend, mean, p50, p99, rate, output_kb in rows:
+        print(f"{backend:<13}{mean:>9.2f}{p50:>9.2f}{p99:>9.2f}{rate:>9.1f}{output_kb:>9.0f}")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# backend/benchmarks/bench_retrieval.py
+#
+# Retrieval quality and latency of the vector, lexical (BM25) and hybrid
+# modes in rag/rag_engine.py, over the database built by process_data.py.
+#
+# Queries come from a JSONL file ({"query": "...", "relevant": ["source.txt", ...]})
+# or, by default, are generated from the chunk store: a few consecutive words
+# of a random chunk, with that chunk's source file as the right answer.
+#
+# Run from the backend folder (needs GEMINI_API_KEY for the query embeddings):
+#   python benchmarks/bench_retrieval.py --queries 200
+#   python benchmarks/bench_retrieval.py --queries-file eval_queries.jsonl --k 5
+# --fake embeds queries with the local fake server: latency numbers only,
+# the vector results are meaningless.
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_gemini import start_fake_gemini, point_genai_at
+from llm.gemini_client import embed_query
+from rag import rag_engine
+from rag.chunk_store import ChunkStore
+
+MODES = ("vector", "lexical", "hybrid")
+WORDS_PER_QUERY = 6
+
+
+def generated_queries(store, n, seed=0):
+    """Known-item queries: a short run of words copied from a random chunk."""
+    rng = random.Random(seed)
+    chunk_ids = [int(chunk_id) for chunk_id in store.ids()]
+    queries = []
+    for chunk_id in rng.sample(chunk_ids, min(n, len(chunk_ids))):
+        chunk = store.get(chunk_id)
+        words = chunk["text"].split()
+        if len(words) < WORDS_PER_QUERY:
+            continue
+        start = rng.randrange(len(words) - WORDS_PER_QUERY + 1)
+        queries.append({"query": " ".join(words[start:start + WORDS_PER_QUERY]), "relevant": [chunk["source"]]})
+    return queries
+
+
+def load_queries(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate(queries, embeddings, mode, k):
+    """Returns (hit rate@k, MRR, p50 ms, p95 ms) for one retrieval mode."""
+    hits, reciprocal_ranks, latencies = 0, [], []
+    for query, query_emb in zip(queries, embeddings):
+        started = time.perf_counter()
+        results = rag_engine.rank_chunks(query["query"], query_emb, k, mode=mode)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+        sources = [rag_engine.db.documents.get(chunk_id)["source"] for chunk_id, _ in results]
+        rank = next((i for i, source in enumerate(sources, start=1) if source in query["relevant"]), None)
+        hits += rank is not None
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+    return hits / len(queries), float(np.mean(reciprocal_ranks)), *np.percentile(latencies, [50, 95])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare vector, BM25 and hybrid retrieval.")
+    parser.add_argument("--queries", type=int, default=200, help="Generated queries (ignored with --queries-file)")
+    parser.add_argument("--queries-file", help="JSONL file of {query, relevant} objects")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--fake", action="store_true", help="Embed queries with the local fake Gemini server")
+    args = parser.parse_args()
+
+    database = rag_engine.ensure_database()
+    if database is None or not isinstance(database.documents, ChunkStore):
+        sys.exit("No chunk store loaded. Run 'python rag/process_data.py' first.")
+    if database.lexical_index is None:
+        print("No BM25 index found, lexical and hybrid rows will equal vector.")
+
+    if args.fake:
+        server = start_fake_gemini()
+        point_genai_at(server)
+
+    queries = load_queries(args.queries_file) if args.queries_file else generated_queries(database.documents, args.queries)
+    print(f"{len(queries)} queries, k={args.k}, {len(database.documents)} chunks\n")
+
+    started = time.perf_counter()
+    embeddings = [embed_query(query["query"]) for query in queries]
+    embed_ms = (time.perf_counter() - started) * 1000 / len(queries)
+    failed = sum(1 for emb in embeddings if not emb)
+    if failed:
+        print(f"WARNING: {failed} query embeddings failed; those queries fall back to BM25.")
+
+    rows = [(mode, *evaluate(queries, embeddings, mode, args.k)) for mode in MODES]
+    # What users get while the embedding API is down
+    rows.append(("hybrid, no API", *evaluate(queries, [[]] * len(queries), "hybrid", args.k)))
+
+    print(f"=== Retrieval over {len(queries)} queries (search only; embedding adds ~{embed_ms:.0f} ms) ===")
+    print(f"{'mode':<16}{f'hit@{args.k}':>8}{'MRR':>8}{'p50 ms':>9}{'p95 ms':>9}")
+    for mode, hit_rate, mrr, p50, p95 in rows:
+        print(f"{mode:<16}{hit_rate:>8.3f}{mrr:>8.3f}{p50:>9.2f}{p95:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
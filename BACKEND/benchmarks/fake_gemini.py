@@ -0,0 +1,179 @@
+# backend/benchmarks/fake_gemini.py
+
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# --- Settings ---
+EMBEDDING_DIM = 768
+
+
+def fake_vector(text, dim=EMBEDDING_DIM):
+    """
+    Deterministic unit vector for a text, so repeated runs give the same index.
+    """
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:4], "little")
+    vec = np.random.default_rng(seed).standard_normal(dim).astype("float32")
+    return (vec / np.linalg.norm(vec)).tolist()
+
+
+def fake_answer(prompt):
+    question = " ".join(prompt.split())[-80:]
+    return f"This is a fake answer from the local test server. You asked: {question}"
+
+
+def generate_response(text, prompt):
+    return {
+        "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP", "index": 0}],
+        "usageMetadata": {
+            "promptTokenCount": len(prompt) // 4,
+            "candidatesTokenCount": len(text) // 4,
+            "totalTokenCount": (len(prompt) + len(text)) // 4,
+        },
+    }
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    """
+    Speaks just enough of the Gemini REST API for our client code.
+    The server object carries the knobs: latency (seconds) and error_rate (0-1).
+    """
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output readable
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _prompt(self, request):
+        return " ".join(
+            part.get("text", "") for content in request.get("contents", []) for part in content.get("parts", [])
+        )
+
+    def _stream(self, prompt, sse):
+        """
+        Sends the answer a few words at a time, either as Server-Sent Events
+        (alt=sse, our async client) or as a streamed JSON array (the SDK's REST transport).
+        """
+        words = fake_answer(prompt).split(" ")
+        pieces = [" ".join(words[i:i + 3]) + " " for i in range(0, len(words), 3)]
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream" if sse else "application/json")
+        self.end_headers()  # No Content-Length: HTTP/1.0 ends the body by closing the connection
+        for n, piece in enumerate(pieces):
+            payload = json.dumps(generate_response(piece, prompt))
+            if sse:
+                self.wfile.write(f"data: {payload}\r\n\r\n".encode("utf-8"))
+            else:
+                self.wfile.write((("[" if n == 0 else ",") + payload).encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(self.server.token_delay)
+        if not sse:
+            self.wfile.write(b"]")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        server = self.server
+        server.count_request()
+
+        if server.latency:
+            time.sleep(server.latency)
+
+        if server.error_rate and random.random() < server.error_rate:
+            self._send_json(429, {"error": {"code": 429, "message": "Resource has been exhausted (fake)", "status": "RESOURCE_EXHAUSTED"}})
+            return
+
+        if self.path.split("?")[0].endswith(":batchEmbedContents"):
+            embeddings = []
+            for item in request.get("requests", []):
+                text = " ".join(part.get("text", "") for part in item["content"]["parts"])
+                embeddings.append({"values": fake_vector(text, item.get("outputDimensionality") or EMBEDDING_DIM)})
+            self._send_json(200, {"embeddings": embeddings})
+
+        elif self.path.split("?")[0].endswith(":embedContent"):
+            text = " ".join(part.get("text", "") for part in request["content"]["parts"])
+            self._send_json(200, {"embedding": {"values": fake_vector(text, request.get("outputDimensionality") or EMBEDDING_DIM)}})
+
+        elif self.path.split("?")[0].endswith(":generateContent"):
+            prompt = self._prompt(request)
+            self._send_json(200, generate_response(fake_answer(prompt), prompt))
+
+        elif self.path.split("?")[0].endswith(":streamGenerateContent"):
+            self._stream(self._prompt(request), sse="alt=sse" in self.path)
+
+        else:
+            self._send_json(404, {"error": {"code": 404, "message": f"Unknown path {self.path}", "status": "NOT_FOUND"}})
+
+
+class FakeGeminiServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connections under load, and the client's
+    # SYN retry then adds a full second to the measured latency
+    request_queue_size = 256
+
+    def __init__(self, address, latency=0.0, error_rate=0.0, token_delay=0.01):
+        super().__init__(address, FakeGeminiHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.token_delay = token_delay
+        self.requests_served = 0
+        self._lock = threading.Lock()
+
+    def count_request(self):
+        with self._lock:
+            self.requests_served += 1
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_fake_gemini(latency=0.0, error_rate=0.0, port=0, token_delay=0.01):
+    """
+    Starts the fake server on a background thread and returns it.
+    Call server.shutdown() when done.
+    """
+    server = FakeGeminiServer(("127.0.0.1", port), latency=latency, error_rate=error_rate, token_delay=token_delay)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def point_genai_at(server):
+    """
+    Reconfigures the google.generativeai SDK and the async REST client in
+    llm/gemini_client.py to talk to the fake server.
+    """
+    from llm import gemini_client
+    gemini_client.use_endpoint(server.url, api_key="fake-key")
+
+
+if __name__ == "__main__":
+    # Serve the whole backend offline:
+    #   python benchmarks/fake_gemini.py --port 8765 --latency 0.2
+    #   GEMINI_API_ENDPOINT=http://127.0.0.1:8765 uvicorn main:app
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a local fake Gemini API server.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="Seconds between streamed pieces")
+    args = parser.parse_args()
+
+    server = FakeGeminiServer(("127.0.0.1", args.port), latency=args.latency, error_rate=args.error_rate, token_delay=args.token_delay)
+    print(f"Fake Gemini server listening on {server.url}")
+    server.serve_forever()
@@ -0,0 +1,111 @@
+# backend/benchmarks/load_test.py
+#
+# Concurrent-user load test of /api/chat against a local fake Gemini server.
+# Compares the async endpoints in main.py with the old behaviour (blocking
+# Gemini calls inside an async endpoint, which stalls the event loop).
+#
+# Run from the backend folder:
+#   python benchmarks/load_test.py --users 50 --requests 200 --latency 0.3
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+import numpy as np
+from fastapi import FastAPI
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_gemini import start_fake_gemini, point_genai_at
+import main
+from llm.gemini_client import ask_gemini
+from rag.rag_engine import rag_chat
+
+
+def make_blocking_app():
+    """The /api/chat handler as it was: sync calls inside async def."""
+    app = FastAPI()
+
+    @app.post("/api/chat")
+    async def chat_endpoint(request: main.ChatRequest):
+        if request.mode == "university":
+            return {"response": rag_chat(request.message)}
+        return {"response": ask_gemini(request.message)}
+
+    return app
+
+
+async def run_load(app, users, total, mode, stream):
+    """total requests from `users` concurrent clients; returns (elapsed, latencies, errors)."""
+    transport = httpx.ASGITransport(app=app)
+    path = "/api/chat/stream" if stream else "/api/chat"
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+
+        async def user():
+            nonlocal errors
+            for i in counter:
+                # Unique questions, so the answer cache doesn't hide the Gemini calls
+                payload = {"message": f"Load test question {i} about hostel fees", "mode": mode}
+                started = time.perf_counter()
+                try:
+                    response = await client.post(path, json=payload)
+                    if response.status_code != 200 or '"error"' in response.text:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(users)))
+        elapsed = time.perf_counter() - started
+
+    return elapsed, latencies, errors
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Load test the chat endpoints with concurrent users.")
+    parser.add_argument("--users", type=int, default=50, help="Concurrent simulated users")
+    parser.add_argument("--requests", type=int, default=200, help="Total requests per run")
+    parser.add_argument("--latency", type=float, default=0.3, help="Fake Gemini latency per call (s)")
+    parser.add_argument("--mode", default="general", choices=["general", "university"])
+    args = parser.parse_args()
+
+    server = start_fake_gemini(latency=args.latency)
+    point_genai_at(server)
+    print(f"Fake server at {server.url}, latency={args.latency}s, {args.users} users, {args.requests} requests\n")
+
+    runs = [
+        ("blocking (old)", make_blocking_app(), False),
+        ("async", main.app, False),
+        ("async stream", main.app, True),
+    ]
+
+    async def run_all():
+        # One event loop for every run: the shared async clients are bound to it
+        results = []
+        for name, app, stream in runs:
+            elapsed, latencies, errors = await run_load(app, args.users, args.requests, args.mode, stream)
+            results.append((name, args.requests / elapsed, *np.percentile(latencies, [50, 95, 99]), errors))
+            print(f"{name}: {elapsed:.1f}s")
+        await main.close_gemini_client()
+        return results
+
+    results = asyncio.run(run_all())
+    server.shutdown()
+
+    print("\n=== /api/chat under load ===")
+    print(f"{'endpoint':<16}{'req/sec':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for name, rate, p50, p95, p99, errors in results:
+        print(f"{name:<16}{rate:>9.1f}{p50:>9.0f}{p95:>9.0f}{p99:>9.0f}{errors:>8}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,241 @@
+# backend/benchmarks/run_suite.py
+#
+# Offline end-to-end benchmark suite against the local fake Gemini server:
+#   ingest     process_data.build_vector_store over data/ (full rebuild, temp folder)
+#   retrieval  rag_engine.rank_chunks latency per retrieval mode, on that database
+#   chat       concurrent /api/chat and /api/chat/stream throughput (main.app)
+#   startup    cold start of a fresh server process: import main, "/" and /ready
+#
+# Results are written to a JSON file; --compare flags numbers that got worse
+# than a previous run by more than --tolerance, so releases can be checked
+# for regressions. Exit code 1 if any did.
+#
+# Run from the backend folder:
+#   python benchmarks/run_suite.py --output benchmarks/results/current.json
+#   python benchmarks/run_suite.py --compare benchmarks/results/v1.2.json
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import numpy as np
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_gemini import start_fake_gemini, point_genai_at
+from benchmarks.bench_retrieval import generated_queries, evaluate, MODES
+from benchmarks.load_test import run_load
+from llm.gemini_client import embed_query
+from rag import process_data
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Which direction is better for each result field
+HIGHER_IS_BETTER = ("chunks_per_sec", "req_per_sec", "hit_rate", "mrr")
+LOWER_IS_BETTER = ("seconds", "p50_ms", "p95_ms", "p99_ms", "errors")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_ingest(rag_dir):
+    """Full rebuild of the database from data/ into rag_dir."""
+    process_data.RAG_DIR = rag_dir
+    process_data.BACKOFF_BASE = 0.05  # Keep retries short against the local server
+    started = time.perf_counter()
+    process_data.build_vector_store(full_rebuild=True)
+    elapsed = time.perf_counter() - started
+
+    from rag import snapshots
+    _, paths = snapshots.current_paths(rag_dir)
+    info = snapshots.read_info(paths)
+    chunks = info.get("chunks", 0)
+    return {"seconds": elapsed, "chunks": chunks, "chunks_per_sec": chunks / elapsed if elapsed else 0.0}
+
+
+def bench_retrieval(rag_dir, n_queries, k):
+    """
+    Search latency (and known-item quality) of every retrieval mode on the
+    database in rag_dir (None = the regular one).
+    """
+    from rag import rag_engine
+    if rag_dir:
+        rag_engine.RAG_DIR = rag_dir
+        rag_engine.reload_database()
+    database = rag_engine.ensure_database()
+    if database is None:
+        return {}
+
+    queries = generated_queries(database.documents, n_queries)
+    embeddings = [embed_query(query["query"]) for query in queries]
+    results = {}
+    for mode in MODES:
+        hit_rate, mrr, p50, p95 = evaluate(queries, embeddings, mode, k)
+        results[mode] = {"hit_rate": hit_rate, "mrr": mrr, "p50_ms": p50, "p95_ms": p95}
+    return results
+
+
+def bench_chat(users, total):
+    """Concurrent users against the real app, per mode, blocking and streamed."""
+    import main
+    from rag import rag_engine
+
+    async def run_all():
+        # One event loop for every run: the shared async clients are bound to it
+        results = {}
+        for mode in ("general", "university"):
+            for stream in (False, True):
+                # Every run asks the same questions; start cold so each one calls Gemini
+                rag_engine.answer_cache.clear()
+                rag_engine.embedding_cache.clear()
+                elapsed, latencies, errors = await run_load(main.app, users, total, mode, stream)
+                p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+                name = f"{mode}{' stream' if stream else ''}"
+                results[name] = {"req_per_sec": total / elapsed, "p50_ms": p50, "p95_ms": p95, "p99_ms": p99, "errors": errors}
+        await main.close_gemini_client()
+        return results
+
+    return asyncio.run(run_all())
+
+
+def seconds_until(url, process, timeout=120):
+    """Polls url until it answers 200; returns the seconds since process started, or None."""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout and process.poll() is None:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.TransportError:
+            pass
+        time.sleep(0.02)
+    return None
+
+
+def bench_startup(gemini_url, port=8799):
+    """
+    Cold start in fresh processes: how long `import main` takes, and how long
+    a new uvicorn server needs before "/" (live) and /ready (database loaded) answer.
+    """
+    env = dict(os.environ, GEMINI_API_ENDPOINT=gemini_url, RELOAD_POLL_SECONDS="0")
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import main"], cwd=BACKEND_DIR, env=env, check=True, capture_output=True)
+    results = {"import": {"seconds": time.perf_counter() - started}}
+
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        live = seconds_until(f"http://127.0.0.1:{port}/", process)
+        ready = seconds_until(f"http://127.0.0.1:{port}/ready", process)
+    finally:
+        process.terminate()
+        process.wait()
+    if live is not None:
+        results["live"] = {"seconds": live}
+    if ready is not None:
+        results["ready"] = {"seconds": live + ready}
+    return results
+
+
+def flatten(results, prefix=""):
+    """{"chat": {"general": {"p50_ms": 3}}} -> {"chat.general.p50_ms": 3}"""
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)):
+            flat[prefix + key] = value
+    return flat
+
+
+def regressions(baseline, current, tolerance):
+    """(metric, old, new) for every number that got worse by more than tolerance (a fraction)."""
+    old, new = flatten(baseline), flatten(current)
+    worse = []
+    for metric, value in new.items():
+        field = metric.rsplit(".", 1)[-1]
+        if metric not in old or not old[metric]:
+            continue
+        change = (value - old[metric]) / abs(old[metric])
+        if (field in HIGHER_IS_BETTER and change < -tolerance) or (field in LOWER_IS_BETTER and change > tolerance):
+            worse.append((metric, old[metric], value))
+    return worse
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark suite: ingest, retrieval and chat throughput.")
+    parser.add_argument("--output", default="benchmarks/results/latest.json")
+    parser.add_argument("--compare", help="Earlier results JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before a number counts as a regression")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake Gemini latency per call (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of fake 429 responses")
+    parser.add_argument("--queries", type=int, default=200, help="Retrieval queries")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--users", type=int, default=50, help="Concurrent chat users")
+    parser.add_argument("--requests", type=int, default=200, help="Chat requests per run")
+    parser.add_argument("--skip", nargs="*", default=[], choices=["ingest", "retrieval", "chat", "startup"])
+    args = parser.parse_args()
+
+    server = start_fake_gemini(latency=args.latency, error_rate=args.error_rate)
+    point_genai_at(server)
+    print(f"Fake server at {server.url}, latency={args.latency}s, error_rate={args.error_rate}\n")
+
+    report = {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="mouni-bench-") as rag_dir:
+        if "ingest" not in args.skip:
+            print("--- ingest ---")
+            report["results"]["ingest"] = bench_ingest(rag_dir)
+        if "retrieval" not in args.skip:
+            print("--- retrieval ---")
+            built = rag_dir if "ingest" not in args.skip else None
+            report["results"]["retrieval"] = bench_retrieval(built, args.queries, args.k)
+        if "chat" not in args.skip:
+            print("--- chat ---")
+            report["results"]["chat"] = bench_chat(args.users, args.requests)
+    if "startup" not in args.skip:
+        print("--- startup ---")
+        report["results"]["startup"] = bench_startup(server.url)
+    server.shutdown()
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print("\n=== Results ===")
+    for metric, value in flatten(report["results"]).items():
+        print(f"{metric:<40}{value:>12.2f}")
+    print(f"\nSaved to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        worse = regressions(baseline["results"], report["results"], args.tolerance)
+        print(f"\n=== Compared with {args.compare} (commit {baseline.get('commit')}) ===")
+        for metric, old, new in worse:
+            print(f"REGRESSION {metric}: {old:.2f} -> {new:.2f}")
+        if worse:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,12 +5,97 @@ from dotenv import load_dotenv
 # Load environment variables from the .env file
 load_dotenv()
 
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
 # 1. Get the Gemini API Key
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+# Optional: talk to another Gemini-compatible server instead of Google, e.g.
+# the local fake (python benchmarks/fake_gemini.py) for offline runs:
+#   GEMINI_API_ENDPOINT=http://127.0.0.1:8765
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
+
 # 2. Define the Base URL for the crawler
 BASE_URL = "https://www.vignan.ac.in"
 
+# 3. Vector index settings (see rag/index_factory.py)
+# INDEX_TYPE: "auto", "flat", "hnsw", "ivf_flat" or "ivf_pq"
+INDEX_TYPE = os.getenv("INDEX_TYPE", "auto")
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "16"))          # IVF lists searched per query
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))  # HNSW candidates per query
+# VECTOR_ENCODING: how vectors are stored: "float32", "float16" (half the size) or "int8" (a quarter)
+VECTOR_ENCODING = os.getenv("VECTOR_ENCODING", "float32")
+# Dimensions asked of the embedding model (e.g. 256); 0 = its full 768. Changing it re-embeds everything
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "0"))
+
+# 4. University mode cache settings (see rag/query_cache.py)
+# QUERY_CACHE_BACKEND: "memory" (per worker) or "sqlite" (one file shared by all workers)
+QUERY_CACHE_BACKEND = os.getenv("QUERY_CACHE_BACKEND", "memory")
+QUERY_CACHE_FILE = os.getenv("QUERY_CACHE_FILE", "rag/query_cache.db")
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "2000"))                   # Entries per cache
+EMBEDDING_CACHE_TTL = int(os.getenv("EMBEDDING_CACHE_TTL", str(7 * 24 * 3600)))  # Seconds
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", "3600"))                    # Seconds
+
+# 5. Concurrency limits for the async chat path
+MAX_CONCURRENT_GEMINI_CALLS = int(os.getenv("MAX_CONCURRENT_GEMINI_CALLS", "32"))  # Per worker
+SEARCH_THREADS = int(os.getenv("SEARCH_THREADS", "4"))       # Threads for FAISS searches
+MAX_CONCURRENT_SCRAPES = int(os.getenv("MAX_CONCURRENT_SCRAPES", "8"))
+
+# 6. Retrieval settings (see rag/rag_engine.py)
+# RETRIEVAL_MODE: "hybrid" (BM25 + vectors), "vector" or "lexical"
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))  # Hits per retriever before fusion
+QUERY_EMBED_TIMEOUT = float(os.getenv("QUERY_EMBED_TIMEOUT", "5"))  # Seconds; on timeout we search BM25 only
+# Concurrent questions are embedded and searched in batches (see rag/micro_batcher.py)
+QUERY_BATCH_SIZE = int(os.getenv("QUERY_BATCH_SIZE", "32"))             # Max questions per batch; 1 = off
+QUERY_BATCH_WAIT_MS = float(os.getenv("QUERY_BATCH_WAIT_MS", "2"))      # Max wait for others to join
+# Newer documents rank a little higher (see rag/metadata.py for how dates are found)
+RECENCY_WEIGHT = float(os.getenv("RECENCY_WEIGHT", "0.5"))                  # Share of a first-place vote; 0 = off
+RECENCY_HALF_LIFE_DAYS = float(os.getenv("RECENCY_HALF_LIFE_DAYS", "180"))  # The boost halves every this many days
+
+# 7. Prompt size limits (see rag/context_packer.py)
+CONTEXT_TOKENS = int(os.getenv("CONTEXT_TOKENS", "1500"))            # University mode: retrieved chunks
+LINK_CONTEXT_TOKENS = int(os.getenv("LINK_CONTEXT_TOKENS", "2500"))  # Link mode: passages of the page
+
+# 8. Link mode page cache (see rag/live_scraper.py)
+LIVE_PAGE_TTL = int(os.getenv("LIVE_PAGE_TTL", "900"))       # Seconds a page is used without asking the site again
+LIVE_CACHE_PAGES = int(os.getenv("LIVE_CACHE_PAGES", "64"))  # Pages kept per worker
+LIVE_CACHE_MB = int(os.getenv("LIVE_CACHE_MB", "64"))        # Memory cap for text + embeddings
+
+# 9. HTML cleaning (see crawler/html_cleaner.py)
+# HTML_PARSER: "auto" (fastest installed), "selectolax", "lxml" or "html.parser"
+HTML_PARSER = os.getenv("HTML_PARSER", "auto")
+
+# 10. Database hot reload (see rag/snapshots.py)
+RELOAD_POLL_SECONDS = float(os.getenv("RELOAD_POLL_SECONDS", "10"))  # 0 = only reload via the admin endpoint
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")  # Required by /api/admin/*; unset = admin endpoints disabled
+
+# 11. Metrics (see metrics.py; Prometheus scrapes /metrics)
+TIMING_HEADER = os.getenv("TIMING_HEADER", "0") == "1"  # Add a Server-Timing header with each stage's duration
+
+# 12. Gemini call limits (see llm/gemini_client.py and llm/resilience.py)
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "20"))            # Seconds per attempt
+GEMINI_DEADLINE = float(os.getenv("GEMINI_DEADLINE", "45"))          # Seconds per answer, retries and fallback included
+GEMINI_RETRIES = int(os.getenv("GEMINI_RETRIES", "2"))               # Extra attempts after a 429/5xx/timeout
+GEMINI_HEDGE_AFTER = float(os.getenv("GEMINI_HEDGE_AFTER", "0"))     # Seconds; then also ask the fallback model (0 = off)
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))           # Failures in a row that switch a model off
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))  # Then one trial call is let through
+
+# 13. Gemini quota, shared by all workers and process_data.py (see llm/rate_limiter.py)
+# Set these to the API key's per-minute limits, as shown for its project and
+# tier under "Rate limits" in Google AI Studio; 0 = no limit. The defaults are
+# placeholders, not Google's figures for any tier. Too high is corrected by the
+# first 429s; too low delays calls, which is logged once per bucket and counted
+# in rate_limited_total.
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "1000"))            # Requests per minute, per chat model
+GEMINI_TPM = int(os.getenv("GEMINI_TPM", "1000000"))         # Input + output tokens per minute, per chat model
+EMBEDDING_RPM = int(os.getenv("EMBEDDING_RPM", "1500"))      # Embedding requests per minute
+EMBEDDING_TPM = int(os.getenv("EMBEDDING_TPM", "1000000"))   # Embedded tokens per minute
+# Relative paths are inside the backend folder, so every process finds the same file whatever its working directory
+RATE_LIMIT_FILE = os.getenv("RATE_LIMIT_FILE", "llm/rate_limits.db")  # "" = each process keeps its own budget
+if RATE_LIMIT_FILE:
+    RATE_LIMIT_FILE = os.path.join(BACKEND_DIR, RATE_LIMIT_FILE)
+
 # Validation check
-if not GEMINI_API_KEY:
+if not GEMINI_API_KEY and not GEMINI_API_ENDPOINT:
     print("⚠️ WARNING: GEMINI_API_KEY is missing in .env file!")
\ No newline at end of file
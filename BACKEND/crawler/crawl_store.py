@@ -0,0 +1,233 @@
+# backend/crawler/crawl_store.py
+
+import sqlite3
+import time
+import zlib
+
+# --- Settings ---
+CRAWL_DB_FILE = "data/crawl_state.db"
+# Files in data/ are named after the first HASH_NAME_CHARS hex digits of content_hash
+HASH_NAME_CHARS = 32
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    url           TEXT PRIMARY KEY,
+    kind          TEXT NOT NULL,      -- 'page' or 'pdf'
+    depth         INTEGER NOT NULL,
+    queued_run    INTEGER NOT NULL,   -- last run that put this URL on the frontier
+    visited_run   INTEGER,            -- last run that finished fetching it
+    status        TEXT,               -- 'saved', 'unchanged', 'not_modified', 'failed', ...
+    etag          TEXT,
+    last_modified TEXT,
+    content_hash  TEXT,               -- SHA-256 of the content (clean text or PDF bytes); also its file name in data/
+    body          BLOB,               -- zlib-compressed HTML, so a 304 can still yield links
+    fetched_at    REAL,
+    simhash       TEXT,               -- SimHash of the clean text (see dedup.py)
+    duplicate_of  TEXT,               -- For near duplicates: the URL whose copy we kept
+    first_seen    REAL                -- When this URL first had its current content_hash (unlike fetched_at, not moved by recrawls)
+);
+CREATE INDEX IF NOT EXISTS urls_frontier ON urls (queued_run, visited_run);
+CREATE INDEX IF NOT EXISTS urls_content ON urls (content_hash);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+# Columns added after the first release, for databases created before them
+ADDED_COLUMNS = {"simhash": "TEXT", "duplicate_of": "TEXT", "first_seen": "REAL"}
+
+class CrawlStore:
+    """
+    Persistent crawl state in SQLite.
+
+    Every crawl is a numbered run. A URL is on this run's frontier once
+    queued_run == run, and finished once visited_run == run, so an
+    interrupted run can be resumed exactly where it stopped. HTTP
+    validators (ETag / Last-Modified) and content hashes survive between
+    runs, which lets recrawls use conditional GETs and skip unchanged files.
+    """
+
+    def __init__(self, path=CRAWL_DB_FILE):
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(urls)")}
+        if columns:
+            for name, kind in ADDED_COLUMNS.items():
+                if name not in columns:
+                    self.db.execute(f"ALTER TABLE urls ADD COLUMN {name} {kind}")
+            if "first_seen" not in columns:
+                # The last fetch is the earliest date older databases still know
+                self.db.execute("UPDATE urls SET first_seen = fetched_at WHERE content_hash IS NOT NULL")
+                self.db.commit()
+        self.db.executescript(SCHEMA)
+        self.run = 0
+
+    def _get_meta(self, key, default=None):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key, value):
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def start_run(self, seed_url, resume=True):
+        """
+        Resumes the last run if it never finished (and resume is True),
+        otherwise starts a new one from seed_url.
+        Returns the pending frontier as a list of (url, depth, kind).
+        """
+        last_run = int(self._get_meta("run", 0))
+        if resume and last_run and self._get_meta("run_finished") == "0":
+            self.run = last_run
+            pending = self.db.execute(
+                "SELECT url, depth, kind FROM urls WHERE queued_run = ? "
+                "AND (visited_run IS NULL OR visited_run < ?) ORDER BY depth",
+                (self.run, self.run),
+            ).fetchall()
+            print(f"Resuming crawl run {self.run}: {len(pending)} URLs left on the frontier.")
+            if pending:
+                return pending
+
+        self.run = last_run + 1
+        self._set_meta("run", self.run)
+        self._set_meta("run_finished", 0)
+        self.enqueue(seed_url, 0, "page")
+        self.db.commit()
+        return [(seed_url, 0, "page")]
+
+    def finish_run(self):
+        self._set_meta("run_finished", 1)
+        self.db.commit()
+
+    def enqueue(self, url, depth, kind):
+        """
+        Puts a URL on this run's frontier.
+        Returns False if it was already queued or visited in this run.
+        """
+        cursor = self.db.execute(
+            "INSERT INTO urls (url, kind, depth, queued_run) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(url) DO UPDATE SET depth = excluded.depth, queued_run = excluded.queued_run "
+            "WHERE urls.queued_run < excluded.queued_run",
+            (url, kind, depth, self.run),
+        )
+        return cursor.rowcount > 0
+
+    def validators(self, url):
+        """
+        Returns (etag, last_modified, content_hash) from the last visit, or Nones.
+        """
+        row = self.db.execute(
+            "SELECT etag, last_modified, content_hash FROM urls WHERE url = ?", (url,)
+        ).fetchone()
+        return row if row else (None, None, None)
+
+    def cached_body(self, url):
+        """Returns the HTML stored on the last successful fetch, or None."""
+        row = self.db.execute("SELECT body FROM urls WHERE url = ?", (url,)).fetchone()
+        if not row or row[0] is None:
+            return None
+        return zlib.decompress(row[0]).decode("utf-8", errors="replace")
+
+    def mark_visited(self, url, status, etag=None, last_modified=None, content_hash=None, body=None,
+                     simhash=None, duplicate_of=None):
+        """
+        Records that a URL was fetched in this run. Validators, hash, body and
+        SimHash are only overwritten when given, so a 304 keeps what we stored
+        before. duplicate_of is only kept while the status is 'near_duplicate'.
+        first_seen only moves when the content hash changes.
+        """
+        now = time.time()
+        # SET expressions all see the old row, so first_seen compares against the old content_hash
+        self.db.execute(
+            "UPDATE urls SET visited_run = ?, status = ?, fetched_at = ?, "
+            "first_seen = CASE WHEN ? IS NOT NULL AND content_hash IS NOT ? THEN ? ELSE first_seen END, "
+            "etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified), "
+            "content_hash = COALESCE(?, content_hash), body = COALESCE(?, body), "
+            "simhash = COALESCE(?, simhash), duplicate_of = ? "
+            "WHERE url = ?",
+            (
+                self.run, status, now,
+                content_hash, content_hash, now,
+                etag, last_modified, content_hash,
+                zlib.compress(body.encode("utf-8")) if body is not None else None,
+                simhash, duplicate_of if status == "near_duplicate" else None,
+                url,
+            ),
+        )
+        self.db.commit()
+
+    def content_refs(self, content_hash, exclude_url):
+        """
+        How many other URLs still own the file with this content hash.
+        Near duplicates only point at another URL's file, so they don't count.
+        """
+        return self.db.execute(
+            "SELECT COUNT(*) FROM urls WHERE content_hash = ? AND url != ? AND status != 'near_duplicate'",
+            (content_hash, exclude_url),
+        ).fetchone()[0]
+
+    def canonicalize_urls(self, canonicalize):
+        """
+        One-off rewrite of the URLs stored before canonicalization (see urls.py).
+        Where two old URLs become one, the row that already has the canonical form wins.
+        """
+        if self._get_meta("canonical_urls") == "1":
+            return
+        for (url,) in self.db.execute("SELECT url FROM urls").fetchall():
+            canonical = canonicalize(url)
+            if canonical and canonical != url:
+                self.db.execute("UPDATE OR IGNORE urls SET url = ? WHERE url = ?", (canonical, url))
+                self.db.execute("DELETE FROM urls WHERE url = ?", (url,))
+        self._set_meta("canonical_urls", 1)
+        self.db.commit()
+
+    def set_content_hash(self, url, content_hash):
+        # Same content under its new name, so first_seen stays (or starts at the last fetch)
+        self.db.execute(
+            "UPDATE urls SET content_hash = ?, first_seen = COALESCE(first_seen, fetched_at) WHERE url = ?",
+            (content_hash, url),
+        )
+        self.db.commit()
+
+    def content_sources(self):
+        """
+        {file name stem: (url, first_seen)} for every file in data/, so
+        process_data can tell where a file came from and since when. When
+        several URLs share a file, the one that had it first is used.
+        """
+        sources = {}
+        rows = self.db.execute(
+            "SELECT content_hash, url, COALESCE(first_seen, fetched_at) AS seen FROM urls "
+            "WHERE content_hash IS NOT NULL AND status != 'near_duplicate' ORDER BY seen DESC"
+        )
+        for content_hash, url, first_seen in rows:
+            sources[content_hash[:HASH_NAME_CHARS]] = (url, first_seen)
+        return sources
+
+    def fingerprints(self):
+        """(url, simhash) of every page whose own text is stored in data/."""
+        return self.db.execute(
+            "SELECT url, simhash FROM urls WHERE kind = 'page' AND simhash IS NOT NULL "
+            "AND status IN ('saved', 'unchanged', 'not_modified', 'duplicate')"
+        ).fetchall()
+
+    def unchanged_duplicate_of(self, url):
+        """
+        The page url was found to nearly duplicate, if that page still has the
+        content it had back then. Such URLs need not be fetched again.
+        """
+        row = self.db.execute(
+            "SELECT original.url FROM urls AS copy JOIN urls AS original ON original.url = copy.duplicate_of "
+            "WHERE copy.url = ? AND copy.status = 'near_duplicate' AND original.content_hash = copy.content_hash",
+            (url,),
+        ).fetchone()
+        return row[0] if row else None
+
+    def pages_visited(self):
+        """Number of pages (not PDFs) finished in this run."""
+        return self.db.execute(
+            "SELECT COUNT(*) FROM urls WHERE kind = 'page' AND visited_run = ?", (self.run,)
+        ).fetchone()[0]
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
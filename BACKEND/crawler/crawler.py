@@ -1,19 +1,25 @@
 # backend/crawler/crawler.py
 
 import os
-import time
 import re
-import requests
-from urllib.parse import urljoin, urlparse
-from playwright.sync_api import sync_playwright
-from bs4 import BeautifulSoup
+import time
+import hashlib
+import asyncio
+import contextlib
+from collections import deque
+from urllib.parse import urlparse
+import httpx
+from playwright.async_api import async_playwright
 import sys
 
 # Add the backend directory to python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config import BASE_URL
-from html_cleaner import clean_html
+from html_cleaner import parse_html
+from crawl_store import CrawlStore, HASH_NAME_CHARS
+from dedup import SimHashIndex, simhash
+from urls import canonicalize_url, is_internal, site_domain
 
 # --- Settings ---
 MAX_DEPTH = 2
@@ -21,109 +27,538 @@ MAX_PAGES = 50  # Safety limit to prevent crawling forever
 DATA_PDF_DIR = "data/pdfs"
 DATA_HTML_DIR = "data/html"
 
+# --- Concurrency Settings ---
+CONCURRENCY = 8         # Pages being fetched at once (= browser contexts in browser mode)
+PDF_WORKERS = 4         # Separate pool for PDF downloads so they never block pages
+PER_HOST_LIMIT = 4      # Politeness: max simultaneous requests to one host
+PER_HOST_DELAY = 0.25   # Politeness: min seconds between request starts on one host
+PAGE_TIMEOUT = 20       # Seconds
+MAX_PDF_BYTES = 50 * 1024 * 1024  # Bigger PDFs are skipped instead of filling the disk
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# "http"    -> plain HTTP only (fastest, no JavaScript)
+# "browser" -> render every page in Chromium
+# "auto"    -> plain HTTP first, browser only for pages that need JavaScript
+FETCH_MODE = "auto"
+
+# Fake a browser user-agent so we don't get blocked
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+# Markers of client-side rendered pages whose HTML is just an empty shell
+JS_SHELL_MARKERS = ('<div id="root"></div>', '<div id="app"></div>', "__next_data__", "enable javascript")
+
 os.makedirs(DATA_PDF_DIR, exist_ok=True)
 os.makedirs(DATA_HTML_DIR, exist_ok=True)
 
-visited_urls = set()
+SITE_DOMAIN = site_domain(BASE_URL)  # Pages on this domain and its subdomains are crawled
+
+SAVE_MESSAGES = {
+    "saved": "Saved HTML Content",
+    "unchanged": "HTML Content unchanged",
+    "duplicate": "Same HTML Content already saved for another URL",
+}
+
+# Files in data/ are named after the SHA-256 of their content, so the same
+# page or PDF reached through different URLs is stored (and embedded) once
+CONTENT_NAME_RE = re.compile(rf"^[0-9a-f]{{{HASH_NAME_CHARS}}}\.(txt|pdf)$")
+
+# Visited URLs, the frontier and HTTP validators live in the crawl store (crawl_store.py)
 pages_crawled = 0
 
-def sanitize_filename(url):
-    """Converts a URL into a safe filename."""
-    parsed = urlparse(url)
-    clean_name = re.sub(r"[^a-zA-Z0-9]", "_", parsed.path)
-    if not clean_name or clean_name == "_":
-        clean_name = "index"
-    return clean_name[:50]
+def content_path(directory, content_hash, extension):
+    return os.path.join(directory, content_hash[:HASH_NAME_CHARS] + extension)
+
+class HostLimiter:
+    """
+    Per-host politeness: caps concurrent requests to a host and spaces
+    out their start times, while different hosts proceed independently.
+    """
+
+    def __init__(self, limit=PER_HOST_LIMIT, delay=PER_HOST_DELAY):
+        self.limit = limit
+        self.delay = delay
+        self.semaphores = {}
+        self.next_start = {}
+
+    def slot(self, url):
+        host = urlparse(url).netloc
+        if host not in self.semaphores:
+            self.semaphores[host] = asyncio.Semaphore(self.limit)
+            self.next_start[host] = 0.0
+        return _HostSlot(self, host)
+
+class _HostSlot:
+    def __init__(self, limiter, host):
+        self.limiter = limiter
+        self.host = host
+
+    async def __aenter__(self):
+        await self.limiter.semaphores[self.host].acquire()
+        # Reserve the next start time before sleeping, so waiters queue up fairly
+        now = time.monotonic()
+        start = max(now, self.limiter.next_start[self.host])
+        self.limiter.next_start[self.host] = start + self.limiter.delay
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def __aexit__(self, *exc):
+        self.limiter.semaphores[self.host].release()
+
+class Frontier:
+    """
+    BFS queue of (url, depth) shared by all page workers.
+    get() returns None once the queue is empty and no worker can add more.
+    """
+
+    def __init__(self):
+        self.queue = deque()
+        self.in_progress = 0
+        self.changed = asyncio.Condition()
+
+    async def put(self, url, depth):
+        async with self.changed:
+            self.queue.append((url, depth))
+            self.changed.notify()
+
+    async def get(self):
+        async with self.changed:
+            while not self.queue:
+                if self.in_progress == 0:
+                    return None
+                await self.changed.wait()
+            self.in_progress += 1
+            return self.queue.popleft()
 
-def download_pdf_direct(url):
-    """Downloads a PDF using standard requests (lighter than browser)."""
+    async def task_done(self):
+        async with self.changed:
+            self.in_progress -= 1
+            self.changed.notify_all()
+
+async def _skip_heavy_resources(route):
+    # We only want the text, so skip images, fonts and media
+    if route.request.resource_type in ("image", "font", "media"):
+        await route.abort()
+    else:
+        await route.continue_()
+
+class BrowserPool:
+    """
+    A fixed set of isolated browser contexts (one page each).
+    Chromium is only launched the first time a page needs it.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.playwright = None
+        self.browser = None
+        self.pages = asyncio.Queue()
+        self.lock = asyncio.Lock()
+
+    async def _start(self):
+        print("Launching Headless Browser...")
+        self.playwright = await async_playwright().start()
+        self.browser = await self.playwright.chromium.launch(headless=True)
+        for _ in range(self.size):
+            context = await self.browser.new_context(user_agent=HEADERS["User-Agent"])
+            await context.route("**/*", _skip_heavy_resources)
+            await self.pages.put(await context.new_page())
+
+    async def render(self, url):
+        async with self.lock:
+            if self.browser is None:
+                await self._start()
+        page = await self.pages.get()
+        try:
+            await page.goto(url, timeout=PAGE_TIMEOUT * 1000, wait_until="domcontentloaded")
+            # Give client-side rendering a chance to finish, but don't wait a fixed second
+            try:
+                await page.wait_for_load_state("networkidle", timeout=3000)
+            except Exception:
+                pass
+            return page.url, await page.content()  # The URL after any redirects
+        finally:
+            await self.pages.put(page)
+
+    async def close(self):
+        if self.browser:
+            await self.browser.close()
+            await self.playwright.stop()
+
+def needs_javascript(html, text):
+    """Guess whether plain HTML is an empty shell that only JavaScript fills in."""
+    if len(text) < 100:
+        return True
+    lowered = html.lower()
+    return len(text) < 500 and any(marker in lowered for marker in JS_SHELL_MARKERS)
+
+def extract_links(hrefs, page_url, domain):
+    """
+    Returns (page_links, pdf_links) from a page's hrefs, canonicalized
+    (see urls.py) and without repeats. Pages must be on the site's domain.
+    page_url must be the URL as fetched, not its canonical form, or links
+    relative to a "/dir/" page would lose the "dir/".
+    """
+    page_links, pdf_links = {}, {}
+
+    for href in hrefs:
+        full_url = canonicalize_url(href, page_url)
+        if full_url is None:  # mailto:, javascript:, ...
+            continue
+
+        if urlparse(full_url).path.lower().endswith(".pdf"):
+            pdf_links[full_url] = True
+        elif is_internal(full_url, domain) and "logout" not in full_url.lower():
+            page_links[full_url] = True
+
+    return list(page_links), list(pdf_links)
+
+def conditional_headers(store, url):
+    """If-None-Match / If-Modified-Since from the last visit, so unchanged URLs answer 304."""
+    etag, last_modified, _ = store.validators(url)
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    return headers
+
+def release_content(store, url, directory, extension, new_hash):
+    """
+    url no longer has the content it had on the last visit. Deletes that old
+    file unless another URL still has the same content.
+    """
+    _, _, old_hash = store.validators(url)
+    if not old_hash or old_hash == new_hash or store.content_refs(old_hash, url):
+        return
+    old_path = content_path(directory, old_hash, extension)
+    if os.path.exists(old_path):
+        os.remove(old_path)
+
+def save_html_text(store, url, text):
+    """
+    Stores a page's clean text under its content hash.
+    Returns (status, hash): 'saved', 'unchanged', or 'duplicate' when
+    another URL already stored the very same text.
+    """
+    text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    path = content_path(DATA_HTML_DIR, text_hash, ".txt")
+    _, _, old_hash = store.validators(url)
+    if os.path.exists(path):
+        status = "unchanged" if old_hash == text_hash else "duplicate"
+    else:
+        with open(path + ".part", "w", encoding="utf-8") as f:
+            f.write(f"Source: {url}\n\n{text}")
+        os.replace(path + ".part", path)
+        status = "saved"
+    release_content(store, url, DATA_HTML_DIR, ".txt", text_hash)
+    return status, text_hash
+
+def migrate_legacy_files(store):
+    """
+    Renames files saved under URL-based names (before content addressing)
+    to their content hash, dropping copies of the same content, and
+    canonicalizes the URLs in the crawl store so they keep their hashes.
+    """
+    store.canonicalize_urls(canonicalize_url)
+    moved = 0
+    for directory in (DATA_HTML_DIR, DATA_PDF_DIR):
+        for filename in sorted(os.listdir(directory)):
+            extension = os.path.splitext(filename)[1]
+            if extension not in (".txt", ".pdf") or CONTENT_NAME_RE.match(filename):
+                continue
+            path = os.path.join(directory, filename)
+            with open(path, "rb") as f:
+                data = f.read()
+            if extension == ".txt":
+                header, _, text = data.decode("utf-8").partition("\n\n")
+                content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+                if header.startswith("Source: "):
+                    store.set_content_hash(canonicalize_url(header[len("Source: "):]), content_hash)
+            else:
+                content_hash = hashlib.sha256(data).hexdigest()
+            new_path = content_path(directory, content_hash, extension)
+            if os.path.exists(new_path):
+                os.remove(path)
+            else:
+                os.replace(path, new_path)
+            moved += 1
+    if moved:
+        print(f"Moved {moved} files to content-addressed names.")
+
+async def stream_to_file(response, path):
+    """
+    Streams a response body to path in chunks, hashing as it goes.
+    Writes to a .part file first and gives up past MAX_PDF_BYTES.
+    Returns the SHA-256 of the body, or None if it was too big.
+    """
+    declared = int(response.headers.get("content-length") or 0)
+    if declared > MAX_PDF_BYTES:
+        return None
+
+    digest = hashlib.sha256()
+    size = 0
+    temp_path = path + ".part"
     try:
-        response = requests.get(url, timeout=10, stream=True)
-        if response.status_code == 200:
-            filename = sanitize_filename(url) + ".pdf"
-            path = os.path.join(DATA_PDF_DIR, filename)
-            with open(path, "wb") as f:
-                f.write(response.content)
-            print(f"[PDF] Saved: {filename}")
+        with open(temp_path, "wb") as f:
+            async for block in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                size += len(block)
+                if size > MAX_PDF_BYTES:
+                    break
+                digest.update(block)
+                f.write(block)
+    except BaseException:
+        # open() itself may have failed, and that error is the one to report
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(temp_path)
+        raise
+    if size > MAX_PDF_BYTES:
+        os.remove(temp_path)
+        return None
+    return digest.hexdigest()
+
+async def download_pdf(client, limiter, store, url):
+    """
+    Downloads a PDF over plain HTTP (lighter than the browser), streaming it
+    to a temporary file that is then renamed to the content hash.
+    """
+    # Unique per URL, so concurrent downloads never share a temporary file
+    path = os.path.join(DATA_PDF_DIR, "download_" + hashlib.sha256(url.encode("utf-8")).hexdigest()[:16])
+    try:
+        async with limiter.slot(url):
+            async with client.stream("GET", url, headers=conditional_headers(store, url), timeout=PAGE_TIMEOUT) as response:
+                if response.status_code == 304:
+                    store.mark_visited(url, "not_modified")
+                    return
+                if response.status_code != 200:
+                    store.mark_visited(url, f"http_{response.status_code}")
+                    return
+                if not is_internal(str(response.url), SITE_DOMAIN):
+                    store.mark_visited(url, "offsite_redirect")
+                    print(f"[PDF] Redirects off the site to {response.url}, skipped: {url}")
+                    return
+                pdf_hash = await stream_to_file(response, path)
+                headers = response.headers
+
+        if pdf_hash is None:
+            store.mark_visited(url, "too_large")
+            print(f"[PDF] Skipped (over {MAX_PDF_BYTES // (1024 * 1024)} MB): {url}")
+            return
+
+        _, _, old_hash = store.validators(url)
+        final_path = content_path(DATA_PDF_DIR, pdf_hash, ".pdf")
+        if os.path.exists(final_path):
+            status = "unchanged" if pdf_hash == old_hash else "duplicate"
+        else:
+            os.replace(path + ".part", final_path)
+            status = "saved"
+            print(f"[PDF] Saved: {os.path.basename(final_path)} ({url})")
+        release_content(store, url, DATA_PDF_DIR, ".pdf", pdf_hash)
+
+        store.mark_visited(
+            url, status,
+            etag=headers.get("etag"),
+            last_modified=headers.get("last-modified"),
+            content_hash=pdf_hash,
+        )
     except Exception as e:
+        store.mark_visited(url, "failed")
         print(f"[Error] PDF Download failed {url}: {e}")
+    finally:
+        # Left over if the file was a duplicate or anything after the download failed
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path + ".part")
+
+async def pdf_worker(client, limiter, store, pdf_queue):
+    while True:
+        url = await pdf_queue.get()
+        try:
+            await download_pdf(client, limiter, store, url)
+        finally:
+            pdf_queue.task_done()
+
+async def render_in_browser(limiter, browser_pool, url):
+    async with limiter.slot(url):
+        final_url, html = await browser_pool.render(url)
+    text, hrefs = parse_html(html)
+    return {
+        "url": canonicalize_url(final_url) or url, "base": final_url,
+        "html": html, "text": text, "hrefs": hrefs, "not_modified": False, "headers": {},
+    }
 
-def run_crawler():
+async def fetch_page(client, limiter, browser_pool, store, url, mode):
+    """
+    Fetches a page using the configured fetch mode.
+    Returns a dict with the final url (after redirects, canonical), base (the
+    same URL as the server gave it, which relative hrefs resolve against: the
+    canonical form drops the trailing slash of "/hyd/"), html, text (cleaned),
+    hrefs (every link on the page), not_modified and response headers.
+    The HTML is parsed once for both text and links.
+    On a 304 the HTML comes from the crawl store, so links can still be followed.
+    """
+    if mode == "browser":
+        return await render_in_browser(limiter, browser_pool, url)
+
+    async with limiter.slot(url):
+        response = await client.get(url, headers=conditional_headers(store, url), timeout=PAGE_TIMEOUT)
+
+    if response.status_code == 304:
+        html = store.cached_body(url)
+        if html is not None:
+            _, hrefs = parse_html(html)
+            return {"url": url, "base": str(response.url), "html": html, "text": None, "hrefs": hrefs, "not_modified": True, "headers": {}}
+        # We lost the cached copy, so ask again without validators
+        async with limiter.slot(url):
+            response = await client.get(url, timeout=PAGE_TIMEOUT)
+
+    response.raise_for_status()
+    final_url = canonicalize_url(str(response.url)) or url
+    if "html" not in response.headers.get("content-type", "html"):
+        return {"url": final_url, "base": str(response.url), "html": "", "text": "", "hrefs": [], "not_modified": False, "headers": {}}
+    html = response.text
+    text, hrefs = parse_html(html)
+
+    if mode == "auto" and needs_javascript(html, text):
+        print(f"   -> Needs JavaScript, rendering in browser: {url}")
+        return await render_in_browser(limiter, browser_pool, url)
+    return {"url": final_url, "base": str(response.url), "html": html, "text": text, "hrefs": hrefs, "not_modified": False, "headers": response.headers}
+
+async def page_worker(client, limiter, browser_pool, store, frontier, pdf_queue, mode, fingerprints):
     global pages_crawled
-    
-    # Start the Playwright Browser
-    with sync_playwright() as p:
-        print("Launching Headless Browser...")
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
-        
-        # We use a queue for URLs to visit (Breadth-First Search)
-        # Tuple: (url, current_depth)
-        queue = [(BASE_URL, 0)]
-        
-        while queue and pages_crawled < MAX_PAGES:
-            url, depth = queue.pop(0)
-            
-            if url in visited_urls:
+
+    while True:
+        item = await frontier.get()
+        if item is None:
+            return
+        url, depth = item
+
+        try:
+            if pages_crawled >= MAX_PAGES:
                 continue
-            if depth > MAX_DEPTH:
+
+            # A near copy of a page that hasn't changed since is not fetched again
+            original = store.unchanged_duplicate_of(url)
+            if original:
+                store.mark_visited(url, "near_duplicate", duplicate_of=original)
                 continue
-            
-            visited_urls.add(url)
+
             pages_crawled += 1
-            
             print(f"[{pages_crawled}/{MAX_PAGES}] Crawling (Depth {depth}): {url}")
-            
-            try:
-                # 1. Visit the page
-                # 'networkidle' waits until network activity stops (JS finished)
-                page.goto(url, timeout=20000, wait_until="domcontentloaded")
-                
-                # Wait a tiny bit more for React to render specific divs
-                page.wait_for_timeout(1000) 
-                
-                # 2. Get the rendered HTML
-                content = page.content()
-                
-                # 3. Save HTML Text
-                text = clean_html(content)
-                if len(text) > 100: # Only save if meaningful content found
-                    filename = sanitize_filename(url) + ".txt"
-                    with open(os.path.join(DATA_HTML_DIR, filename), "w", encoding="utf-8") as f:
-                        f.write(f"Source: {url}\n\n{text}")
-                    print(f"   -> Saved HTML Content")
-
-                # 4. Extract Links for next round
-                # We parse content with BeautifulSoup because it's easier than Playwright selectors
-                soup = BeautifulSoup(content, "html.parser")
-                
-                for a_tag in soup.find_all("a", href=True):
-                    link = a_tag["href"]
-                    full_url = urljoin(url, link)
-                    
-                    # Remove hash anchors (#section)
-                    full_url = full_url.split("#")[0]
-                    
-                    if full_url in visited_urls:
-                        continue
-                        
-                    # Handle PDFs
-                    if full_url.lower().endswith(".pdf"):
-                        if full_url not in visited_urls:
-                            download_pdf_direct(full_url)
-                            visited_urls.add(full_url)
-                            
-                    # Handle Internal Links
-                    elif "vignan.ac.in" in full_url:
-                        # Avoid logout links or irrelevant pages
-                        if "logout" not in full_url and "javascript" not in full_url:
-                            queue.append((full_url, depth + 1))
-                            
-            except Exception as e:
-                print(f"   [Error] Failed to process {url}: {e}")
-
-        browser.close()
-        print("Crawling Finished.")
+
+            # 1. Get the HTML (plain HTTP or rendered)
+            page = await fetch_page(client, limiter, browser_pool, store, url, mode)
+            if page["url"] != url and not is_internal(page["url"], SITE_DOMAIN):
+                store.mark_visited(url, "offsite_redirect")
+                print(f"   -> Redirects off the site to {page['url']}, not saved")
+                continue
+            if page["url"] != url:
+                # Redirected: the target is crawled (once) under its own URL
+                if not store.enqueue(page["url"], depth, "page"):
+                    store.mark_visited(url, "redirect")
+                    print(f"   -> Redirects to an already crawled page")
+                    continue
+                store.mark_visited(url, "redirect")
+                url = page["url"]
+            content = page["html"]
+            status, text_hash, fingerprint, original = "not_modified", None, None, None
+
+            # 2. Save HTML Text, unless (nearly) the same text is already stored
+            if page["not_modified"]:
+                print(f"   -> Not modified since last crawl")
+            elif len(page["text"]) > 100: # Only save if meaningful content found
+                fingerprint = simhash(page["text"])
+                original = fingerprints.find(fingerprint, ignore=url)
+                if original:
+                    status = "near_duplicate"
+                    text_hash = store.validators(original)[2]
+                    release_content(store, url, DATA_HTML_DIR, ".txt", text_hash)
+                    fingerprints.discard(url)
+                    print(f"   -> Near duplicate of {original}, not saved")
+                else:
+                    status, text_hash = save_html_text(store, url, page["text"])
+                    print(f"   -> {SAVE_MESSAGES[status]}")
+            else:
+                status = "empty"
+
+            # 3. Queue links for the next round
+            if content:
+                page_links, pdf_links = extract_links(page["hrefs"], page["base"], SITE_DOMAIN)
+                for pdf_url in pdf_links:
+                    if store.enqueue(pdf_url, depth + 1, "pdf"):
+                        pdf_queue.put_nowait(pdf_url)
+
+                if depth < MAX_DEPTH:
+                    for link in page_links:
+                        if store.enqueue(link, depth + 1, "page"):
+                            await frontier.put(link, depth + 1)
+
+            # Keep the HTML only when the server gave validators, i.e. when a later 304 can reuse it
+            etag = page["headers"].get("etag")
+            last_modified = page["headers"].get("last-modified")
+            body = content if (etag or last_modified) else None
+            store.mark_visited(url, status, etag, last_modified, text_hash, body, fingerprint, original)
+            # Only now, so a near duplicate found meanwhile never sees the old content hash
+            if status in SAVE_MESSAGES:
+                fingerprints.add(fingerprint, url)
+
+        except Exception as e:
+            store.mark_visited(url, "failed")
+            print(f"   [Error] Failed to process {url}: {e}")
+        finally:
+            await frontier.task_done()
+
+async def crawl(mode=FETCH_MODE, concurrency=CONCURRENCY, resume=True):
+    global pages_crawled
+
+    store = CrawlStore()
+    limiter = HostLimiter()
+    frontier = Frontier()
+    pdf_queue = asyncio.Queue()
+    browser_pool = BrowserPool(concurrency)
+
+    migrate_legacy_files(store)
+    fingerprints = SimHashIndex()
+    for url, fingerprint in store.fingerprints():
+        fingerprints.add(fingerprint, url)
+
+    # Either continue an interrupted run or start a fresh one from BASE_URL
+    for url, depth, kind in store.start_run(canonicalize_url(BASE_URL), resume=resume):
+        if kind == "pdf":
+            pdf_queue.put_nowait(url)
+        else:
+            await frontier.put(url, depth)
+    pages_crawled = store.pages_visited()
+
+    limits = httpx.Limits(max_connections=concurrency + PDF_WORKERS)
+    async with httpx.AsyncClient(headers=HEADERS, follow_redirects=True, limits=limits) as client:
+        pdf_tasks = [asyncio.create_task(pdf_worker(client, limiter, store, pdf_queue)) for _ in range(PDF_WORKERS)]
+        try:
+            await asyncio.gather(*(
+                page_worker(client, limiter, browser_pool, store, frontier, pdf_queue, mode, fingerprints)
+                for _ in range(concurrency)
+            ))
+            await pdf_queue.join()
+            store.finish_run()
+        finally:
+            for task in pdf_tasks:
+                task.cancel()
+            await browser_pool.close()
+            store.close()
+
+def run_crawler(mode=FETCH_MODE, concurrency=CONCURRENCY, resume=True):
+    started = time.perf_counter()
+    asyncio.run(crawl(mode, concurrency, resume))
+    elapsed = time.perf_counter() - started
+    print(f"Crawling Finished. {pages_crawled} pages in {elapsed:.1f}s ({pages_crawled / max(elapsed, 1e-9):.2f} pages/sec)")
 
 if __name__ == "__main__":
-    run_crawler()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Crawl the university website into data/.")
+    parser.add_argument("--mode", choices=["http", "browser", "auto"], default=FETCH_MODE)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--fresh", action="store_true", help="Start a new run even if the last one was interrupted")
+    args = parser.parse_args()
+
+    run_crawler(args.mode, args.concurrency, resume=not args.fresh)
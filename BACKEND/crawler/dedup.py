@@ -0,0 +1,89 @@
+# backend/crawler/dedup.py
+#
+# Near-duplicate detection for whole documents with 64-bit SimHash.
+# The same notice is often reachable under several paths with small
+# differences (a date, a breadcrumb); those pages should be stored and
+# embedded once. Exact copies are already caught by the content-addressed
+# file names (see crawler.py), this catches the almost-exact ones.
+
+import hashlib
+
+import numpy as np
+
+# --- Settings ---
+SHINGLE_WORDS = 3
+MAX_DISTANCE = 3        # Fingerprints at most this many bits apart are near duplicates
+MIN_WORDS = 20          # Shorter texts give unreliable fingerprints and are never matched
+BLOCKS = MAX_DISTANCE + 1  # 4 x 16-bit blocks: two fingerprints within 3 bits share at least one block exactly
+
+def _shingle_hash(shingle):
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+
+def simhash(text):
+    """
+    64-bit SimHash of a text's word 3-grams, as a 16-character hex string,
+    or None if the text is too short to fingerprint.
+    """
+    words = text.lower().split()
+    if len(words) < MIN_WORDS:
+        return None
+
+    shingles = [" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)]
+    hashes = np.fromiter((_shingle_hash(s) for s in shingles), dtype="<u8", count=len(shingles))
+    # One row of 64 bits per shingle; each bit votes +1 or -1
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(shingles)
+    fingerprint = np.packbits(votes > 0, bitorder="little").view("<u8")[0]
+    return f"{int(fingerprint):016x}"
+
+def distance(a, b):
+    """Number of differing bits between two fingerprints."""
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+class SimHashIndex:
+    """
+    Remembers fingerprints and finds a stored one within MAX_DISTANCE bits.
+    Each fingerprint is filed under its BLOCKS blocks, so a lookup only
+    compares against fingerprints that share a block instead of all of them.
+    """
+
+    def __init__(self, max_distance=MAX_DISTANCE):
+        self.max_distance = max_distance
+        self.block_bits = 64 // BLOCKS
+        self.buckets = [{} for _ in range(BLOCKS)]
+        self.fingerprints = {}  # key -> fingerprint
+
+    def _blocks(self, fingerprint):
+        value = int(fingerprint, 16)
+        mask = (1 << self.block_bits) - 1
+        for block in range(BLOCKS):
+            yield block, (value >> (block * self.block_bits)) & mask
+
+    def find(self, fingerprint, ignore=None):
+        """Key of a near-duplicate fingerprint added before (other than `ignore`), or None."""
+        if fingerprint is None:
+            return None
+        for block, value in self._blocks(fingerprint):
+            for key in self.buckets[block].get(value, ()):
+                if key != ignore and distance(fingerprint, self.fingerprints[key]) <= self.max_distance:
+                    return key
+        return None
+
+    def add(self, fingerprint, key):
+        """Files key under fingerprint, replacing what was stored for it before."""
+        self.discard(key)
+        if fingerprint is None:
+            return
+        self.fingerprints[key] = fingerprint
+        for block, value in self._blocks(fingerprint):
+            self.buckets[block].setdefault(value, []).append(key)
+
+    def discard(self, key):
+        fingerprint = self.fingerprints.pop(key, None)
+        if fingerprint is None:
+            return
+        for block, value in self._blocks(fingerprint):
+            keys = self.buckets[block][value]
+            keys.remove(key)
+            if not keys:
+                del self.buckets[block][value]
@@ -1,30 +1,240 @@
 # backend/crawler/html_cleaner.py
 
-from bs4 import BeautifulSoup
+import os
 import re
+import sys
+from functools import lru_cache
+from bs4 import BeautifulSoup
+
+# Add the backend directory to python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import HTML_PARSER
+
+# --- Optional fast parsers ---
+# selectolax (lexbor) and lxml parse in C and are 5-30x faster than
+# BeautifulSoup's pure-Python html.parser. Both are optional.
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser as SelectolaxParser
+    except ImportError:
+        SelectolaxParser = None
+
+try:
+    import lxml.html as lxml_html
+except ImportError:
+    lxml_html = None
+
+BACKENDS = ("selectolax", "lxml", "html.parser")
+
+# --- What counts as page chrome rather than content ---
+# Never text: code, styling, embedded media, dropdown option lists
+REMOVE_TAGS = ("script", "style", "noscript", "template", "svg", "iframe", "select", "header", "footer", "nav", "aside")
+# Menus and footers that are plain <div>s, recognised by class / id / ARIA role.
+# A class or id must be one of these words as a whole token, optionally with
+# a site-/main-style prefix and a -links/-wrapper-style suffix: "site-footer"
+# and "social-links" match, "nav-open" and "main-sidebar-layout" don't.
+BOILERPLATE_RE = re.compile(
+    r"(?:(?:site|main|top|primary|global|mobile|page)[-_])?"
+    r"(?:nav|navbar|navigation|menu|menubar|megamenu|footer|sidebar|breadcrumbs?"
+    r"|cookies?|social|share|sharing|skip-link|popup|modal|offcanvas)"
+    r"(?:[-_](?:links?|items?|bar|menu|wrapper|container|area|widget|icons?|buttons?|banner|notice))?",
+    re.IGNORECASE,
+)
+BOILERPLATE_ROLES = {"navigation", "banner", "contentinfo", "search", "menu", "menubar", "complementary"}
+# If one of these has at least MIN_MAIN_CHARS of text, only it is kept
+MAIN_SELECTORS = ("main", "[role=main]", "article")
+MIN_MAIN_CHARS = 200  # Not counting whitespace, which the parsers keep differently
+# Never removed as boilerplate, nor is anything that contains one of them
+CONTENT_TAGS = ("html", "body", "main", "article")
+CONTENT_SELECTOR = "main, article, [role=main]"
+
+# Elements that start a new line of text
+BLOCK_TAGS = (
+    "p", "div", "section", "article", "main", "li", "tr", "td", "th", "br", "hr",
+    "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "dt", "dd", "table", "ul", "ol", "form", "title",
+)
+
+XML_DECLARATION_RE = re.compile(r"^\s*<\?xml[^>]*\?>")
+
+# Newlines and runs of 2+ spaces separate blocks of text
+SEPARATOR_RE = re.compile(r"\s*\n\s*| {2,}")
+WHITESPACE_RE = re.compile(r"\s+")
 
-def clean_html(html_content):
+def normalize_text(text):
     """
-    Takes raw HTML string, removes scripts/styles/tags,
-    and returns clean, readable text.
+    One pass over the extracted text: every newline or run of spaces becomes
+    a line break, lines are stripped and blank lines dropped.
     """
-    if not html_content:
+    return "\n".join(piece for piece in (part.strip() for part in SEPARATOR_RE.split(text)) if piece)
+
+def has_enough_text(text):
+    """True if a content root candidate holds MIN_MAIN_CHARS of non-whitespace text."""
+    return len(WHITESPACE_RE.sub("", text)) >= MIN_MAIN_CHARS
+
+def is_boilerplate(tag, attributes):
+    """True for elements that look like navigation, footers or pop-ups."""
+    role = (attributes.get("role") or "").lower()
+    if tag in CONTENT_TAGS or role == "main":
+        return False
+    if role in BOILERPLATE_ROLES:
+        return True
+    for name in ("class", "id"):
+        value = attributes.get(name) or ""
+        if isinstance(value, list):  # BeautifulSoup gives class as a list
+            value = " ".join(value)
+        if any(BOILERPLATE_RE.fullmatch(token) for token in value.split()):
+            return True
+    return False
+
+def default_backend():
+    """The fastest installed backend."""
+    if SelectolaxParser is not None:
+        return "selectolax"
+    if lxml_html is not None:
+        return "lxml"
+    return "html.parser"
+
+@lru_cache(maxsize=None)
+def resolve_backend(name):
+    if name == "auto":
+        return default_backend()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown HTML_PARSER '{name}'. Use 'auto' or one of {BACKENDS}")
+    if (name == "selectolax" and SelectolaxParser is None) or (name == "lxml" and lxml_html is None):
+        print(f"HTML parser '{name}' is not installed, using {default_backend()}.")
+        return default_backend()
+    return name
+
+# --- Backends ---
+# Each returns the raw text of the main content, with "\n" after block elements.
+# If given a list as `hrefs`, they also append the href of every link on the
+# page (menus included), collected before anything is removed.
+# The content root (<main> etc., else the whole page) is chosen before the
+# boilerplate pass, and that pass only looks inside it, so a wrapper whose
+# class happens to look like a menu can never take the content with it.
+
+def _decompose_outermost(doomed):
+    # Freeing a node frees its subtree, so skip nodes inside one we already removed
+    doomed_ids = {node.mem_id for node in doomed}
+    for node in doomed:
+        parent = node.parent
+        while parent is not None and parent.mem_id not in doomed_ids:
+            parent = parent.parent
+        if parent is None:
+            node.decompose()
+
+def _text_selectolax(html_content, hrefs=None):
+    root = SelectolaxParser(html_content).root
+    if root is None:
         return ""
 
+    if hrefs is not None:
+        hrefs.extend(node.attributes.get("href") or "" for node in root.css("a[href]"))
+
+    _decompose_outermost(root.css(", ".join(REMOVE_TAGS)))
+
+    for selector in MAIN_SELECTORS:
+        main = root.css_first(selector)
+        if main is not None and has_enough_text(main.text()):
+            root = main
+            break
+
+    _decompose_outermost([
+        node for node in root.css("[class], [id], [role]")
+        if is_boilerplate(node.tag, node.attributes) and node.css_first(CONTENT_SELECTOR) is None
+    ])
+
+    for node in root.css(", ".join(BLOCK_TAGS)):
+        node.insert_after("\n")
+    return root.text(deep=True)
+
+def _text_lxml(html_content, hrefs=None):
+    try:
+        # lxml refuses str input that still declares an encoding
+        root = lxml_html.document_fromstring(XML_DECLARATION_RE.sub("", html_content))
+    except Exception:  # e.g. a document with no elements at all
+        return ""
+
+    if hrefs is not None:
+        hrefs.extend(element.get("href") for element in root.iter("a") if element.get("href") is not None)
+
+    for element in list(root.iter(*REMOVE_TAGS)):
+        element.drop_tree()
+
+    for selector in ("main", "*[@role='main']", "article"):
+        found = root.xpath(f"//{selector}")
+        if found and has_enough_text(found[0].text_content()):
+            root = found[0]
+            break
+
+    for element in list(root.iterdescendants()):
+        if (
+            isinstance(element.tag, str) and is_boilerplate(element.tag, element.attrib)
+            and element.getparent() is not None
+            and not element.xpath(".//main|.//article|.//*[@role='main']")
+        ):
+            element.drop_tree()
+
+    for element in root.iter(*BLOCK_TAGS):
+        element.tail = "\n" + (element.tail or "")
+    return root.text_content()
+
+def _text_html_parser(html_content, hrefs=None):
     soup = BeautifulSoup(html_content, "html.parser")
 
-    # 1. Remove javascript and css
-    for script in soup(["script", "style", "header", "footer", "nav"]):
-        script.extract()
+    if hrefs is not None:
+        hrefs.extend(a_tag["href"] for a_tag in soup.find_all("a", href=True))
+
+    for element in soup(list(REMOVE_TAGS)):
+        element.decompose()
+
+    root = soup
+    for selector in MAIN_SELECTORS:
+        main = soup.select_one(selector)
+        if main is not None and has_enough_text(main.get_text()):
+            root = main
+            break
 
-    # 2. Get text
-    text = soup.get_text()
+    for element in root.find_all(True):
+        if (
+            not element.decomposed and is_boilerplate(element.name, element.attrs)
+            and element.select_one(CONTENT_SELECTOR) is None
+        ):
+            element.decompose()
 
-    # 3. Break into lines and remove leading/trailing space on each
-    lines = (line.strip() for line in text.splitlines())
+    for element in root.find_all(list(BLOCK_TAGS)):
+        element.insert_after("\n")
+    return root.get_text()
 
-    # 4. Drop blank lines
-    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-    text = '\n'.join(chunk for chunk in chunks if chunk)
+_EXTRACTORS = {
+    "selectolax": _text_selectolax,
+    "lxml": _text_lxml,
+    "html.parser": _text_html_parser,
+}
+
+def clean_html(html_content, backend=None):
+    """
+    Takes raw HTML string, removes scripts/styles/menus/footers,
+    and returns clean, readable text: one block of text per line.
+    backend: "selectolax", "lxml" or "html.parser" (default: HTML_PARSER from config).
+    """
+    if not html_content:
+        return ""
+
+    text = _EXTRACTORS[resolve_backend(backend or HTML_PARSER)](html_content)
+    return normalize_text(text)
+
+def parse_html(html_content, backend=None):
+    """
+    Like clean_html, but also returns the href of every link on the page,
+    from the same parse. Returns (text, hrefs).
+    """
+    if not html_content:
+        return "", []
 
-    return text
\ No newline at end of file
+    hrefs = []
+    text = _EXTRACTORS[resolve_backend(backend or HTML_PARSER)](html_content, hrefs)
+    return normalize_text(text), hrefs
@@ -1,17 +1,71 @@
 # backend/crawler/pdf_reader.py
 
+import os
+from concurrent.futures import ProcessPoolExecutor
 import fitz  # This is PyMuPDF
 
-def extract_pdf_text(filepath):
+# --- Settings ---
+PAGES_PER_TASK = 16  # Big PDFs are split into page ranges of this size across cores
+
+def _extract_page_range(task):
     """
-    Opens a PDF file and returns all text as a single string.
+    Worker: returns [(page_number, text), ...] for pages start..end-1 of one PDF.
+    Page numbers are 1-based, like a PDF viewer shows them.
+    """
+    filepath, start, end = task
+    try:
+        with fitz.open(filepath) as doc:
+            return [(number + 1, doc[number].get_text()) for number in range(start, end)]
+    except Exception as e:
+        print(f"Error reading PDF {filepath} (pages {start + 1}-{end}): {e}")
+        return []
+
+def page_count(filepath):
+    with fitz.open(filepath) as doc:
+        return doc.page_count
+
+def extract_pdf_pages(filepath):
+    """
+    Opens a PDF file and returns its text page by page: [(page_number, text), ...]
     """
     try:
-        doc = fitz.open(filepath)
-        text = ""
-        for page in doc:
-            text += page.get_text() + "\n"
-        return text
+        pages = page_count(filepath)
     except Exception as e:
         print(f"Error reading PDF {filepath}: {e}")
-        return ""
\ No newline at end of file
+        return []
+    return _extract_page_range((filepath, 0, pages))
+
+def extract_pdf_text(filepath):
+    """
+    Opens a PDF file and returns all text as a single string.
+    """
+    return "".join(text + "\n" for _, text in extract_pdf_pages(filepath))
+
+def extract_pdfs_parallel(filepaths, workers=None):
+    """
+    Extracts many PDFs at once on a process pool. Large PDFs are cut into
+    page ranges, so one big document is spread over all cores instead of
+    keeping a single core busy while the others sit idle.
+    Returns {filepath: [(page_number, text), ...]} (empty list on errors).
+    """
+    tasks = []
+    results = {}
+    for filepath in filepaths:
+        results[filepath] = []
+        try:
+            pages = page_count(filepath)
+        except Exception as e:
+            print(f"Error reading PDF {filepath}: {e}")
+            continue
+        for start in range(0, pages, PAGES_PER_TASK):
+            tasks.append((filepath, start, min(start + PAGES_PER_TASK, pages)))
+
+    if not tasks:
+        return results
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        # map() keeps task order, so each file's ranges come back in page order
+        for task, pages in zip(tasks, pool.map(_extract_page_range, tasks, chunksize=1)):
+            results[task[0]].extend(pages)
+    return results
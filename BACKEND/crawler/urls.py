@@ -0,0 +1,82 @@
+# backend/crawler/urls.py
+#
+# URL canonicalization, so one page reached through different-looking links
+# ("/alumni/", "/alumni?utm_source=x", "https://WWW.vignan.ac.in:443/alumni#top")
+# is queued, fetched and stored once.
+
+import re
+import string
+from urllib.parse import parse_qsl, quote, urlencode, urljoin, urlsplit, urlunsplit
+
+# Query parameters that only track the visitor and never change the page
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "yclid", "mc_cid", "mc_eid", "_ga", "_gl", "phpsessid", "jsessionid"}
+TRACKING_PREFIXES = ("utm_",)
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+# Characters that may stay unescaped in a path (RFC 3986 pchar plus "/")
+PATH_SAFE = "/:@!$&'()*+,;=-._~"
+DUPLICATE_SLASHES_RE = re.compile(r"/{2,}")
+PERCENT_ESCAPE_RE = re.compile(r"%([0-9A-Fa-f]{2})")
+# Only escapes of these characters mean the same unescaped (RFC 3986 6.2.2.2);
+# "%2F" is not "/", so it must stay an escape
+UNRESERVED = frozenset(string.ascii_letters + string.digits + "-._~")
+
+def _is_tracking(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+def _normalize_path(path):
+    """Decodes escaped unreserved characters, upper-cases the other escapes and escapes the rest."""
+    pieces = PERCENT_ESCAPE_RE.split(path)  # Text, hex, text, hex, ..., text
+    for i, piece in enumerate(pieces):
+        if i % 2:
+            char = chr(int(piece, 16))
+            pieces[i] = char if char in UNRESERVED else "%" + piece.upper()
+        else:
+            pieces[i] = quote(piece, safe=PATH_SAFE)
+    return "".join(pieces)
+
+def canonicalize_url(url, base=None):
+    """
+    Returns the canonical form of url (resolved against base), or None for
+    links that are not web pages (mailto:, tel:, javascript:, ...).
+
+    - scheme and host lower-cased, default ports and #fragments dropped
+    - percent-escapes normalized, "//" collapsed, trailing slash removed
+    - tracking parameters dropped, the rest sorted by name
+    """
+    url = (url or "").strip()
+    if base:
+        url = urljoin(base, url)
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:  # e.g. an invalid port or IPv6 address
+        return None
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return None
+
+    host = parts.hostname.lower().rstrip(".")
+    if port and port != DEFAULT_PORTS[scheme]:
+        host = f"{host}:{port}"
+
+    path = _normalize_path(DUPLICATE_SLASHES_RE.sub("/", parts.path))
+    if len(path) > 1:
+        path = path.rstrip("/")
+    path = path or "/"
+
+    params = [(name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True) if not _is_tracking(name)]
+    query = urlencode(sorted(params))
+
+    return urlunsplit((scheme, host, path, query, ""))
+
+def site_domain(url):
+    """The registrable part of a site's host: "https://www.vignan.ac.in" -> "vignan.ac.in"."""
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+def is_internal(url, domain):
+    """True if url is on domain or one of its subdomains (not just containing it, like "vignan.ac.in.evil.com")."""
+    host = (urlsplit(url).hostname or "").lower()
+    return host == domain or host.endswith("." + domain)
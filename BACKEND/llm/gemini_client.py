@@ -1,15 +1,40 @@
 # backend/llm/gemini_client.py
 
-import google.generativeai as genai
+import asyncio
+import json
+import httpx
+import itertools
 import sys
 import os
+import time
+from functools import lru_cache
 
 # --- Path Setup ---
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import GEMINI_API_KEY
+import metrics
+from config import (
+    GEMINI_API_KEY, GEMINI_API_ENDPOINT, MAX_CONCURRENT_GEMINI_CALLS, QUERY_EMBED_TIMEOUT,
+    GEMINI_TIMEOUT, GEMINI_DEADLINE, GEMINI_RETRIES, GEMINI_HEDGE_AFTER, BREAKER_FAILURES, BREAKER_RESET_SECONDS,
+    GEMINI_RPM, GEMINI_TPM, EMBEDDING_RPM, EMBEDDING_TPM, RATE_LIMIT_FILE, EMBEDDING_DIM,
+)
+from llm.resilience import (
+    CircuitBreaker, CircuitOpenError, DeadlineExceeded, QuotaExhausted,
+    backoff_delay, is_rate_limited, is_retryable, should_fall_back,
+)
+from llm.rate_limiter import BULK, INTERACTIVE, RateLimiter
 
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+# --- SDK (sync path) ---
+# google.generativeai takes over half a second to import, and the server's
+# async path never needs it (it uses httpx, see below), so it is imported
+# and configured on first use. use_endpoint changes the settings.
+_sdk_options = {"api_key": GEMINI_API_KEY} if GEMINI_API_KEY else {}
+
+@lru_cache(maxsize=None)
+def sdk():
+    """The configured google.generativeai module."""
+    import google.generativeai as genai
+    genai.configure(**_sdk_options)
+    return genai
 
 # --- 🏆 MODEL CONFIGURATION (UPDATED) ---
 # We are using your available "gemini-2.5-flash" for the best speed/accuracy balance.
@@ -17,57 +42,576 @@ MODEL_NAME = "gemini-2.5-flash"
 
 # Standard embedding model (usually works with all accounts)
 EMBEDDING_MODEL = "models/text-embedding-004"
+# With EMBEDDING_DIM set, the model returns that many dimensions instead of 768
+# (the leading ones of its full vector, so they still work for cosine search).
+EMBEDDING_OPTIONS = {"output_dimensionality": EMBEDDING_DIM} if EMBEDDING_DIM else {}
+
+# Returned instead of an answer when Gemini can't be reached
+UNAVAILABLE_MESSAGE = "I'm having trouble connecting to the AI server right now."
+# Appended when a streamed answer breaks off halfway
+INTERRUPTED_MESSAGE = "\n\n(The response was interrupted.)"
+
+# The API accepts at most 100 texts per batchEmbedContents request
+EMBED_BATCH_LIMIT = 100
+
+# Gemini averages about 4 characters of English text per token
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text):
+    """
+    Cheap local token estimate, for budgeting chunks and prompts.
+    (count_tokens would be exact but costs an API round trip.)
+    """
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+def log_prompt_size(prompt):
+    """One log line per Gemini request, to keep an eye on input token costs."""
+    tokens = estimate_tokens(prompt)
+    metrics.count("tokens_total", tokens, direction="input")
+    print(f"Gemini request: ~{tokens} input tokens")
+
+# --- Resilience (see llm/resilience.py) ---
+# Every answer gets GEMINI_DEADLINE seconds in total, each attempt at most
+# GEMINI_TIMEOUT. Rate limits, 5xx errors and timeouts are retried with
+# jittered backoff. If the primary model is missing, overloaded or switched
+# off by its circuit breaker, FALLBACK_MODEL answers instead.
+FALLBACK_MODEL = "gemini-pro-latest"
+RETRY_BACKOFF_BASE = 0.5  # Seconds; doubles after every failed attempt
+RETRY_BACKOFF_MAX = 4.0
+
+breakers = {name: CircuitBreaker(name, BREAKER_FAILURES, BREAKER_RESET_SECONDS) for name in (MODEL_NAME, FALLBACK_MODEL)}
+metrics.register_gauge(
+    "gemini_breakers_open", "Gemini models switched off by their circuit breaker.",
+    lambda: sum(breaker.state == "open" for breaker in breakers.values()),
+)
+
+# --- Shared quota (see llm/rate_limiter.py) ---
+# Every call first takes one request and its estimated input tokens from the
+# model's buckets; output tokens are charged once known. Chat and question
+# embeddings are INTERACTIVE, re-index embedding (embed_texts) is BULK.
+limiter = RateLimiter(
+    {
+        **{f"{name}:requests": GEMINI_RPM for name in (MODEL_NAME, FALLBACK_MODEL)},
+        **{f"{name}:tokens": GEMINI_TPM for name in (MODEL_NAME, FALLBACK_MODEL)},
+        f"{EMBEDDING_MODEL}:requests": EMBEDDING_RPM,
+        f"{EMBEDDING_MODEL}:tokens": EMBEDDING_TPM,
+    },
+    RATE_LIMIT_FILE,
+)
+
+metrics.register_gauge(
+    "gemini_quota_scale", "Lowest share of its budget any Gemini quota bucket is running at (below 1 after 429s).",
+    lambda: min(limiter.scales().values(), default=1.0),
+)
+
+def _quota(model_name, tokens, requests=1):
+    return {f"{model_name}:requests": requests, f"{model_name}:tokens": tokens}
+
+def _note_rate_limit(model_name, error):
+    """A 429 means the real budget is smaller than ours: slow every process down."""
+    if is_rate_limited(error):
+        limiter.penalize(list(_quota(model_name, 0)))
+
+async def _note_rate_limit_async(model_name, error):
+    if is_rate_limited(error):
+        await limiter.penalize_async(list(_quota(model_name, 0)))
+
+def _embed_cost(texts):
+    return _quota(EMBEDDING_MODEL, sum(estimate_tokens(text) for text in texts))
+
+@lru_cache(maxsize=None)
+def get_model(model_name):
+    """GenerativeModel objects are reusable, so each model is built once."""
+    return sdk().GenerativeModel(model_name)
+
+def _attempt_timeout(deadline):
+    """Seconds the next attempt may take."""
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceeded(f"No answer within {GEMINI_DEADLINE}s")
+    return min(GEMINI_TIMEOUT, remaining)
+
+def _record_failure(model_name, error):
+    _note_rate_limit(model_name, error)
+    _count_failure(model_name, error)
+
+async def _record_failure_async(model_name, error):
+    await _note_rate_limit_async(model_name, error)
+    _count_failure(model_name, error)
+
+def _count_failure(model_name, error):
+    # Only upstream trouble counts against a model, not e.g. a rejected prompt
+    if should_fall_back(error) and not isinstance(error, (CircuitOpenError, QuotaExhausted)):
+        breakers[model_name].record_failure()
+
+def _retry_delay(model_name, attempt, error, deadline):
+    """Seconds to wait before trying again, or None to give up."""
+    if attempt >= GEMINI_RETRIES or not is_retryable(error):
+        return None
+    delay = backoff_delay(attempt, RETRY_BACKOFF_BASE, RETRY_BACKOFF_MAX)
+    if time.monotonic() + delay >= deadline:
+        return None
+    print(f"⚠️ Gemini error on '{model_name}' ({error}). Retrying in {delay:.1f}s...")
+    metrics.count("retries_total", model=model_name)
+    return delay
+
+def _call_with_retries(model_name, call, deadline):
+    """Runs call(model_name, timeout) behind the model's circuit breaker, retrying transient errors."""
+    for attempt in itertools.count():
+        try:
+            breakers[model_name].check()
+            result = call(model_name, _attempt_timeout(deadline))
+        except Exception as e:
+            _record_failure(model_name, e)
+            delay = _retry_delay(model_name, attempt, e, deadline)
+            if delay is None:
+                raise
+            time.sleep(delay)
+        else:
+            breakers[model_name].record_success()
+            return result
+
+def _generate(model_name, prompt, timeout):
+    timeout -= limiter.acquire(_quota(model_name, estimate_tokens(prompt)), INTERACTIVE, timeout)
+    with metrics.timed("gemini_generate"):
+        text = get_model(model_name).generate_content(prompt, request_options={"timeout": timeout}).text
+    output_tokens = estimate_tokens(text)
+    metrics.count("tokens_total", output_tokens, direction="output")
+    limiter.debit(_quota(model_name, output_tokens, requests=0))
+    return text
 
 def ask_gemini(prompt):
     """
     Sends a prompt to Gemini and gets the text response.
+    Gives up after GEMINI_DEADLINE seconds and returns UNAVAILABLE_MESSAGE.
     """
+    log_prompt_size(prompt)
+    deadline = time.monotonic() + GEMINI_DEADLINE
+    generate = lambda model_name, timeout: _generate(model_name, prompt, timeout)
     try:
-        model = genai.GenerativeModel(MODEL_NAME)
-        response = model.generate_content(prompt)
-        return response.text
+        try:
+            return _call_with_retries(MODEL_NAME, generate, deadline)
+        except Exception as e:
+            if not should_fall_back(e):
+                raise
+            # --- FALLBACK LOGIC ---
+            print(f"⚠️ Primary model failed ({e}). Switching to '{FALLBACK_MODEL}'...")
+            metrics.count("fallbacks_total", kind="gemini_model")
+            return _call_with_retries(FALLBACK_MODEL, generate, deadline)
     except Exception as e:
         print(f"❌ Gemini API Error: {e}")
-        
-        # --- FALLBACK LOGIC ---
-        # If 2.5 Flash fails, try the "Latest Pro" alias which is very safe
-        if "404" in str(e) or "not found" in str(e):
-            print("⚠️ Primary model failed. Switching to 'gemini-pro-latest'...")
+        metrics.count("errors_total", stage="gemini")
+        return UNAVAILABLE_MESSAGE
+
+def _stream_text(model_name, prompt, timeout):
+    timeout -= limiter.acquire(_quota(model_name, estimate_tokens(prompt)), INTERACTIVE, timeout)
+    output_tokens = 0
+    try:
+        with metrics.timed("gemini_stream"):
+            started, first = time.perf_counter(), True
+            response = get_model(model_name).generate_content(prompt, stream=True, request_options={"timeout": timeout})
+            for chunk in response:
+                try:
+                    text = chunk.text
+                except ValueError:
+                    continue  # A chunk with no text parts (e.g. only a finish reason)
+                if text:
+                    if first:
+                        metrics.observe("gemini_first_token", time.perf_counter() - started)
+                        first = False
+                    metrics.count("tokens_total", estimate_tokens(text), direction="output")
+                    output_tokens += estimate_tokens(text)
+                    yield text
+    finally:
+        limiter.debit(_quota(model_name, output_tokens, requests=0))
+
+def ask_gemini_stream(prompt):
+    """
+    Like ask_gemini, but yields the answer in pieces as Gemini generates it,
+    so the user sees the first words right away. Retries and the fallback
+    model are only possible until the first piece has been sent.
+    """
+    log_prompt_size(prompt)
+    deadline = time.monotonic() + GEMINI_DEADLINE
+    started = False
+    error = None
+    for model_name in (MODEL_NAME, FALLBACK_MODEL):
+        for attempt in itertools.count():
             try:
-                fallback_model = genai.GenerativeModel("gemini-pro-latest")
-                response = fallback_model.generate_content(prompt)
-                return response.text
-            except Exception as e2:
-                return f"Server Error: {e2}"
-                
-        return "I'm having trouble connecting to the AI server right now."
+                breakers[model_name].check()
+                for text in _stream_text(model_name, prompt, _attempt_timeout(deadline)):
+                    started = True
+                    yield text
+                breakers[model_name].record_success()
+                return
+            except Exception as e:
+                error = e
+                _record_failure(model_name, e)
+                # Once words have reached the user we can't restart with another model
+                if started:
+                    print(f"❌ Gemini API Error: {e}")
+                    metrics.count("errors_total", stage="gemini")
+                    yield INTERRUPTED_MESSAGE
+                    return
+                delay = _retry_delay(model_name, attempt, e, deadline)
+                if delay is None:
+                    break
+                time.sleep(delay)
+
+        if model_name == FALLBACK_MODEL or not should_fall_back(error):
+            break
+        # --- FALLBACK LOGIC ---
+        print(f"⚠️ Primary model failed ({error}). Switching to '{FALLBACK_MODEL}'...")
+        metrics.count("fallbacks_total", kind="gemini_model")
+
+    print(f"❌ Gemini API Error: {error}")
+    metrics.count("errors_total", stage="gemini")
+    yield UNAVAILABLE_MESSAGE
+
+def is_error_reply(text):
+    """True if ask_gemini returned one of its error messages instead of an answer."""
+    return text == UNAVAILABLE_MESSAGE or text.startswith("Server Error:") or text.endswith(INTERRUPTED_MESSAGE)
 
 def embed_text(text):
     """
     Converts document text into a vector list for storage.
     """
     try:
-        result = genai.embed_content(
+        limiter.acquire(_embed_cost([text]), BULK)
+        result = sdk().embed_content(
             model=EMBEDDING_MODEL,
             content=text,
-            task_type="retrieval_document"
+            task_type="retrieval_document",
+            **EMBEDDING_OPTIONS,
         )
         return result["embedding"]
     except Exception as e:
+        _note_rate_limit(EMBEDDING_MODEL, e)
         print(f"❌ Embedding Error: {e}")
         return []
 
+def embed_texts(texts, priority=BULK):
+    """
+    Converts a list of document texts into vectors with ONE batched request.
+    Unlike embed_text, errors are raised so the caller can decide to retry.
+    Waits as long as it takes for quota: bulk work never gets ahead of chat.
+    """
+    if not texts:
+        return []
+    if len(texts) > EMBED_BATCH_LIMIT:
+        raise ValueError(f"embed_texts takes at most {EMBED_BATCH_LIMIT} texts, got {len(texts)}")
+
+    limiter.acquire(_embed_cost(texts), priority)
+    try:
+        with metrics.timed("embed_documents"):
+            result = sdk().embed_content(
+                model=EMBEDDING_MODEL,
+                content=list(texts),
+                task_type="retrieval_document",
+                **EMBEDDING_OPTIONS,
+            )
+    except Exception as e:
+        _note_rate_limit(EMBEDDING_MODEL, e)
+        raise
+    return result["embedding"]
+
 def embed_query(text):
     """
     Converts a USER QUESTION into a vector for searching.
     """
     try:
-        result = genai.embed_content(
-            model=EMBEDDING_MODEL,
-            content=text,
-            task_type="retrieval_query"
-        )
+        timeout = QUERY_EMBED_TIMEOUT - limiter.acquire(_embed_cost([text]), INTERACTIVE, QUERY_EMBED_TIMEOUT)
+        with metrics.timed("embed_query"):
+            result = sdk().embed_content(
+                model=EMBEDDING_MODEL,
+                content=text,
+                task_type="retrieval_query",
+                **EMBEDDING_OPTIONS,
+                request_options={"timeout": timeout},
+            )
         return result["embedding"]
     except Exception as e:
+        _note_rate_limit(EMBEDDING_MODEL, e)
+        print(f"❌ Query Embedding Error: {e}")
+        metrics.count("errors_total", stage="embed_query")
+        return []
+
+# --- Async Client ---
+# The SDK's async calls need gRPC, so the async path talks to the Gemini REST
+# API directly through one pooled httpx session. Keep-alive connections are
+# reused across requests, and a semaphore caps how many calls are in flight.
+API_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+ASYNC_TIMEOUT = httpx.Timeout(GEMINI_TIMEOUT, connect=min(10.0, GEMINI_TIMEOUT))
+
+_async_client = None
+_gemini_slots = asyncio.Semaphore(MAX_CONCURRENT_GEMINI_CALLS)
+
+def get_async_client():
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            base_url=API_BASE_URL,
+            headers={"x-goog-api-key": GEMINI_API_KEY or ""},
+            timeout=ASYNC_TIMEOUT,
+            limits=httpx.Limits(max_connections=MAX_CONCURRENT_GEMINI_CALLS, max_keepalive_connections=MAX_CONCURRENT_GEMINI_CALLS),
+        )
+    return _async_client
+
+async def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+def use_endpoint(endpoint, api_key=None):
+    """
+    Points the SDK and the async client at another Gemini-compatible server
+    (GEMINI_API_ENDPOINT, or the fake server in benchmarks/fake_gemini.py).
+    The SDK must use its REST transport for that.
+    """
+    global API_BASE_URL, _async_client, _sdk_options
+    endpoint = endpoint.rstrip("/")
+    _sdk_options = {"api_key": api_key or GEMINI_API_KEY or "offline", "transport": "rest", "client_options": {"api_endpoint": endpoint}}
+    API_BASE_URL = f"{endpoint}/v1beta"
+    _async_client = None  # Rebuilt with the new base URL on next use
+    sdk.cache_clear()  # Reconfigured on next use
+    get_model.cache_clear()
+    print(f"Gemini endpoint: {endpoint}")
+
+def _embed_request(text, task_type):
+    """One embedContent request body for the REST API."""
+    request = {"model": EMBEDDING_MODEL, "content": {"parts": [{"text": text}]}, "taskType": task_type}
+    if EMBEDDING_DIM:
+        request["outputDimensionality"] = EMBEDDING_DIM
+    return request
+
+def _model_path(model_name):
+    return model_name if model_name.startswith("models/") else f"models/{model_name}"
+
+def _generate_payload(prompt):
+    return {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+
+def _response_text(data):
+    candidates = data.get("candidates") or []
+    if not candidates:
+        return ""
+    parts = candidates[0].get("content", {}).get("parts", [])
+    return "".join(part.get("text", "") for part in parts)
+
+async def _call_with_retries_async(model_name, call, deadline):
+    """Async version of _call_with_retries; each attempt is cut off at its timeout."""
+    for attempt in itertools.count():
+        try:
+            breakers[model_name].check()
+            timeout = _attempt_timeout(deadline)
+            result = await asyncio.wait_for(call(model_name, timeout), timeout)
+        except Exception as e:
+            await _record_failure_async(model_name, e)
+            delay = _retry_delay(model_name, attempt, e, deadline)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+        else:
+            breakers[model_name].record_success()
+            return result
+
+async def _first_success(tasks):
+    """Result of the first task that succeeds (the rest are cancelled); the last error if all fail."""
+    pending, error = set(tasks), None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def _generate_async(model_name, prompt, timeout):
+    timeout -= await limiter.acquire_async(_quota(model_name, estimate_tokens(prompt)), INTERACTIVE, timeout)
+    with metrics.timed("gemini_generate"):
+        async with _gemini_slots:
+            response = await get_async_client().post(
+                f"{_model_path(model_name)}:generateContent", json=_generate_payload(prompt), timeout=timeout,
+            )
+    response.raise_for_status()
+    text = _response_text(response.json())
+    output_tokens = estimate_tokens(text)
+    metrics.count("tokens_total", output_tokens, direction="output")
+    await limiter.debit_async(_quota(model_name, output_tokens, requests=0))
+    return text
+
+async def ask_gemini_async(prompt):
+    """
+    Async version of ask_gemini: waits for Gemini without blocking the server.
+    With GEMINI_HEDGE_AFTER set, a primary call that is still running after
+    that many seconds gets a parallel call to FALLBACK_MODEL, and the first
+    answer wins. This cuts the tail latency when one model is having a slow moment.
+    """
+    log_prompt_size(prompt)
+    deadline = time.monotonic() + GEMINI_DEADLINE
+    generate = lambda model_name, timeout: _generate_async(model_name, prompt, timeout)
+    primary = asyncio.ensure_future(_call_with_retries_async(MODEL_NAME, generate, deadline))
+    try:
+        if GEMINI_HEDGE_AFTER > 0:
+            done, _ = await asyncio.wait({primary}, timeout=GEMINI_HEDGE_AFTER)
+            if not done and breakers[FALLBACK_MODEL].state == "closed":
+                metrics.count("fallbacks_total", kind="hedge")
+                hedge = asyncio.ensure_future(_call_with_retries_async(FALLBACK_MODEL, generate, deadline))
+                return await _first_success([primary, hedge])
+        try:
+            return await primary
+        except Exception as e:
+            if not should_fall_back(e):
+                raise
+            # --- FALLBACK LOGIC ---
+            print(f"⚠️ Primary model failed ({e}). Switching to '{FALLBACK_MODEL}'...")
+            metrics.count("fallbacks_total", kind="gemini_model")
+            return await _call_with_retries_async(FALLBACK_MODEL, generate, deadline)
+    except Exception as e:
+        print(f"❌ Gemini API Error: {e}")
+        metrics.count("errors_total", stage="gemini")
+        return UNAVAILABLE_MESSAGE
+    finally:
+        primary.cancel()  # Only still running if we were cancelled (e.g. the user left)
+
+async def _stream_text_async(model_name, prompt, timeout):
+    timeout -= await limiter.acquire_async(_quota(model_name, estimate_tokens(prompt)), INTERACTIVE, timeout)
+    output_tokens = 0
+    try:
+        with metrics.timed("gemini_stream"):
+            started, first = time.perf_counter(), True
+            async with _gemini_slots:
+                async with get_async_client().stream(
+                    "POST", f"{_model_path(model_name)}:streamGenerateContent",
+                    params={"alt": "sse"}, json=_generate_payload(prompt), timeout=timeout,
+                ) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if line.startswith("data:"):
+                            text = _response_text(json.loads(line[5:]))
+                            if text:
+                                if first:
+                                    metrics.observe("gemini_first_token", time.perf_counter() - started)
+                                    first = False
+                                metrics.count("tokens_total", estimate_tokens(text), direction="output")
+                                output_tokens += estimate_tokens(text)
+                                yield text
+    finally:
+        await limiter.debit_async(_quota(model_name, output_tokens, requests=0))
+
+async def ask_gemini_stream_async(prompt):
+    """
+    Async version of ask_gemini_stream. The per-attempt timeout also caps
+    the gaps between pieces, so a stalled stream doesn't hang the request.
+    """
+    log_prompt_size(prompt)
+    deadline = time.monotonic() + GEMINI_DEADLINE
+    started = False
+    error = None
+    for model_name in (MODEL_NAME, FALLBACK_MODEL):
+        for attempt in itertools.count():
+            try:
+                breakers[model_name].check()
+                async for text in _stream_text_async(model_name, prompt, _attempt_timeout(deadline)):
+                    started = True
+                    yield text
+                breakers[model_name].record_success()
+                return
+            except Exception as e:
+                error = e
+                await _record_failure_async(model_name, e)
+                if started:
+                    print(f"❌ Gemini API Error: {e}")
+                    metrics.count("errors_total", stage="gemini")
+                    yield INTERRUPTED_MESSAGE
+                    return
+                delay = _retry_delay(model_name, attempt, e, deadline)
+                if delay is None:
+                    break
+                await asyncio.sleep(delay)
+
+        if model_name == FALLBACK_MODEL or not should_fall_back(error):
+            break
+        # --- FALLBACK LOGIC ---
+        print(f"⚠️ Primary model failed ({error}). Switching to '{FALLBACK_MODEL}'...")
+        metrics.count("fallbacks_total", kind="gemini_model")
+
+    print(f"❌ Gemini API Error: {error}")
+    metrics.count("errors_total", stage="gemini")
+    yield UNAVAILABLE_MESSAGE
+
+async def embed_query_async(text):
+    """
+    Async version of embed_query.
+    """
+    try:
+        timeout = QUERY_EMBED_TIMEOUT - await limiter.acquire_async(_embed_cost([text]), INTERACTIVE, QUERY_EMBED_TIMEOUT)
+        with metrics.timed("embed_query"):
+            async with _gemini_slots:
+                response = await get_async_client().post(
+                    f"{EMBEDDING_MODEL}:embedContent",
+                    json=_embed_request(text, "RETRIEVAL_QUERY"),
+                    timeout=timeout,
+                )
+        response.raise_for_status()
+        return response.json()["embedding"]["values"]
+    except Exception as e:
+        await _note_rate_limit_async(EMBEDDING_MODEL, e)
+        print(f"❌ Query Embedding Error: {e}")
+        metrics.count("errors_total", stage="embed_query")
+        return []
+
+async def embed_queries_async(texts):
+    """
+    Several user questions in one batchEmbedContents request (up to
+    EMBED_BATCH_LIMIT). Returns one vector per question, or [] for every
+    question if the call failed, like embed_query.
+    """
+    if not texts:
+        return []
+    requests = [_embed_request(text, "RETRIEVAL_QUERY") for text in texts]
+    try:
+        timeout = QUERY_EMBED_TIMEOUT - await limiter.acquire_async(_embed_cost(texts), INTERACTIVE, QUERY_EMBED_TIMEOUT)
+        with metrics.timed("embed_query"):
+            async with _gemini_slots:
+                response = await get_async_client().post(
+                    f"{EMBEDDING_MODEL}:batchEmbedContents", json={"requests": requests}, timeout=timeout,
+                )
+        response.raise_for_status()
+        return [item["values"] for item in response.json()["embeddings"]]
+    except Exception as e:
+        await _note_rate_limit_async(EMBEDDING_MODEL, e)
         print(f"❌ Query Embedding Error: {e}")
-        return []
\ No newline at end of file
+        metrics.count("errors_total", stage="embed_query")
+        return [[] for _ in texts]
+
+async def embed_texts_async(texts, priority=INTERACTIVE):
+    """
+    Async version of embed_texts: one batched request for up to
+    EMBED_BATCH_LIMIT document texts. Errors are raised, like embed_texts.
+    Used for link mode's live pages, so it is interactive by default and
+    gives up with QuotaExhausted after GEMINI_TIMEOUT seconds without quota.
+    """
+    if not texts:
+        return []
+    if len(texts) > EMBED_BATCH_LIMIT:
+        raise ValueError(f"embed_texts_async takes at most {EMBED_BATCH_LIMIT} texts, got {len(texts)}")
+
+    requests = [_embed_request(text, "RETRIEVAL_DOCUMENT") for text in texts]
+    await limiter.acquire_async(_embed_cost(texts), priority, GEMINI_TIMEOUT if priority == INTERACTIVE else None)
+    try:
+        with metrics.timed("embed_documents"):
+            async with _gemini_slots:
+                response = await get_async_client().post(f"{EMBEDDING_MODEL}:batchEmbedContents", json={"requests": requests})
+        response.raise_for_status()
+    except Exception as e:
+        await _note_rate_limit_async(EMBEDDING_MODEL, e)
+        raise
+    return [item["values"] for item in response.json()["embeddings"]]
+
+if GEMINI_API_ENDPOINT:
+    use_endpoint(GEMINI_API_ENDPOINT)
@@ -0,0 +1,241 @@
+# backend/llm/rate_limiter.py
+#
+# Token buckets for the Gemini API key's per-minute quotas (requests and
+# tokens per model), shared by every process on the machine through one
+# SQLite file: the uvicorn workers and a running process_data.py draw from
+# the same budget instead of each assuming it has the whole key.
+#
+# Two priorities:
+#   interactive  chat answers and question embeddings; may use the whole budget
+#   bulk         re-index embedding; leaves BULK_RESERVE of every bucket free
+#                and stops taking anything while an interactive call waits
+#
+# A 429 from Gemini means the budget is smaller than configured (e.g. the key
+# is also used elsewhere), so the bucket's rate is halved for everyone and
+# then climbs back to the full budget over RECOVERY_SECONDS.
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+
+import metrics
+from llm.resilience import QuotaExhausted
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+# --- Settings ---
+BULK_RESERVE = 0.2       # Share of each bucket bulk work never touches
+CLAIM_SECONDS = 1.0      # A waiting interactive call holds bulk work off for this long
+MIN_SCALE = 0.05         # 429s never slow a bucket below 5% of its budget
+RECOVERY_SECONDS = 300   # Time to climb from a halved rate back to the full budget
+MAX_SLEEP = 1.0          # Waiting callers look again at least this often
+LOG_WAIT_SECONDS = 10.0  # Bulk waits longer than this are logged
+
+class RateLimiter:
+    """
+    budgets: bucket name -> units per minute (0 = unlimited), e.g.
+    {"models/text-embedding-004:requests": 1500, ...}. Each bucket holds up
+    to one minute of budget and refills continuously.
+    path: SQLite file shared between processes, or None for this process only.
+    """
+
+    def __init__(self, budgets, path=None):
+        self.budgets = {name: per_minute for name, per_minute in budgets.items() if per_minute > 0}
+        self.path = path or ":memory:"
+        self.lock = threading.Lock()  # One connection per process, used by one thread at a time
+        self.db = None
+        self.warned = set()  # Buckets whose budget has already been reported as too low
+
+    def _connect(self):
+        if self.db is None:
+            try:
+                db = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+                db.execute("PRAGMA journal_mode=WAL")
+                if self.path != ":memory:":
+                    print(f"Gemini quota shared through {os.path.abspath(self.path)}")
+            except sqlite3.Error as e:
+                print(f"Shared rate limits unavailable ({e}), limiting this process only.")
+                db = sqlite3.connect(":memory:", isolation_level=None, check_same_thread=False)
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS buckets "
+                "(name TEXT PRIMARY KEY, level REAL, updated REAL, scale REAL, claimed_until REAL)"
+            )
+            self.db = db
+        return self.db
+
+    def _update(self, names, change):
+        """
+        Runs change(buckets, now) on the refilled state of the named buckets
+        inside one write transaction, saves the buckets and returns its result.
+        """
+        now = time.time()
+        with self.lock:
+            db = self._connect()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                buckets = {}
+                for name in names:
+                    row = db.execute(
+                        "SELECT level, updated, scale, claimed_until FROM buckets WHERE name = ?", (name,)
+                    ).fetchone()
+                    buckets[name] = self._refill(name, row, now)
+                result = change(buckets, now)
+                db.executemany(
+                    "INSERT OR REPLACE INTO buckets (name, level, updated, scale, claimed_until) VALUES (?, ?, ?, ?, ?)",
+                    [(name, b["level"], now, b["scale"], b["claimed_until"]) for name, b in buckets.items()],
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return result
+
+    def _refill(self, name, row, now):
+        budget = self.budgets[name]
+        if row is None:
+            return {"level": float(budget), "scale": 1.0, "claimed_until": 0.0, "budget": budget}
+        level, updated, scale, claimed_until = row
+        elapsed = max(0.0, now - updated)
+        scale = min(1.0, scale + elapsed / RECOVERY_SECONDS)
+        level = min(budget * scale, level + elapsed * budget * scale / 60)
+        return {"level": level, "scale": scale, "claimed_until": claimed_until, "budget": budget}
+
+    def _try_take(self, costs, priority):
+        """Debits costs if every bucket has room. Returns 0.0 if it did, else the seconds to wait."""
+        costs = {name: cost for name, cost in costs.items() if name in self.budgets}
+        if not costs:
+            return 0.0
+
+        def take(buckets, now):
+            wait = 0.0
+            for name, cost in costs.items():
+                bucket = buckets[name]
+                capacity = bucket["budget"] * bucket["scale"]
+                floor = capacity * BULK_RESERVE if priority == BULK else 0.0
+                if priority == BULK and bucket["claimed_until"] > now:
+                    wait = max(wait, bucket["claimed_until"] - now)
+                # A request bigger than the bucket would never fit, so it waits for a full one
+                missing = floor + min(cost, capacity - floor) - bucket["level"]
+                if missing > 0:
+                    wait = max(wait, missing / (capacity / 60))
+            if wait == 0.0:
+                for name, cost in costs.items():
+                    buckets[name]["level"] -= cost
+            elif priority == INTERACTIVE:
+                for name in costs:
+                    buckets[name]["claimed_until"] = now + CLAIM_SECONDS
+            return wait
+
+        return self._update(costs, take)
+
+    def _next_wait(self, costs, priority, started, timeout):
+        """0.0 once costs are debited, else the seconds until they fit. Raises QuotaExhausted past the timeout."""
+        wait = self._try_take(costs, priority)
+        if wait == 0.0:
+            return 0.0
+        waited = time.monotonic() - started
+        if timeout is not None and waited + wait > timeout:
+            metrics.count("rate_limited_total", priority=priority, outcome="refused")
+            raise QuotaExhausted(f"Gemini quota would free up in {wait:.1f}s, more than the {timeout:.1f}s allowed")
+        return wait
+
+    def _log_wait(self, costs, priority, wait, slept):
+        if slept:
+            return
+        # The budgets are configured, not read from Google, so say once which ones are holding calls back
+        names = sorted(name for name in costs if name in self.budgets and name not in self.warned)
+        if names:
+            self.warned.update(names)
+            budgets = ", ".join(f"{name} {self.budgets[name]}/min" for name in names)
+            print(f"⏳ Calls are waiting for the configured Gemini quota ({budgets}). "
+                  "Raise the limits in config.py if the API key allows more.")
+        elif priority == BULK and wait >= LOG_WAIT_SECONDS:
+            print(f"⏳ Waiting {wait:.0f}s for Gemini quota...")
+
+    def _finish(self, priority, started, slept):
+        if slept:
+            metrics.count("rate_limited_total", priority=priority, outcome="delayed")
+            metrics.observe("quota_wait", time.monotonic() - started)
+
+    def acquire(self, costs, priority=INTERACTIVE, timeout=None):
+        """
+        Blocks until every bucket in costs ({bucket name: units}) has room,
+        then debits them. Returns the seconds spent waiting. Raises
+        QuotaExhausted if that would take longer than timeout.
+        """
+        started, slept = time.monotonic(), False
+        while True:
+            wait = self._next_wait(costs, priority, started, timeout)
+            if wait == 0.0:
+                break
+            self._log_wait(costs, priority, wait, slept)
+            time.sleep(min(wait, MAX_SLEEP))
+            slept = True
+        self._finish(priority, started, slept)
+        return time.monotonic() - started
+
+    # The async versions run every SQLite transaction on a thread: with
+    # several workers on the file, BEGIN IMMEDIATE can wait for the lock,
+    # and that must not hold up the other requests on the event loop.
+
+    async def acquire_async(self, costs, priority=INTERACTIVE, timeout=None):
+        """Async version of acquire."""
+        started, slept = time.monotonic(), False
+        while True:
+            wait = await asyncio.to_thread(self._next_wait, costs, priority, started, timeout)
+            if wait == 0.0:
+                break
+            self._log_wait(costs, priority, wait, slept)
+            await asyncio.sleep(min(wait, MAX_SLEEP))
+            slept = True
+        self._finish(priority, started, slept)
+        return time.monotonic() - started
+
+    def debit(self, costs):
+        """Charges usage only known after the call (e.g. output tokens); the level may go below zero."""
+        costs = {name: cost for name, cost in costs.items() if name in self.budgets and cost}
+        if not costs:
+            return
+
+        def charge(buckets, now):
+            for name, cost in costs.items():
+                buckets[name]["level"] -= cost
+
+        self._update(costs, charge)
+
+    async def debit_async(self, costs):
+        """Async version of debit. The charge is made even if the caller is cancelled meanwhile."""
+        await asyncio.to_thread(self.debit, costs)
+
+    def penalize(self, names):
+        """After a 429: empties the buckets and halves their rate, for every process."""
+        names = [name for name in names if name in self.budgets]
+        if not names:
+            return
+
+        def halve(buckets, now):
+            for name in names:
+                bucket = buckets[name]
+                bucket["scale"] = max(MIN_SCALE, bucket["scale"] / 2)
+                bucket["level"] = min(bucket["level"], 0.0)
+            return min(bucket["scale"] for bucket in buckets.values())
+
+        scale = self._update(names, halve)
+        print(f"⚠️ Gemini rate limit hit. Slowing {', '.join(names)} to {scale:.0%} of the budget.")
+
+    async def penalize_async(self, names):
+        """Async version of penalize."""
+        await asyncio.to_thread(self.penalize, names)
+
+    def scales(self):
+        """Bucket name -> current share of its budget (1.0 unless recently rate limited)."""
+        with self.lock:
+            rows = self._connect().execute("SELECT name, updated, scale FROM buckets").fetchall()
+        now = time.time()
+        return {
+            name: min(1.0, scale + max(0.0, now - updated) / RECOVERY_SECONDS)
+            for name, updated, scale in rows if name in self.budgets
+        }
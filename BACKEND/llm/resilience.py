@@ -0,0 +1,116 @@
+# backend/llm/resilience.py
+#
+# Building blocks for calling an upstream API that is sometimes slow or down:
+# error classification, jittered backoff and a per-model circuit breaker.
+# Used by gemini_client.py, rate_limiter.py (and process_data.py's embedding retries).
+
+import asyncio
+import random
+import threading
+import time
+
+import httpx
+
+# HTTP status codes worth retrying: rate limited or a temporary server problem
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a model whose circuit breaker is open."""
+
+class QuotaExhausted(Exception):
+    """Raised instead of calling a model whose shared rate budget is used up (see rate_limiter.py)."""
+
+class DeadlineExceeded(Exception):
+    """The whole call ran out of time (not the model's fault, so not retried)."""
+
+def status_code(error):
+    """
+    HTTP status of a failed call, or None. google.api_core exceptions carry
+    it in `.code`, httpx in `.response.status_code`.
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code
+    try:
+        return int(getattr(error, "code", None))
+    except (TypeError, ValueError):
+        return None
+
+def is_retryable(error):
+    """True for rate limits (429), transient server errors (5xx), timeouts and dropped connections."""
+    code = status_code(error)
+    if code is not None:
+        return code in RETRYABLE_STATUS
+    return isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError, httpx.TransportError))
+
+def is_not_found(error):
+    """True if the model doesn't exist (any more) for this API key."""
+    return status_code(error) == 404
+
+def is_rate_limited(error):
+    """True if Gemini refused the call because the API key is over its quota."""
+    return status_code(error) == 429
+
+def should_fall_back(error):
+    """Worth trying another model: this one is missing, overloaded, out of quota, too slow or switched off."""
+    return isinstance(error, (CircuitOpenError, QuotaExhausted)) or is_not_found(error) or is_retryable(error)
+
+def backoff_delay(attempt, base, cap):
+    """Exponential backoff with jitter, so retrying clients don't all come back at once."""
+    delay = min(cap, base * (2 ** attempt))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+class CircuitBreaker:
+    """
+    Stops sending traffic to a model that keeps failing.
+
+    closed     calls go through; `failures` failures in a row open the breaker
+    open       calls are refused (CircuitOpenError) for `reset_after` seconds
+    half-open  one trial call goes through: success closes, failure re-opens
+
+    Thread-safe, because the sync client runs on FastAPI's thread pool.
+    """
+
+    def __init__(self, name, failures, reset_after):
+        self.name = name
+        self.failures = failures
+        self.reset_after = reset_after
+        self.state = "closed"
+        self.failed = 0         # Failures in a row
+        self.opened_at = 0.0
+        self.trial_at = 0.0     # When the half-open trial call started
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            now = time.monotonic()
+            if self.state == "closed":
+                return True
+            if self.state == "open" and now - self.opened_at >= self.reset_after:
+                self.state = "half-open"
+                self.trial_at = now
+                return True
+            # A trial that never reported back (e.g. cancelled) doesn't block forever
+            if self.state == "half-open" and now - self.trial_at >= self.reset_after:
+                self.trial_at = now
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            if self.state != "closed":
+                print(f"Circuit breaker for '{self.name}' closed again.")
+            self.state = "closed"
+            self.failed = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.failed += 1
+            if self.state == "half-open" or (self.state == "closed" and self.failed >= self.failures):
+                print(f"⚠️ Circuit breaker for '{self.name}' opened after {self.failed} failures.")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def check(self):
+        """Raises CircuitOpenError if the call should not be made."""
+        if not self.allow():
+            raise CircuitOpenError(f"Circuit breaker for '{self.name}' is open")
@@ -1,18 +1,119 @@
 # backend/main.py
 
-from fastapi import FastAPI, HTTPException
+import time
+IMPORTS_STARTED = time.perf_counter()  # For the startup report (see /ready)
+
+from fastapi import FastAPI, HTTPException, Header
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
+from contextlib import asynccontextmanager
+import asyncio
+import json
+import secrets
 import sys
 import os
 
 # --- Import our custom modules ---
 # We need these to talk to the AI and the database
-from llm.gemini_client import ask_gemini
-from rag.rag_engine import rag_chat
-from rag.live_scraper import scrape_url_live
+# Everything on the request path is async, so a slow Gemini call or web page
+# only parks that one request while the server keeps serving everyone else.
+# rag_engine (FAISS, numpy, the index files) is loaded later, see Startup below.
+from llm.gemini_client import ask_gemini_async, ask_gemini_stream_async, close_async_client as close_gemini_client
+from rag.metadata import make_filters
+from config import RELOAD_POLL_SECONDS, ADMIN_TOKEN, TIMING_HEADER
+import metrics
+
+# --- Startup ---
+# On a cold start (e.g. a host that sleeps when idle) the first request
+# shouldn't wait for the whole RAG stack. The server comes up with only the
+# light imports above; rag_engine is imported and its database loaded in a
+# background thread. "/" and General mode answer right away, University and
+# Link mode requests that arrive earlier wait for the load, and /ready says
+# when it is done and how long each phase took.
+startup_report = {"imports": round(time.perf_counter() - IMPORTS_STARTED, 3)}
+_engine_task = None
+ENGINE_RETRY_SECONDS = (5, 15, 30, 60)  # Waits before reloading a failed RAG engine; the last one repeats
+_engine_failures = 0
+
+def load_rag_engine():
+    started = time.perf_counter()
+    from rag import rag_engine
+    imported = time.perf_counter()
+    rag_engine.ensure_database()
+    loaded = time.perf_counter()
+
+    startup_report["rag_imports"] = round(imported - started, 3)
+    startup_report["database"] = round(loaded - imported, 3)
+    startup_report["ready"] = round(loaded - IMPORTS_STARTED, 3)  # Since main.py started importing
+    for phase in ("imports", "rag_imports", "database"):
+        metrics.observe(f"startup_{phase}", startup_report[phase])
+    print(
+        f"🚀 Startup: imports {startup_report['imports']}s, RAG engine imports {startup_report['rag_imports']}s, "
+        f"database {startup_report['database']}s. Ready {startup_report['ready']}s after start."
+    )
+    return rag_engine
+
+def start_rag_engine():
+    """Starts loading the RAG engine in the background (once). Returns the task."""
+    global _engine_task
+    if _engine_task is None:
+        _engine_task = asyncio.ensure_future(asyncio.to_thread(load_rag_engine))
+        _engine_task.add_done_callback(_engine_loaded)
+    return _engine_task
+
+def _engine_loaded(task):
+    """If the load failed, logs why and tries again after a backoff (requests meanwhile get the error)."""
+    global _engine_failures
+    if task.cancelled():
+        return
+    error = task.exception()
+    if error is None:
+        _engine_failures = 0
+        return
+    delay = ENGINE_RETRY_SECONDS[min(_engine_failures, len(ENGINE_RETRY_SECONDS) - 1)]
+    _engine_failures += 1
+    startup_report["retry_in"] = delay
+    print(f"❌ Loading the RAG engine failed ({error!r}). Attempt {_engine_failures}, retrying in {delay}s.")
+    asyncio.get_running_loop().call_later(delay, _retry_rag_engine, task)
+
+def _retry_rag_engine(failed_task):
+    global _engine_task
+    if _engine_task is failed_task:  # Not already replaced (e.g. by a restart of the app)
+        _engine_task = None
+        startup_report.pop("retry_in", None)
+        start_rag_engine()
 
-app = FastAPI()
+async def get_rag_engine():
+    """The rag_engine module, waiting for the background load if it is still running."""
+    # shield: a request that gives up must not cancel the load for everyone else
+    return await asyncio.shield(start_rag_engine())
+
+async def watch_database(interval):
+    """Pick up databases published by process_data.py without a restart (see rag_engine.watch_database)."""
+    while True:
+        try:
+            rag_engine = await get_rag_engine()
+            await rag_engine.watch_database(interval)
+        except Exception as e:
+            # The engine failed to load; _engine_loaded retries it, so wait and look again
+            print(f"⚠️ Database watcher: {e!r}")
+            await asyncio.sleep(interval)
+
+@asynccontextmanager
+async def lifespan(app):
+    start_rag_engine()
+    watcher = asyncio.create_task(watch_database(RELOAD_POLL_SECONDS)) if RELOAD_POLL_SECONDS > 0 else None
+    yield
+    if watcher:
+        watcher.cancel()
+    # Close the pooled HTTP connections on shutdown
+    await close_gemini_client()
+    # The page scraper is only imported along with rag_engine
+    if "rag.live_scraper" in sys.modules:
+        await sys.modules["rag.live_scraper"].close_async_client()
+
+app = FastAPI(lifespan=lifespan)
 
 # --- CORS Configuration ---
 # This allows your React Frontend (running on localhost:5173)
@@ -25,23 +126,121 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def server_timing_header(request, call_next):
+    """
+    With TIMING_HEADER=1, collects the spans of each request (see metrics.py)
+    and returns them as a Server-Timing header. Streamed answers are sent
+    with their headers first, so they only show the stages before Gemini.
+    """
+    if not TIMING_HEADER:
+        return await call_next(request)
+    timings = []
+    token = metrics.request_timings.set(timings)
+    try:
+        response = await call_next(request)
+    finally:
+        metrics.request_timings.reset(token)
+    if timings:
+        response.headers["Server-Timing"] = metrics.server_timing(timings)
+    return response
+
 # --- Data Model ---
 # This defines what data the frontend must send us
 class ChatRequest(BaseModel):
     message: str
     mode: str          # "general" or "university"
     link: str = None   # Optional: If the user provides a specific URL
+    # Optional University mode filters (see rag/metadata.py)
+    campus: str = None         # "main" or "hyderabad"
+    source_types: list[str] = None  # Any of "page", "pdf", "notice", "regulation", "news"
+    max_age_days: int = None   # Only documents dated within this many days
+
+def request_filters(request):
+    """The request's retrieval filters, or None. Invalid values are a 400 error."""
+    try:
+        return make_filters(request.campus, request.source_types, request.max_age_days)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def request_mode(request):
+    """The mode label used in metrics: "link", "university" or "general"."""
+    if request.link:
+        return "link"
+    return "university" if request.mode == "university" else "general"
+
+LINK_UNREADABLE_MESSAGE = "I couldn't read that link. It might be blocked or empty."
+
+LINK_PROMPT = """Read this website content and answer the user's question.
+
+WEBSITE CONTENT:
+{page_text}
+
+USER QUESTION:
+{user_msg}"""
+
+def build_link_prompt(page_text, user_msg):
+    """
+    Prompt for answering a question using ONLY one web page's text
+    (for long pages, the passages link_context_async picked for the question).
+    """
+    return LINK_PROMPT.format(page_text=page_text, user_msg=user_msg)
 
 @app.get("/")
 def read_root():
+    """Liveness: the process is up (General mode works from here on)."""
     return {"status": "running", "message": "Vignan Chatbot Backend is Online"}
 
+@app.get("/ready")
+async def read_ready():
+    """
+    Readiness: 200 once the RAG engine and database are loaded, 503 while
+    they still are (or if loading failed). Includes the startup report.
+    """
+    task = start_rag_engine()
+    status = {"ready": False, "startup": startup_report}
+    if task.done():
+        if task.cancelled() or task.exception() is not None:
+            status["error"] = "cancelled" if task.cancelled() else str(task.exception())
+        else:
+            database = task.result().db
+            status.update(ready=True, index_version=database.version if database else None)
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.get("/api/cache/stats")
+async def read_cache_stats():
+    """Hit/miss statistics of the University mode caches."""
+    return (await get_rag_engine()).cache_stats()
+
+@app.get("/metrics")
+def read_metrics():
+    """Stage latencies, error/fallback/token counters and index size, for Prometheus."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.post("/api/admin/reload")
+async def reload_endpoint(x_admin_token: str = Header(None)):
+    """
+    Loads the latest published database snapshot in the background and
+    swaps it in. Requests already running finish on the old one.
+    """
+    if not ADMIN_TOKEN or not x_admin_token or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    rag_engine = await get_rag_engine()
+    return await asyncio.to_thread(rag_engine.reload_database)
+
 @app.post("/api/chat")
 async def chat_endpoint(request: ChatRequest):
     """
     The main chat handler.
     Decides which logic to use based on user input.
     """
+    filters = request_filters(request)
+    metrics.count("requests_total", endpoint="chat", mode=request_mode(request))
+    with metrics.timed("chat"):
+        return await answer_chat(request, filters)
+
+async def answer_chat(request, filters=None):
+    """Picks link, University or General mode and returns the JSON reply."""
     try:
         user_msg = request.message
         mode = request.mode
@@ -50,40 +249,93 @@ async def chat_endpoint(request: ChatRequest):
         # --- CASE 1: User provided a specific Link ---
         if link:
             print(f"[Mode: LIVE LINK] Processing {link}")
-            # Scrape the link in real-time
-            page_text = scrape_url_live(link)
+            # Scrape the link in real-time (or reuse the cached page)
+            rag_engine = await get_rag_engine()
+            page_text = await rag_engine.link_context_async(link, user_msg)
             
             if not page_text:
-                return {"response": "I couldn't read that link. It might be blocked or empty."}
+                return {"response": LINK_UNREADABLE_MESSAGE}
             
             # Ask Gemini to answer using ONLY that page's text
-            prompt = f"""
-            Read this website content and answer the user's question.
-            
-            WEBSITE CONTENT:
-            {page_text[:10000]}  # Limit text to avoid token limits
-
-            USER QUESTION:
-            {user_msg}
-            """
-            response = ask_gemini(prompt)
+            response = await ask_gemini_async(build_link_prompt(page_text, user_msg))
             return {"response": response}
 
         # --- CASE 2: University Mode (RAG) ---
         if mode == "university":
             print(f"[Mode: UNIVERSITY] Searching database...")
-            response = rag_chat(user_msg)
+            rag_engine = await get_rag_engine()
+            response = await rag_engine.rag_chat_async(user_msg, filters)
             return {"response": response}
 
         # --- CASE 3: General Mode ---
         else:
             print(f"[Mode: GENERAL] Asking Gemini directly...")
-            response = ask_gemini(user_msg)
+            response = await ask_gemini_async(user_msg)
             return {"response": response}
 
     except Exception as e:
         print(f"SERVER ERROR: {e}")
+        metrics.count("errors_total", stage="chat")
         raise HTTPException(status_code=500, detail=str(e))
 
+def sse_event(payload):
+    """One Server-Sent Event. JSON keeps newlines inside tokens from breaking the framing."""
+    return f"data: {json.dumps(payload)}\n\n"
+
+async def chat_token_stream(request, filters=None):
+    """
+    Same three modes as chat_endpoint, but yields the answer as SSE events:
+    {"token": "..."} for each piece, then {"done": true}.
+    """
+    user_msg = request.message
+    started = time.perf_counter()
+    try:
+        # --- CASE 1: User provided a specific Link ---
+        if request.link:
+            print(f"[Mode: LIVE LINK] Streaming {request.link}")
+            rag_engine = await get_rag_engine()
+            page_text = await rag_engine.link_context_async(request.link, user_msg)
+            if not page_text:
+                yield sse_event({"token": LINK_UNREADABLE_MESSAGE})
+                yield sse_event({"done": True})
+                return
+            tokens = ask_gemini_stream_async(build_link_prompt(page_text, user_msg))
+
+        # --- CASE 2: University Mode (RAG) ---
+        elif request.mode == "university":
+            print(f"[Mode: UNIVERSITY] Streaming answer...")
+            rag_engine = await get_rag_engine()
+            tokens = rag_engine.rag_chat_stream_async(user_msg, filters)
+
+        # --- CASE 3: General Mode ---
+        else:
+            print(f"[Mode: GENERAL] Streaming from Gemini...")
+            tokens = ask_gemini_stream_async(user_msg)
+
+        async for token in tokens:
+            yield sse_event({"token": token})
+        metrics.observe("chat_stream", time.perf_counter() - started)
+    except Exception as e:
+        print(f"SERVER ERROR: {e}")
+        metrics.count("errors_total", stage="chat_stream")
+        yield sse_event({"error": str(e)})
+    yield sse_event({"done": True})
+
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """
+    Streaming chat handler (Server-Sent Events).
+    Tokens are forwarded as soon as Gemini produces them, so the first words
+    show up long before the full answer is ready.
+    """
+    filters = request_filters(request)
+    metrics.count("requests_total", endpoint="chat_stream", mode=request_mode(request))
+    return StreamingResponse(
+        chat_token_stream(request, filters),
+        media_type="text/event-stream",
+        # Stop proxies (e.g. nginx on the host) from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # To run this server, type in terminal:
 # uvicorn main:app --reload
\ No newline at end of file
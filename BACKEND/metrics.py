@@ -0,0 +1,120 @@
+# backend/metrics.py
+#
+# Lightweight in-process metrics for the chat pipeline, exported in the
+# Prometheus text format on /metrics (no extra dependency needed).
+#
+#   with metrics.timed("gemini_generate"):   # Latency of one stage
+#       ...
+#   metrics.count("fallbacks_total", kind="gemini_model")
+#
+# Every uvicorn worker keeps its own numbers; Prometheus scrapes and sums them.
+
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+PREFIX = "mouni_"
+WINDOW = 2048               # Recent samples per stage used for the quantiles
+QUANTILES = (0.5, 0.95, 0.99)
+
+COUNTERS = {
+    "requests_total": "Chat requests by endpoint and mode.",
+    "errors_total": "Failed calls by stage.",
+    "fallbacks_total": "Degraded paths taken (fallback model, hedged call, BM25-only retrieval, stale page).",
+    "retries_total": "Gemini calls retried after a transient error, by model.",
+    "rate_limited_total": "Gemini calls delayed or refused by the shared rate limiter, by priority.",
+    "tokens_total": "Estimated Gemini tokens by direction (input / output).",
+    "batches_total": "Micro-batches sent, by kind (see rag/micro_batcher.py).",
+    "batched_items_total": "Requests served by those micro-batches.",
+}
+
+_lock = threading.Lock()
+_stages = {}    # stage -> {"count": int, "sum": float, "recent": deque of seconds}
+_counters = {}  # (name, sorted label items) -> value
+_gauges = {}    # name -> (help text, function returning the current value)
+
+# The spans of the request being handled, for the Server-Timing header (see main.py)
+request_timings = contextvars.ContextVar("request_timings", default=None)
+
+def observe(stage, seconds):
+    """Records one duration for a stage."""
+    with _lock:
+        entry = _stages.get(stage)
+        if entry is None:
+            entry = _stages[stage] = {"count": 0, "sum": 0.0, "recent": deque(maxlen=WINDOW)}
+        entry["count"] += 1
+        entry["sum"] += seconds
+        entry["recent"].append(seconds)
+    timings = request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+@contextmanager
+def timed(stage):
+    """Times the block, including when it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - started)
+
+def count(name, amount=1, **labels):
+    """Adds to one of the COUNTERS."""
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+def register_gauge(name, help_text, function):
+    """A value read at scrape time, e.g. the number of indexed vectors."""
+    _gauges[name] = (help_text, function)
+
+def _quantile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+def _labels(items):
+    return "{" + ",".join(f'{key}="{value}"' for key, value in items) + "}" if items else ""
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        stages = {stage: (entry["count"], entry["sum"], sorted(entry["recent"])) for stage, entry in _stages.items()}
+        counters = dict(_counters)
+
+    name = PREFIX + "stage_seconds"
+    lines += [f"# HELP {name} Latency of each pipeline stage (quantiles over the last {WINDOW} calls).", f"# TYPE {name} summary"]
+    for stage, (total_count, total_sum, recent) in sorted(stages.items()):
+        for q in QUANTILES:
+            lines.append(f'{name}{{stage="{stage}",quantile="{q}"}} {_quantile(recent, q):.6f}')
+        lines.append(f'{name}_sum{{stage="{stage}"}} {total_sum:.6f}')
+        lines.append(f'{name}_count{{stage="{stage}"}} {total_count}')
+
+    for counter, help_text in COUNTERS.items():
+        name = PREFIX + counter
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for (key, items), value in sorted(counters.items()):
+            if key == counter:
+                lines.append(f"{name}{_labels(items)} {value}")
+
+    for gauge, (help_text, function) in sorted(_gauges.items()):
+        name = PREFIX + gauge
+        try:
+            value = function()
+        except Exception:
+            continue
+        if value is not None:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value}"]
+    return "\n".join(lines) + "\n"
+
+def server_timing(timings):
+    """
+    Server-Timing header value for one request's spans, e.g.
+    "embed_query;dur=41.2, vector_search;dur=0.8, gemini_generate;dur=912.0".
+    Browsers show it in the network panel.
+    """
+    totals = {}
+    for stage, seconds in timings:
+        totals[stage] = totals.get(stage, 0.0) + seconds
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in totals.items())
@@ -0,0 +1,158 @@
+# backend/rag/bm25_index.py
+
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+import numpy as np
+
+# --- Settings ---
+K1 = 1.2   # Term frequency saturation
+B = 0.75   # How much long chunks are penalized
+
+# Keeps IDs like "noti_391", "R-20" or "2023-24" together as one token
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[_./-][a-z0-9]+)*")
+PART_RE = re.compile(r"[_./-]")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how i in is it its of on or that "
+    "the this to was were what when where which who why will with you your".split()
+)
+
+# One row per (term, chunk) pair, grouped by term
+POSTING_DTYPE = np.dtype([
+    ("id", "<i8"),       # Chunk ID, same as in the FAISS index and chunk store
+    ("weight", "<f4"),   # BM25 term weight for this chunk, without the idf
+])
+
+def tokenize(text):
+    """
+    Lowercase word tokens without stopwords. Compound IDs are kept whole and
+    also split, so "noti_391" matches both "noti_391" and "391".
+    """
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(part for part in PART_RE.split(token) if part not in STOPWORDS)
+    return tokens
+
+def index_paths(prefix):
+    """The two files that make up a BM25 index."""
+    return {
+        "terms": prefix + ".terms.json",
+        "postings": prefix + ".postings.npy",
+    }
+
+def write_bm25_index(chunks, prefix):
+    """
+    Builds an inverted index over chunks ({'id', 'text'} dicts) and writes it
+    next to the chunk store. Term weights are precomputed, so a query is just
+    a few array slices and a sum. Written via temporary files like the chunk store.
+    """
+    term_postings = defaultdict(list)  # term -> [(chunk ID, term frequency, chunk length)]
+    total_length = 0
+    n_docs = 0
+
+    for chunk in chunks:
+        tokens = tokenize(chunk["text"])
+        total_length += len(tokens)
+        n_docs += 1
+        for term, tf in Counter(tokens).items():
+            term_postings[term].append((chunk["id"], tf, len(tokens)))
+
+    avg_length = total_length / n_docs if n_docs else 1.0
+    postings = np.zeros(sum(len(p) for p in term_postings.values()), dtype=POSTING_DTYPE)
+    terms = {}
+    start = 0
+    for term in sorted(term_postings):
+        rows = term_postings[term]
+        ids, tfs, lengths = (np.array(column, dtype="float64") for column in zip(*rows))
+        end = start + len(rows)
+        postings["id"][start:end] = ids
+        postings["weight"][start:end] = tfs * (K1 + 1) / (tfs + K1 * (1 - B + B * lengths / avg_length))
+        idf = math.log(1 + (n_docs - len(rows) + 0.5) / (len(rows) + 0.5))
+        terms[term] = [start, end, round(idf, 6)]
+        start = end
+
+    paths = index_paths(prefix)
+    with open(paths["postings"] + ".tmp", "wb") as f:
+        np.save(f, postings)
+    with open(paths["terms"] + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"chunks": n_docs, "terms": terms}, f)
+
+    for path in paths.values():
+        os.replace(path + ".tmp", path)
+    return len(terms)
+
+class BM25Index:
+    """
+    Read-only BM25 index. The term dictionary is loaded; the postings are
+    memory-mapped, so only the lists of the query terms are paged in.
+    """
+
+    def __init__(self, prefix):
+        paths = index_paths(prefix)
+        with open(paths["terms"], "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.n_docs = data["chunks"]
+        self.terms = data["terms"]
+        self.postings = np.load(paths["postings"], mmap_mode="r")
+
+    def __len__(self):
+        return self.n_docs
+
+    def search(self, query, k=5, allowed=None):
+        """
+        Returns up to k (chunk_id, score) pairs, best first.
+        Chunks that share no term with the query are never returned.
+        allowed: optional sorted array of the only chunk IDs that may be returned.
+        """
+        ids, scores = [], []
+        for term in set(tokenize(query)):
+            entry = self.terms.get(term)
+            if entry is None:
+                continue
+            start, end, idf = entry
+            rows = self.postings[start:end]
+            ids.append(rows["id"])
+            scores.append(rows["weight"] * idf)
+        if not ids:
+            return []
+
+        chunk_ids, positions = np.unique(np.concatenate(ids), return_inverse=True)
+        totals = np.bincount(positions, weights=np.concatenate(scores))
+        if allowed is not None:
+            keep = np.isin(chunk_ids, allowed, assume_unique=True)
+            chunk_ids, totals = chunk_ids[keep], totals[keep]
+        if len(totals) > k:
+            best = np.argpartition(-totals, k)[:k]
+        else:
+            best = np.arange(len(totals))
+        best = best[np.argsort(-totals[best], kind="stable")]
+        return [(int(chunk_ids[i]), float(totals[i])) for i in best]
+
+def bm25_scores(query, passages):
+    """
+    BM25 scores of a query against a few in-memory passages (e.g. the
+    paragraphs of one web page), without building index files.
+    Returns one float per passage.
+    """
+    counts = [Counter(tokenize(passage)) for passage in passages]
+    lengths = [sum(count.values()) for count in counts]
+    avg_length = (sum(lengths) / len(lengths) if lengths else 0) or 1.0
+    scores = [0.0] * len(passages)
+
+    for term in set(tokenize(query)):
+        df = sum(1 for count in counts if term in count)
+        if not df:
+            continue
+        idf = math.log(1 + (len(passages) - df + 0.5) / (df + 0.5))
+        for i, count in enumerate(counts):
+            tf = count.get(term)
+            if tf:
+                scores[i] += idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * lengths[i] / avg_length))
+    return scores
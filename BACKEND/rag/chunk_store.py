@@ -0,0 +1,150 @@
+# backend/rag/chunk_store.py
+
+import json
+import mmap
+import os
+import sys
+import numpy as np
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag.metadata import day_number, partition_key, partition_matches, today_number
+
+# One row per chunk, sorted by chunk ID so lookups are a binary search
+RECORD_DTYPE = np.dtype([
+    ("id", "<i8"),       # Same ID as the vector in the FAISS index
+    ("offset", "<i8"),   # Byte offset of the chunk text in the blob
+    ("length", "<i4"),   # Byte length of the chunk text
+    ("source", "<i4"),   # Position in the sources list
+    ("page", "<i4"),     # PDF page number, 0 for HTML pages
+])
+
+def store_paths(prefix):
+    """The three files that make up a chunk store."""
+    return {
+        "records": prefix + ".idx.npy",
+        "blob": prefix + ".bin",
+        "sources": prefix + ".sources.json",
+    }
+
+def write_chunk_store(chunks, prefix, source_meta=None):
+    """
+    Writes chunks ({'id', 'text', 'source', 'page'} dicts, any order) to disk.
+    source_meta: {source name: metadata dict} (see metadata.py), stored
+    once per source rather than per chunk.
+    Text is streamed into the blob, so only the small record array is kept in memory.
+    Files are written under temporary names and then renamed, so readers that
+    still have the old store mapped are never handed a half-written file.
+    """
+    paths = store_paths(prefix)
+    sources = {}
+    records = []
+    offset = 0
+
+    with open(paths["blob"] + ".tmp", "wb") as blob:
+        for chunk in chunks:
+            data = chunk["text"].encode("utf-8")
+            blob.write(data)
+            source = sources.setdefault(chunk["source"], len(sources))
+            records.append((chunk["id"], offset, len(data), source, chunk.get("page") or 0))
+            offset += len(data)
+
+    array = np.array(records, dtype=RECORD_DTYPE)
+    array.sort(order="id")
+    with open(paths["records"] + ".tmp", "wb") as f:
+        np.save(f, array)
+    with open(paths["sources"] + ".tmp", "w", encoding="utf-8") as f:
+        if source_meta is None:
+            json.dump(list(sources), f)
+        else:
+            json.dump([dict(source_meta.get(name) or {}, name=name) for name in sources], f)
+
+    for path in paths.values():
+        os.replace(path + ".tmp", path)
+    return len(array)
+
+class ChunkStore:
+    """
+    Read-only, memory-mapped view of a chunk store.
+
+    Nothing but the source list is read at open time; chunk text is paged
+    in by the OS only for the chunks we actually fetch. Because the files
+    are mapped rather than loaded, every uvicorn worker shares the same
+    pages in the OS page cache.
+    """
+
+    def __init__(self, prefix):
+        paths = store_paths(prefix)
+        self.records = np.load(paths["records"], mmap_mode="r")
+        with open(paths["sources"], "r", encoding="utf-8") as f:
+            sources = json.load(f)
+        # Stores written before metadata existed only list the source names
+        self.source_meta = [source if isinstance(source, dict) else {} for source in sources]
+        self.sources = [source["name"] if isinstance(source, dict) else source for source in sources]
+        self.has_metadata = any(self.source_meta)
+        self.source_days = np.array([day_number(meta.get("date")) for meta in self.source_meta], dtype="int64")
+        with open(paths["blob"], "rb") as f:
+            # mmap can't map an empty file
+            self.blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+
+    def __len__(self):
+        return len(self.records)
+
+    def _row(self, chunk_id):
+        ids = self.records["id"]
+        row = int(np.searchsorted(ids, chunk_id))
+        if row < len(ids) and ids[row] == chunk_id:
+            return row
+        return None
+
+    def __contains__(self, chunk_id):
+        return self._row(chunk_id) is not None
+
+    def get(self, chunk_id):
+        """
+        Returns {'id', 'text', 'source', 'page'} for a chunk ID, or None.
+        """
+        row = self._row(chunk_id)
+        if row is None:
+            return None
+        record = self.records[row]
+        start = int(record["offset"])
+        text = self.blob[start:start + int(record["length"])].decode("utf-8")
+        page = int(record["page"])
+        meta = self.source_meta[int(record["source"])]
+        return {
+            "id": int(record["id"]),
+            "text": text,
+            "source": self.sources[int(record["source"])],
+            "page": page or None,
+            "url": meta.get("url"),
+            "campus": meta.get("campus"),
+            "type": meta.get("type"),
+            "date": meta.get("date"),
+        }
+
+    def ids(self):
+        return self.records["id"]
+
+    def age_days(self, chunk_ids):
+        """Age in days of each chunk's source (NaN where the date is unknown)."""
+        rows = np.searchsorted(self.records["id"], np.asarray(chunk_ids, dtype="int64"))
+        days = self.source_days[self.records["source"][np.minimum(rows, len(self.records) - 1)]]
+        return np.where(days >= 0, today_number() - days, np.nan)
+
+    def ids_matching(self, filters):
+        """
+        Sorted IDs of the chunks the filters (see metadata.make_filters) allow,
+        or None if this store has no metadata to filter on.
+        """
+        if not self.has_metadata:
+            return None
+        allowed = np.array([partition_matches(partition_key(meta), filters) for meta in self.source_meta], dtype=bool)
+        if "max_age_days" in filters:
+            allowed &= (self.source_days >= 0) & (today_number() - self.source_days <= filters["max_age_days"])
+        return np.asarray(self.records["id"][allowed[self.records["source"]]])
+
+    def close(self):
+        if isinstance(self.blob, mmap.mmap):
+            self.blob.close()
@@ -0,0 +1,159 @@
+# backend/rag/chunker.py
+
+import re
+import sys
+import os
+import zlib
+import numpy as np
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm.gemini_client import estimate_tokens
+
+# --- Settings ---
+CHUNKER_VERSION = 2       # Bump when the splitting rules change, so process_data re-chunks everything
+CHUNK_TOKENS = 400        # Token budget per chunk
+SOFT_BREAK_TOKENS = 200   # A heading or new PDF page starts a new chunk once the current one is this full
+HEADING_MAX_CHARS = 80
+
+# Near-duplicate detection (MinHash over word 5-grams, LSH banding)
+SHINGLE_WORDS = 5
+NUM_PERM = 64
+BANDS = 16                # 16 bands x 4 rows: pairs above ~50% similarity become candidates
+DUPLICATE_THRESHOLD = 0.8  # Estimated Jaccard similarity at which a chunk counts as a duplicate
+
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+_rng = np.random.default_rng(12345)
+_PERM_A = _rng.integers(1, 2**63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_PERM_B = _rng.integers(0, 2**63, NUM_PERM, dtype=np.uint64)
+
+def chunker_settings():
+    """Stored in the manifest; a change means old chunks were cut differently."""
+    return {"version": CHUNKER_VERSION, "tokens": CHUNK_TOKENS}
+
+def is_heading(line):
+    """
+    Short line without closing punctuation that is ALL CAPS, Title Case
+    or a markdown heading, e.g. "Hostel Facilities" or "ADMISSIONS 2024".
+    """
+    if len(line) > HEADING_MAX_CHARS or line[-1] in ".,;:!?":
+        return False
+    if line.startswith("#") or line.isupper():
+        return True
+    words = [word for word in line.split() if word[0].isalpha()]
+    return 0 < len(words) <= 8 and sum(word[0].isupper() for word in words) >= 0.6 * len(words)
+
+def _lines(text, page_starts):
+    """Yields (line, page, starts_page) for every non-blank line."""
+    if not page_starts:
+        for line in text.splitlines():
+            if line.strip():
+                yield line.strip(), None, False
+        return
+
+    ends = [offset for offset, _ in page_starts[1:]] + [len(text)]
+    for (start, page), end in zip(page_starts, ends):
+        first = True
+        for line in text[start:end].splitlines():
+            if line.strip():
+                yield line.strip(), page, first
+                first = False
+
+def _fit(line, budget):
+    """
+    Splits a line that is over the budget at sentence ends, and a sentence
+    that is still too long at word boundaries.
+    """
+    if estimate_tokens(line) <= budget:
+        return [line]
+
+    pieces = []
+    for sentence in SENTENCE_RE.split(line):
+        if estimate_tokens(sentence) <= budget:
+            pieces.append(sentence)
+            continue
+        words = []
+        for word in sentence.split():
+            if words and estimate_tokens(" ".join(words + [word])) > budget:
+                pieces.append(" ".join(words))
+                words = []
+            words.append(word)
+        if words:
+            pieces.append(" ".join(words))
+    return pieces
+
+def split_text(text, page_starts=None, budget=CHUNK_TOKENS):
+    """
+    Packs the lines of a document (clean_html puts one block per line; PDFs
+    also have page boundaries) into chunks of at most `budget` tokens.
+    Chunks end at line breaks, or at sentence ends for very long lines, so no
+    word or table row is cut in half and no text is repeated across chunks.
+    Returns a list of (text, page) with the page each chunk starts on.
+    """
+    chunks = []
+    current = []
+    tokens = 0
+    page = None
+
+    for line, line_page, starts_page in _lines(text, page_starts):
+        soft_break = starts_page or is_heading(line)
+        for piece in _fit(line, budget):
+            size = estimate_tokens(piece) + 1  # + the newline
+            if current and (tokens + size > budget or (soft_break and tokens >= SOFT_BREAK_TOKENS)):
+                chunks.append(("\n".join(current), page))
+                current, tokens = [], 0
+            if not current:
+                page = line_page
+            current.append(piece)
+            tokens += size
+            soft_break = False
+
+    if current:
+        chunks.append(("\n".join(current), page))
+    return chunks
+
+def minhash(text):
+    """MinHash signature of a text's word 5-grams (NUM_PERM unsigned ints)."""
+    words = text.lower().split()
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))}
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+    # Multiply-shift hashing; uint64 overflow wraps around, which is what we want
+    return ((np.outer(hashes, _PERM_A) + _PERM_B) >> np.uint64(32)).min(axis=0)
+
+class NearDuplicateFilter:
+    """
+    Remembers the chunks kept so far and spots new ones that are near copies
+    of them: menus, footers, "404 Not Found" pages and notices that repeat
+    across many pages. LSH banding keeps each check to a few dictionary lookups.
+    """
+
+    def __init__(self, threshold=DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self.rows = NUM_PERM // BANDS
+        self.buckets = [{} for _ in range(BANDS)]
+        self.signatures = []
+
+    def _bands(self, signature):
+        for band in range(BANDS):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, text):
+        """
+        Remembers the text and returns True, or returns False (and remembers
+        nothing) if it is a near duplicate of a text added before.
+        """
+        signature = minhash(text)
+        candidates = set()
+        for band, key in self._bands(signature):
+            candidates.update(self.buckets[band].get(key, ()))
+        for candidate in candidates:
+            if np.mean(self.signatures[candidate] == signature) >= self.threshold:
+                return False
+
+        position = len(self.signatures)
+        self.signatures.append(signature)
+        for band, key in self._bands(signature):
+            self.buckets[band].setdefault(key, []).append(position)
+        return True
@@ -0,0 +1,89 @@
+# backend/rag/context_packer.py
+
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm.gemini_client import estimate_tokens
+from rag.chunker import split_text
+from config import CONTEXT_TOKENS, LINK_CONTEXT_TOKENS
+
+# --- Settings ---
+PASSAGE_TOKENS = 150    # Link mode: size of the passages we choose between
+MIN_PIECE_TOKENS = 30   # A chunk cut down to fewer tokens than this is left out
+MIN_OVERLAP_CHARS = 20  # Shorter shared prefixes/suffixes are coincidence, not overlap
+MAX_OVERLAP_CHARS = 300
+
+def _line_key(line):
+    return " ".join(line.lower().split())
+
+def _strip_overlap(text, earlier):
+    """
+    Removes the start (or end) of text if it repeats the end (or start) of
+    an earlier chunk. Databases built with the old fixed windows share
+    100 characters between neighbouring chunks.
+    """
+    for previous in earlier:
+        for size in range(min(MAX_OVERLAP_CHARS, len(text), len(previous)), MIN_OVERLAP_CHARS - 1, -1):
+            if previous.endswith(text[:size]):
+                text = text[size:]
+                break
+            if previous.startswith(text[-size:]):
+                text = text[:-size]
+                break
+    return text
+
+def pack_chunks(texts, budget=CONTEXT_TOKENS):
+    """
+    Builds the University mode context from retrieved chunk texts, best first.
+    Spans that already appeared in a better chunk (overlap, repeated lines)
+    are dropped, and chunks are added until the token budget is used up;
+    the chunk that doesn't fit is cut at a line break.
+    Returns (context, number of chunks used).
+    """
+    seen = set()
+    parts = []
+    used = 0
+    for position, text in enumerate(texts):
+        text = _strip_overlap(text, texts[:position])
+        lines = []
+        tokens = 0
+        full = True
+        for line in text.splitlines():
+            key = _line_key(line)
+            if not key or key in seen:
+                continue
+            cost = estimate_tokens(line) + 1
+            if used + tokens + cost > budget:
+                full = False
+                break
+            seen.add(key)
+            lines.append(line.strip())
+            tokens += cost
+
+        if lines and (full or tokens >= MIN_PIECE_TOKENS):
+            parts.append("\n".join(lines))
+            used += tokens
+        if not full:
+            break
+    return "\n\n".join(parts), len(parts)
+
+def split_passages(page_text):
+    """Cuts a page into passages of about PASSAGE_TOKENS tokens."""
+    return [text for text, _ in split_text(page_text, budget=PASSAGE_TOKENS)]
+
+def fit_passages(passages, ranked, budget=LINK_CONTEXT_TOKENS):
+    """
+    Takes passages in `ranked` order (positions, best first) while they fit
+    the token budget and returns them joined in page order.
+    """
+    chosen = []
+    used = 0
+    for i in ranked:
+        cost = estimate_tokens(passages[i]) + 1
+        if used + cost <= budget:
+            chosen.append(i)
+            used += cost
+    return "\n\n".join(passages[i] for i in sorted(chosen))
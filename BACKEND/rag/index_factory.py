@@ -0,0 +1,176 @@
+# backend/rag/index_factory.py
+
+import math
+import numpy as np
+import faiss
+
+# --- Settings ---
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+# How flat, HNSW and IVF-Flat indexes store each vector component. float16 and
+# int8 are FAISS scalar quantizers (int8 trains a min/max per dimension);
+# IVF-PQ compresses vectors its own way and ignores this.
+ENCODINGS = {
+    "float32": None,
+    "float16": faiss.ScalarQuantizer.QT_fp16,
+    "int8": faiss.ScalarQuantizer.QT_8bit,
+}
+SQ_NAMES = {"float16": "SQfp16", "int8": "SQ8"}  # For faiss.index_factory descriptions
+FLAT_MAX = 50_000       # "auto": exact search is fast enough below this many vectors
+IVF_FLAT_MAX = 1_000_000  # "auto": IVF-Flat up to here, IVF-PQ beyond
+MIN_TRAIN = 10_000      # IVF / PQ need this many vectors to train useful centroids
+HNSW_M = 32             # Graph degree: higher = better recall, more memory
+HNSW_EF_CONSTRUCTION = 80
+TRAIN_SAMPLE = 100      # Training vectors per IVF list (capped by the corpus size)
+
+# Gemini embeddings are meant for cosine similarity, so every index uses inner
+# product over L2-normalized vectors (inner product of unit vectors = cosine).
+METRIC = faiss.METRIC_INNER_PRODUCT
+
+def normalize(vectors):
+    """Returns a float32 copy of vectors scaled to unit length."""
+    vectors = np.array(vectors, dtype="float32")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+def resolve_index_type(requested, n):
+    """
+    Turns the configured INDEX_TYPE ("auto" or one of INDEX_TYPES) into the
+    type to build for n vectors. IVF types fall back to flat until the
+    corpus is big enough to train them.
+    """
+    if requested == "auto":
+        if n < FLAT_MAX:
+            return "flat"
+        return "ivf_flat" if n < IVF_FLAT_MAX else "ivf_pq"
+    if requested not in INDEX_TYPES:
+        raise ValueError(f"Unknown INDEX_TYPE '{requested}'. Use 'auto' or one of {INDEX_TYPES}")
+    if requested.startswith("ivf") and n < MIN_TRAIN:
+        print(f"Only {n} vectors; using a flat index until there are {MIN_TRAIN} to train {requested}.")
+        return "flat"
+    return requested
+
+def _unwrap(index):
+    if isinstance(index, faiss.IndexIDMap2):
+        return faiss.downcast_index(index.index)
+    return index
+
+def index_type_of(index):
+    """
+    Which of INDEX_TYPES an index is. Indexes that use L2 distance (built
+    before this factory existed) are reported as "flat_l2".
+    """
+    inner = _unwrap(index)
+    if index.metric_type != METRIC:
+        return "flat_l2"
+    if isinstance(inner, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(inner, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(inner, faiss.IndexIVF):
+        return "ivf_flat"
+    return "flat"
+
+def check_encoding(encoding):
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown VECTOR_ENCODING '{encoding}'. Use one of {tuple(ENCODINGS)}")
+    return encoding
+
+def encoding_of(index):
+    """How an index stores its vectors: one of ENCODINGS, or "pq" for IVF-PQ."""
+    inner = _unwrap(index)
+    if isinstance(inner, faiss.IndexIVFPQ):
+        return "pq"
+    if isinstance(inner, faiss.IndexHNSW):
+        inner = faiss.downcast_index(inner.storage)
+    if isinstance(inner, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)):
+        return "float16" if inner.sq.qtype == faiss.ScalarQuantizer.QT_fp16 else "int8"
+    return "float32"
+
+def matches_encoding(index, encoding):
+    """True if the index already stores vectors the way `encoding` asks (IVF-PQ always does)."""
+    return encoding_of(index) in (encoding, "pq")
+
+def can_remove(index_type):
+    """HNSW graphs can't delete vectors; changing them means a rebuild."""
+    return index_type in ("flat", "ivf_flat", "ivf_pq")
+
+def _pq_subquantizers(dimension):
+    """Largest divisor of the dimension that gives sub-vectors of at least 8 dims."""
+    for m in range(dimension // 8, 0, -1):
+        if dimension % m == 0:
+            return m
+    return 1
+
+def build_index(index_type, vectors, ids, encoding="float32"):
+    """
+    Builds an index of the given type over normalized vectors with chunk IDs,
+    storing them as `encoding` (see ENCODINGS).
+    Flat and HNSW are wrapped in IndexIDMap2; IVF indexes keep IDs themselves
+    (with a hashtable direct map, so vectors can be removed and reconstructed).
+    """
+    vectors = normalize(vectors)
+    ids = np.asarray(ids, dtype="int64")
+    n, dimension = vectors.shape
+    qtype = ENCODINGS[check_encoding(encoding)]
+
+    if index_type == "flat":
+        flat = faiss.IndexFlatIP(dimension) if qtype is None else faiss.IndexScalarQuantizer(dimension, qtype, METRIC)
+        index = faiss.IndexIDMap2(flat)
+    elif index_type == "hnsw":
+        if qtype is None:
+            hnsw = faiss.IndexHNSWFlat(dimension, HNSW_M, METRIC)
+        else:
+            hnsw = faiss.IndexHNSWSQ(dimension, qtype, HNSW_M, METRIC)
+        hnsw.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index = faiss.IndexIDMap2(hnsw)
+    else:
+        # ~4*sqrt(n) lists is the usual rule of thumb; each list needs ~39 training points
+        nlist = max(1, min(int(4 * math.sqrt(n)), n // 39))
+        if index_type == "ivf_pq":
+            description = f"IVF{nlist},PQ{_pq_subquantizers(dimension)}"
+        else:
+            description = f"IVF{nlist},{SQ_NAMES.get(encoding, 'Flat')}"
+        index = faiss.index_factory(dimension, description, METRIC)
+
+        sample_size = min(n, nlist * TRAIN_SAMPLE)
+        sample = vectors[np.random.default_rng(0).choice(n, sample_size, replace=False)]
+        print(f"Training {description} on {sample_size} vectors...")
+        index.train(sample)
+        index.set_direct_map_type(faiss.DirectMap.Hashtable)
+
+    if not index.is_trained:
+        index.train(vectors)  # int8 learns each dimension's range
+    index.add_with_ids(vectors, ids)
+    return index
+
+def add_vectors(index, vectors, ids):
+    index.add_with_ids(normalize(vectors), np.asarray(ids, dtype="int64"))
+
+def remove_vectors(index, ids):
+    ids = np.ascontiguousarray(ids, dtype="int64")
+    if isinstance(index, faiss.IndexIVF):
+        # The hashtable direct map only accepts an explicit ID array
+        return index.remove_ids(faiss.IDSelectorArray(len(ids), faiss.swig_ptr(ids)))
+    return index.remove_ids(ids)
+
+def reconstruct_vectors(index, ids):
+    """
+    Reads stored vectors back out of an index, e.g. to retrain or rebuild it
+    without calling the embedding API again. Exact for float32 flat, HNSW
+    and IVF-Flat; approximate for float16, int8 and IVF-PQ.
+    """
+    if len(ids) == 0:
+        return np.zeros((0, index.d), dtype="float32")
+    return index.reconstruct_batch(np.asarray(ids, dtype="int64"))
+
+def set_search_params(index, nprobe=None, ef_search=None):
+    """
+    Search-time knobs: nprobe (IVF lists to visit) and efSearch (HNSW
+    candidate list). Higher = better recall, slower search.
+    """
+    inner = _unwrap(index)
+    ivf = faiss.try_extract_index_ivf(inner)
+    if ivf is not None and nprobe:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+    if isinstance(inner, faiss.IndexHNSW) and ef_search:
+        inner.hnsw.efSearch = ef_search
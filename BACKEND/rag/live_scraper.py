@@ -1,13 +1,25 @@
 # backend/rag/live_scraper.py
 
+import asyncio
+import httpx
 import requests
 import sys
 import os
+import threading
+import time
+from collections import OrderedDict
 
 # Add backend to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import metrics
 from crawler.html_cleaner import clean_html
+from config import MAX_CONCURRENT_SCRAPES, LIVE_PAGE_TTL, LIVE_CACHE_PAGES, LIVE_CACHE_MB
+
+# Fake a browser user-agent so we don't get blocked
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
 
 def scrape_url_live(url):
     """
@@ -15,27 +27,197 @@ def scrape_url_live(url):
     Used when the user provides a specific link to analyze.
     """
     print(f"Live scraping URL: {url}")
-    
+
     try:
-        # Fake a browser user-agent so we don't get blocked
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-        
-        response = requests.get(url, headers=headers, timeout=10)
-        
+        response = requests.get(url, headers=HEADERS, timeout=10)
+
         if response.status_code != 200:
             print(f"Failed to retrieve URL. Status: {response.status_code}")
             return None
-            
+
         # Convert messy HTML to clean text
         text = clean_html(response.text)
-        
+
         if len(text) < 50:
             return None # Page was mostly empty
-            
+
         return text
 
     except Exception as e:
         print(f"Error scraping live URL: {e}")
-        return None
\ No newline at end of file
+        return None
+
+# --- Page Cache ---
+class LivePage:
+    """
+    One fetched link: its cleaned text plus the validators needed to ask
+    the site whether it changed. Link mode fills in passages and their
+    embeddings on first use, so follow-up questions reuse them.
+    """
+
+    def __init__(self, url, text, etag=None, last_modified=None):
+        self.url = url
+        self.text = text
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = time.time()
+        self.passages = None  # Set by rag_engine.link_context_async
+        self.vectors = None   # Normalized passage embeddings (numpy array)
+        self.embed_failed_at = None  # When embedding the passages last failed
+        self.lock = asyncio.Lock()   # Only one request splits and embeds the page
+
+    def size(self):
+        """Approximate memory use in bytes."""
+        size = len(self.text) + sum(len(passage) for passage in self.passages or [])
+        return size + (self.vectors.nbytes if self.vectors is not None else 0)
+
+class PageCache:
+    """
+    LRU cache of LivePage objects by URL, bounded by page count and memory.
+    Entries older than the TTL are not dropped but revalidated with a
+    conditional GET, so an unchanged page keeps its passages and embeddings.
+    """
+
+    def __init__(self, max_pages, max_bytes, ttl):
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.pages = OrderedDict()  # url -> LivePage
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    def get(self, url):
+        with self.lock:
+            page = self.pages.get(url)
+            if page is not None:
+                self.pages.move_to_end(url)
+            return page
+
+    def is_fresh(self, page):
+        return time.time() - page.fetched_at < self.ttl
+
+    def put(self, page):
+        with self.lock:
+            self.pages[page.url] = page
+            self.pages.move_to_end(page.url)
+            self._trim()
+
+    def trim(self):
+        """Call after a cached page grew (e.g. got its embeddings)."""
+        with self.lock:
+            self._trim()
+
+    def _trim(self):
+        # Evict least recently used pages until both limits are met
+        total = sum(page.size() for page in self.pages.values())
+        while self.pages and (len(self.pages) > self.max_pages or total > self.max_bytes):
+            _, evicted = self.pages.popitem(last=False)
+            total -= evicted.size()
+
+    def stats(self):
+        return {
+            "pages": len(self.pages),
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "megabytes": round(sum(page.size() for page in self.pages.values()) / (1024 * 1024), 2),
+        }
+
+page_cache = PageCache(LIVE_CACHE_PAGES, LIVE_CACHE_MB * 1024 * 1024, LIVE_PAGE_TTL)
+
+# --- Async Version ---
+# One pooled client for all link-mode requests; a semaphore caps how many
+# pages we fetch at once so a burst of links can't exhaust the worker.
+_async_client = None
+_scrape_slots = asyncio.Semaphore(MAX_CONCURRENT_SCRAPES)
+_fetches = {}  # url -> task of the fetch in progress, shared by every request for that URL
+
+def get_async_client():
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(headers=HEADERS, timeout=10, follow_redirects=True)
+    return _async_client
+
+async def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+def _stale(cached):
+    if cached is not None:
+        metrics.count("fallbacks_total", kind="stale_page")
+    return cached
+
+async def fetch_live_page_async(url):
+    """
+    Returns the LivePage for a URL, or None if it can't be read.
+    A page fetched within the TTL is served from the cache; an older one is
+    revalidated (ETag / Last-Modified) and only downloaded again if it changed.
+    If the site is unreachable, a cached copy is better than nothing.
+    Requests for a URL that is already being fetched wait for that fetch.
+    """
+    cached = page_cache.get(url)
+    if cached is not None and page_cache.is_fresh(cached):
+        page_cache.hits += 1
+        return cached
+
+    task = _fetches.get(url)
+    if task is None:
+        task = asyncio.ensure_future(_fetch_page(url, cached))
+        _fetches[url] = task
+        task.add_done_callback(lambda _: _fetches.pop(url, None))
+    # shield: one request giving up must not cancel the fetch for the others
+    return await asyncio.shield(task)
+
+async def _fetch_page(url, cached):
+    print(f"Live scraping URL: {url}")
+    headers = {}
+    if cached is not None:
+        if cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+
+    try:
+        async with _scrape_slots:
+            with metrics.timed("page_fetch"):
+                response = await get_async_client().get(url, headers=headers)
+
+        if response.status_code == 304 and cached is not None:
+            page_cache.revalidated += 1
+            cached.fetched_at = time.time()
+            return cached
+
+        if response.status_code != 200:
+            print(f"Failed to retrieve URL. Status: {response.status_code}")
+            return _stale(cached)
+
+        # Convert messy HTML to clean text
+        with metrics.timed("clean_html"):
+            text = await asyncio.to_thread(clean_html, response.text)
+    except Exception as e:
+        print(f"Error scraping live URL: {e}")
+        metrics.count("errors_total", stage="page_fetch")
+        return _stale(cached)
+
+    page_cache.misses += 1
+    if len(text) < 50:
+        return None # Page was mostly empty
+    if cached is not None and cached.text == text:
+        # No validators, but the same content: keep the embeddings
+        cached.fetched_at = time.time()
+        return cached
+
+    page = LivePage(url, text, response.headers.get("etag"), response.headers.get("last-modified"))
+    page_cache.put(page)
+    return page
+
+async def scrape_url_live_async(url):
+    """
+    Async version of scrape_url_live, backed by the page cache.
+    """
+    page = await fetch_live_page_async(url)
+    return page.text if page else None
@@ -0,0 +1,118 @@
+# backend/rag/metadata.py
+#
+# Per-source metadata for filtered retrieval: which campus a document belongs
+# to, what kind of document it is, how recent it is and where it came from.
+# process_data.py stores it with every source, builds one FAISS sub-index per
+# (campus, type) partition, and rag_engine routes filtered queries to only
+# the partitions that match.
+
+import datetime
+import re
+from urllib.parse import urlparse
+
+METADATA_VERSION = 3  # Bump when the rules below change, so process_data re-tags every file
+
+CAMPUSES = ("main", "hyderabad")
+SOURCE_TYPES = ("page", "pdf", "notice", "regulation", "news")
+
+# Checked in order against the URL path (or file name); the first match wins.
+# A word only counts as a whole path segment or a piece of one split by
+# - _ . (so "notice.php" and "CSE_noti_391" match, "emotional" and
+# "wordpress" don't). Documents matching none are "pdf" or "page" by format.
+def _segment_re(words):
+    return re.compile(rf"(?:^|[/_.\-])(?:{words})(?:[/_.\-]|$)", re.IGNORECASE)
+
+SOURCE_TYPE_RULES = (
+    ("notice", _segment_re(r"noti|notices?|notifications?|circulars?|announcements?")),
+    ("regulation", _segment_re(r"regulations?|polic(?:y|ies)|rules|ordinances?|syllabus|syllabi|curricul(?:um|a)")),
+    ("news", _segment_re(r"news|newsletters?|blogs?|events?|press|press-releases?")),
+)
+HYDERABAD_RE = re.compile(r"(?:^|[/_])hyd(?:erabad)?(?:[/_.]|$)", re.IGNORECASE)
+# Notices carry their publication date in the path, e.g. noti_391_2025_11_09
+URL_DATE_RE = re.compile(r"(20\d\d)[-_/](\d\d)[-_/](\d\d)")
+
+def _date_in(path):
+    match = URL_DATE_RE.search(path)
+    if match:
+        try:
+            return datetime.date(*map(int, match.groups()))
+        except ValueError:  # e.g. a version number that looks like a date
+            pass
+    return None
+
+def source_metadata(name, url=None, first_seen=None):
+    """
+    Metadata of one source file: {"url", "campus", "type", "date"}.
+    name: file name in data/; url: where the crawler found it (if known);
+    first_seen: Unix time the crawler first saw this content at the URL
+    (recrawls of unchanged content don't move it, see crawl_store.py).
+    The date is the one in the URL if there is one, otherwise first_seen,
+    otherwise None: undated documents never pass max_age_days and get no
+    recency boost, which is better than passing for new.
+    """
+    path = urlparse(url).path if url else name
+    campus = "hyderabad" if HYDERABAD_RE.search(path) else "main"
+    kind = "pdf" if name.lower().endswith(".pdf") else "page"
+    for rule_type, pattern in SOURCE_TYPE_RULES:
+        if pattern.search(path):
+            kind = rule_type
+            break
+
+    date = _date_in(path)
+    if date is None and first_seen:
+        date = datetime.date.fromtimestamp(first_seen)
+    return {"url": url, "campus": campus, "type": kind, "date": date.isoformat() if date else None}
+
+def partition_key(meta):
+    """The FAISS sub-index a source's chunks go into, e.g. "hyderabad/notice"."""
+    return f"{meta.get('campus') or 'main'}/{meta.get('type') or 'page'}"
+
+def day_number(date_text):
+    """ISO date -> days since 1970-01-01 (for cheap vectorized age checks), or -1."""
+    if not date_text:
+        return -1
+    return (datetime.date.fromisoformat(date_text) - datetime.date(1970, 1, 1)).days
+
+def today_number():
+    return (datetime.date.today() - datetime.date(1970, 1, 1)).days
+
+def _names(value, what):
+    """A name or list of names as a list; anything else is a ValueError (not a TypeError from set())."""
+    names = [value] if isinstance(value, str) else value
+    if not isinstance(names, (list, tuple)) or not all(isinstance(name, str) for name in names):
+        raise ValueError(f"Each {what} must be a string")
+    return list(names)
+
+def make_filters(campus=None, source_types=None, max_age_days=None):
+    """
+    Checks and normalizes the optional retrieval filters of a chat request.
+    Returns a dict (or None when nothing is filtered); raises ValueError for
+    unknown values.
+    """
+    filters = {}
+    if campus:
+        campuses = _names(campus, "campus")
+        unknown = set(campuses) - set(CAMPUSES)
+        if unknown:
+            raise ValueError(f"Unknown campus {sorted(unknown)}. Use one of {CAMPUSES}")
+        filters["campus"] = tuple(sorted(set(campuses)))
+    if source_types:
+        types = _names(source_types, "source type")
+        unknown = set(types) - set(SOURCE_TYPES)
+        if unknown:
+            raise ValueError(f"Unknown source type {sorted(unknown)}. Use any of {SOURCE_TYPES}")
+        filters["type"] = tuple(sorted(set(types)))
+    if max_age_days is not None:
+        if max_age_days <= 0:
+            raise ValueError("max_age_days must be positive")
+        filters["max_age_days"] = int(max_age_days)
+    return filters or None
+
+def partition_matches(key, filters):
+    """True if the partition "campus/type" can hold chunks the filters allow."""
+    campus, kind = key.split("/", 1)
+    return campus in filters.get("campus", (campus,)) and kind in filters.get("type", (kind,))
+
+def filter_key(filters):
+    """Hashable form of a filters dict (for caches)."""
+    return tuple(sorted((filters or {}).items()))
@@ -0,0 +1,66 @@
+# backend/rag/micro_batcher.py
+
+import asyncio
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+
+class MicroBatcher:
+    """
+    Coalesces concurrent async calls into batches.
+
+    Each submit() waits at most max_wait seconds for other requests to join;
+    a batch is sent as soon as it has max_batch items. The handler gets the
+    list of items and returns one result per item, and every caller gets
+    its own result back (or the handler's exception).
+
+    Under load this turns N one-row calls (N embedding round trips, N FAISS
+    searches) into one; when requests are rare it only adds max_wait.
+    """
+
+    def __init__(self, name, handler, max_batch, max_wait):
+        self.name = name  # Label in the batch metrics
+        self.handler = handler  # async fn(list of items) -> list of results
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.pending = []  # (item, future)
+        self.timer = None
+
+    async def submit(self, item):
+        if self.max_batch <= 1:
+            return (await self.handler([item]))[0]
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((item, future))
+        if len(self.pending) >= self.max_batch:
+            self._flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending = self.pending, []
+        if batch:
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch):
+        metrics.count("batches_total", kind=self.name)
+        metrics.count("batched_items_total", len(batch), kind=self.name)
+        try:
+            results = await self.handler([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():  # The caller may have been cancelled meanwhile
+                future.set_result(result)
@@ -1,119 +1,508 @@
 # backend/rag/process_data.py
 
 import os
-import pickle
+import hashlib
+import json
+import time
 import numpy as np
 import faiss
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Add backend to path to import other modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from llm.gemini_client import embed_text
-from crawler.pdf_reader import extract_pdf_text
+from llm.gemini_client import EMBEDDING_MODEL, embed_texts
+from llm.resilience import backoff_delay, is_rate_limited, is_retryable
+from crawler.pdf_reader import extract_pdfs_parallel
+from crawler.dedup import SimHashIndex, simhash
+from crawler.crawl_store import CrawlStore
+from rag.chunk_store import ChunkStore, store_paths, write_chunk_store
+from rag import index_factory
+from rag.bm25_index import index_paths, write_bm25_index
+from rag import snapshots
+from rag.metadata import METADATA_VERSION, partition_key, source_metadata
+from rag.chunker import NearDuplicateFilter, chunker_settings, split_text
+from config import INDEX_TYPE, VECTOR_ENCODING, EMBEDDING_DIM
 
 # --- Settings ---
 DATA_DIR = "data"
-VECTOR_DB_FILE = "rag/vector_store.faiss"
-INDEX_FILE = "rag/index.pkl"
-CHUNK_SIZE = 1000  # How many characters per chunk
-OVERLAP = 100      # Overlap ensures we don't cut sentences in half awkwardly
-
-def load_raw_data():
-    """
-    Reads all files from data/pdfs and data/html
-    Returns a list of dicts: [{'text': '...', 'source': 'filename'}]
-    """
-    raw_docs = []
-    
-    # 1. Read PDFs
-    pdf_dir = os.path.join(DATA_DIR, "pdfs")
-    if os.path.exists(pdf_dir):
-        for filename in os.listdir(pdf_dir):
-            if filename.endswith(".pdf"):
-                path = os.path.join(pdf_dir, filename)
-                print(f"Processing PDF: {filename}")
-                text = extract_pdf_text(path)
-                if text:
-                    raw_docs.append({"text": text, "source": filename})
-
-    # 2. Read HTML text files
-    html_dir = os.path.join(DATA_DIR, "html")
-    if os.path.exists(html_dir):
-        for filename in os.listdir(html_dir):
-            if filename.endswith(".txt"):
-                path = os.path.join(html_dir, filename)
-                with open(path, "r", encoding="utf-8") as f:
-                    text = f.read()
-                    raw_docs.append({"text": text, "source": filename})
-    
-    return raw_docs
-
-def chunk_text(text, source):
-    """
-    Splits long text into smaller chunks for the AI.
-    """
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + CHUNK_SIZE
-        chunk = text[start:end]
-        chunks.append({"text": chunk, "source": source})
-        start += CHUNK_SIZE - OVERLAP # Move forward, but overlap a bit
-    return chunks
-
-def build_vector_store():
-    print("Step 1: Loading data from crawler folders...")
-    raw_docs = load_raw_data()
-    
-    if not raw_docs:
+# Every build is written as a new snapshot in rag/snapshots/<version>/ (see snapshots.py):
+#   vector_store.faiss  FAISS index
+#   chunks.*            Chunk text + source/page metadata (see chunk_store.py)
+#   lexical.*           BM25 index over the same chunks (see bm25_index.py)
+#   manifest.json       Remembers what is already embedded (see build_vector_store)
+#   partitions/         One FAISS sub-index per campus/type (see metadata.py)
+RAG_DIR = "rag"
+CRAWL_DB_FILE = os.path.join(DATA_DIR, "crawl_state.db")  # Where the crawler found each file
+
+# --- Embedding Scheduler Settings ---
+EMBED_BATCH_SIZE = 100   # Texts per API request (Gemini allows up to 100)
+EMBED_WORKERS = 4        # How many batch requests may be in flight at once
+MAX_RETRIES = 5          # Attempts per batch before we give up on it
+MAX_RATE_LIMITED = 20    # 429s per batch before we give up on it (the shared limiter paces these retries)
+BACKOFF_BASE = 1.0       # Seconds; doubles after every failed attempt
+BACKOFF_MAX = 30.0
+
+def list_source_files():
+    """
+    Lists all crawler output files in data/pdfs and data/html.
+    Returns a list of (source_name, path) tuples.
+    """
+    sources = []
+    for subdir, extension in (("pdfs", ".pdf"), ("html", ".txt")):
+        folder = os.path.join(DATA_DIR, subdir)
+        if not os.path.exists(folder):
+            continue
+        for filename in sorted(os.listdir(folder)):
+            if filename.endswith(extension):
+                sources.append((filename, os.path.join(folder, filename)))
+    return sources
+
+def load_crawl_sources():
+    """{file name stem: (url, first_seen)} from the crawler's database, if there is one."""
+    if not os.path.exists(CRAWL_DB_FILE):
+        return {}
+    store = CrawlStore(CRAWL_DB_FILE)
+    try:
+        return store.content_sources()
+    finally:
+        store.close()
+
+def describe_source(source, path, crawl_sources):
+    """
+    Metadata of one file (see metadata.py). The URL comes from the crawl
+    store, or from the "Source:" line the crawler writes atop HTML text.
+    Without a crawl date (or a date in the URL) the date stays unknown: the
+    file's modification time is just when it was checked out or deployed.
+    """
+    url, first_seen = crawl_sources.get(os.path.splitext(source)[0], (None, None))
+    if url is None and path.endswith(".txt"):
+        with open(path, "r", encoding="utf-8") as f:
+            first_line = f.readline()
+        if first_line.startswith("Source: "):
+            url = first_line[len("Source: "):].strip()
+    return source_metadata(source, url, first_seen)
+
+def read_sources(paths):
+    """
+    Reads many PDF / HTML text files. PDFs are extracted in parallel, page by page.
+    Returns {path: (text, page_starts)}; page_starts is a list of
+    (character offset, page number) for PDFs and None for HTML.
+    """
+    pdf_paths = [path for path in paths if path.endswith(".pdf")]
+    if pdf_paths:
+        print(f"Processing {len(pdf_paths)} PDFs...")
+    pdf_pages = extract_pdfs_parallel(pdf_paths)
+
+    texts = {}
+    for path in paths:
+        if path in pdf_pages:
+            texts[path] = join_pages(pdf_pages[path])
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                texts[path] = (f.read(), None)
+    return texts
+
+def join_pages(pages):
+    """
+    Joins [(page_number, text), ...] into one string, remembering where each page starts.
+    """
+    parts = []
+    page_starts = []
+    offset = 0
+    for page_number, text in pages:
+        page_starts.append((offset, page_number))
+        parts.append(text + "\n")
+        offset += len(text) + 1
+    return "".join(parts), page_starts
+
+def file_hash(path):
+    """SHA-256 of a file's bytes, read in blocks so big PDFs don't sit in memory."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def chunk_text(text, source, page_starts=None):
+    """
+    Splits long text into smaller chunks for the AI, along headings, lines
+    and sentences (see rag/chunker.py).
+    For PDFs, each chunk also records the page it starts on.
+    """
+    return [{"text": chunk, "source": source, "page": page} for chunk, page in split_text(text, page_starts)]
+
+def embed_batch_with_retry(texts):
+    """
+    Embeds one batch, retrying with exponential backoff (plus jitter) on 5xx.
+    embed_texts waits for the shared Gemini quota (see llm/rate_limiter.py)
+    and a 429 slows that quota down, so rate limits are simply tried again
+    once there is room: ingest runs as fast as the quota left over by chat allows.
+    Returns the list of vectors, or None if the batch kept failing.
+    """
+    failures = rate_limited = 0
+    while True:
+        try:
+            return embed_texts(texts)
+        except Exception as e:
+            if is_rate_limited(e) and rate_limited < MAX_RATE_LIMITED:
+                rate_limited += 1
+                print("⚠️ Embedding batch rate limited. Waiting for quota...")
+                continue
+            if not is_retryable(e) or failures == MAX_RETRIES - 1:
+                print(f"❌ Embedding batch failed: {e}")
+                return None
+            delay = backoff_delay(failures, BACKOFF_BASE, BACKOFF_MAX)
+            failures += 1
+            print(f"⚠️ Embedding batch error ({e}). Retrying in {delay:.1f}s...")
+            time.sleep(delay)
+
+def embed_chunks(chunks, batch_size=EMBED_BATCH_SIZE, workers=EMBED_WORKERS):
+    """
+    Embeds all chunks using batched requests, with at most `workers` in flight.
+    Returns (embeddings, kept_chunks) in the original chunk order, embeddings
+    as one float32 array; chunks whose batch failed for good are left out.
+    """
+    batches = [chunks[i:i + batch_size] for i in range(0, len(chunks), batch_size)]
+    # Each batch is copied into one preallocated array as it arrives (sized
+    # when the first one tells us the dimension), instead of keeping every
+    # vector as a Python list of floats: those take ~8x the memory.
+    embeddings = None
+    succeeded = [False] * len(batches)
+    done = 0
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(embed_batch_with_retry, [c["text"] for c in batch]): n
+            for n, batch in enumerate(batches)
+        }
+        for future in as_completed(futures):
+            n = futures[future]
+            vectors = future.result()
+            if vectors is not None:
+                if embeddings is None:
+                    embeddings = np.empty((len(chunks), len(vectors[0])), dtype="float32")
+                embeddings[n * batch_size:n * batch_size + len(vectors)] = vectors
+                succeeded[n] = True
+            done += len(batches[n])
+            elapsed = time.perf_counter() - started
+            rate = done / elapsed if elapsed > 0 else 0.0
+            print(f"Embedded {done}/{len(chunks)} chunks ({rate:.1f} chunks/sec)")
+
+    if embeddings is None:
+        print(f"Skipped {len(chunks)} chunks due to errors.")
+        return np.empty((0, 0), dtype="float32"), []
+
+    # Close the gaps left by failed batches, in place
+    kept = 0
+    kept_chunks = []
+    for n, batch in enumerate(batches):
+        if not succeeded[n]:
+            print(f"Skipped {len(batch)} chunks due to errors.")
+            continue
+        embeddings[kept:kept + len(batch)] = embeddings[n * batch_size:n * batch_size + len(batch)]
+        kept += len(batch)
+        kept_chunks.extend(batch)
+
+    return embeddings[:kept], kept_chunks
+
+def embedding_settings():
+    """What the stored vectors were made with. Vectors of another model or dimension can't be mixed."""
+    return {"model": EMBEDDING_MODEL, "dimension": EMBEDDING_DIM or None}
+
+def empty_manifest():
+    return {"next_id": 0, "chunker": chunker_settings(), "embedding": embedding_settings(), "sources": {}}
+
+def load_existing_store():
+    """
+    Loads the manifest, FAISS index and chunk store of the current snapshot
+    (or of a database built before snapshots existed).
+    Returns None when there is nothing usable to update incrementally
+    (first run, or a database built before manifests existed).
+    """
+    _, paths = snapshots.current_paths(RAG_DIR)
+    needed = [paths["manifest"], paths["vectors"]] + list(store_paths(paths["chunks"]).values())
+    if not all(os.path.exists(path) for path in needed):
+        return None
+    try:
+        with open(paths["manifest"], "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        index = faiss.read_index(paths["vectors"])
+        chunk_store = ChunkStore(paths["chunks"])
+    except Exception as e:
+        print(f"Could not load the existing database ({e}). Doing a full rebuild.")
+        return None
+
+    # Incremental updates need vectors addressed by chunk ID, not by position
+    if not isinstance(index, (faiss.IndexIDMap2, faiss.IndexIVF)):
+        print("Existing database has no chunk IDs. Doing a full rebuild.")
+        chunk_store.close()
+        return None
+    # Manifests from before EMBEDDING_DIM were made with the model's full dimension
+    if manifest.get("embedding", {"model": EMBEDDING_MODEL, "dimension": None}) != embedding_settings():
+        print("Embedding model or EMBEDDING_DIM changed since the last run. Re-embedding everything.")
+        chunk_store.close()
+        return None
+    return manifest, index, chunk_store, paths
+
+def stored_chunks(old_store, removed_ids, new_chunks):
+    """
+    Yields every chunk that belongs in the new chunk store:
+    the ones we kept from the last run, then the newly embedded ones.
+    """
+    if old_store:
+        for chunk_id in old_store.ids():
+            if int(chunk_id) not in removed_ids:
+                yield old_store.get(int(chunk_id))
+    yield from new_chunks
+
+def build_partitions(index, sources, paths, encoding=VECTOR_ENCODING):
+    """
+    Writes one sub-index per partition (campus/type), so a filtered query
+    only searches the chunks it may return. The vectors are read back out of
+    the main index, nothing is embedded again.
+    Returns {partition key: vector count}.
+    """
+    groups = {}
+    for entry in sources.values():
+        if entry["chunks"]:
+            groups.setdefault(partition_key(entry["meta"]), []).extend(chunk["id"] for chunk in entry["chunks"])
+
+    os.makedirs(paths["partitions"], exist_ok=True)
+    counts = {}
+    for key, ids in sorted(groups.items()):
+        vectors = index_factory.reconstruct_vectors(index, ids)
+        partition = index_factory.build_index(index_factory.resolve_index_type(INDEX_TYPE, len(ids)), vectors, ids, encoding)
+        faiss.write_index(partition, snapshots.partition_file(paths, key))
+        counts[key] = len(ids)
+    print("Partitions: " + ", ".join(f"{key} ({count})" for key, count in counts.items()))
+    return counts
+
+def build_lexical_index(chunk_prefix, lexical_prefix):
+    """
+    Rebuilds the BM25 index from a chunk store on disk. Tokenizing is
+    cheap next to embedding, so it is simply redone on every change.
+    """
+    store = ChunkStore(chunk_prefix)
+    try:
+        n_terms = write_bm25_index((store.get(int(chunk_id)) for chunk_id in store.ids()), lexical_prefix)
+    finally:
+        store.close()
+    print(f"BM25 index: {n_terms} terms over {len(store)} chunks.")
+
+def build_vector_store(full_rebuild=False):
+    """
+    Brings the FAISS database in line with the files in data/.
+
+    The manifest maps every source file to its content hash and to the
+    (chunk ID, chunk hash) pairs it produced. Unchanged files are not even
+    re-read, changed files only embed the chunks whose text is new, and
+    chunks of changed or deleted files are removed from the ID-mapped index.
+    """
+    existing = None if full_rebuild else load_existing_store()
+    if existing:
+        manifest, index, old_store, old_paths = existing
+    else:
+        manifest, index, old_store, old_paths = empty_manifest(), None, None, None
+
+    print("Step 1: Checking data in crawler folders for changes...")
+    source_files = list_source_files()
+    if not source_files:
         print("No data found! Did you run the crawler first?")
         return
 
-    print(f"Step 2: Splitting {len(raw_docs)} documents into chunks...")
-    chunked_docs = []
-    for doc in raw_docs:
-        new_chunks = chunk_text(doc["text"], doc["source"])
-        chunked_docs.extend(new_chunks)
-    
-    print(f"Total chunks created: {len(chunked_docs)}")
-
-    print("Step 3: Generating Embeddings (This calls Gemini API)...")
-    embeddings = []
-    final_docs = [] # We only keep docs that successfully got an embedding
-
-    # Process in batches to be safe
-    for i, doc in enumerate(chunked_docs):
-        emb = embed_text(doc["text"])
-        if emb:
-            embeddings.append(emb)
-            final_docs.append(doc["text"]) # Store just text for retrieval
-            # Optional: print progress every 10 chunks
-            if i % 10 == 0:
-                print(f"Embedded {i}/{len(chunked_docs)} chunks...")
+    old_sources = manifest["sources"]
+    # Files chunked with other settings are re-chunked; identical chunks still keep their vectors
+    same_chunker = manifest.get("chunker") == chunker_settings()
+    if not same_chunker and old_sources:
+        print("Chunking rules changed since the last run. Re-chunking every file.")
+    new_sources = {}
+    to_embed = []     # Chunks that need a fresh embedding
+    removed_ids = []  # Chunk IDs whose vectors must leave the index
+    unchanged = 0
+
+    changed = []
+    present = {source for source, _ in source_files}
+    for source, path in source_files:
+        current_hash = file_hash(path)
+        old_entry = old_sources.get(source)
+        # A skipped near-duplicate file is indexed after all once its original is gone
+        orphaned = old_entry and old_entry.get("duplicate_of") and old_entry["duplicate_of"] not in present
+
+        if same_chunker and old_entry and old_entry["file_hash"] == current_hash and not orphaned:
+            new_sources[source] = old_entry
+            unchanged += 1
         else:
-            print(f"Skipped chunk {i} due to error.")
+            changed.append((source, path, current_hash, old_entry))
 
-    if not embeddings:
-        print("Failed to generate embeddings.")
-        return
+    print("Step 2: Splitting new and changed documents into chunks...")
+    texts = read_sources([path for _, path, _, _ in changed])
+
+    # Boilerplate repeated across pages is only embedded once. Chunks of
+    # unchanged files are already in the database, so they count as seen.
+    # (A dropped copy is not restored if the file holding the kept one is
+    # deleted later; run with --full to redo the deduplication.)
+    duplicates = NearDuplicateFilter()
+    for entry in new_sources.values():
+        for chunk in entry["chunks"]:
+            duplicates.add(old_store.get(chunk["id"])["text"])
+    # Whole files that nearly duplicate another one (the same notice reached
+    # through two URLs, the same PDF re-exported) are skipped before chunking
+    documents = SimHashIndex()
+    for source, entry in new_sources.items():
+        if not entry.get("duplicate_of"):
+            documents.add(entry.get("simhash"), source)
+    dropped = 0
+    duplicate_files = 0
+    for source, path, current_hash, old_entry in changed:
+        text, page_starts = texts.pop(path)
+        fingerprint = simhash(text) if text else None
+        original = documents.find(fingerprint)
+        if original:
+            duplicate_files += 1
+            removed_ids.extend(entry["id"] for entry in (old_entry["chunks"] if old_entry else []))
+            new_sources[source] = {"file_hash": current_hash, "simhash": fingerprint, "duplicate_of": original, "chunks": []}
+            continue
+        documents.add(fingerprint, source)
+        chunks = chunk_text(text, source, page_starts) if text else []
+
+        # Chunks whose text did not change keep their ID (and vector)
+        reusable = {}
+        for entry in (old_entry["chunks"] if old_entry else []):
+            reusable.setdefault(entry["hash"], []).append(entry["id"])
+
+        kept = []
+        for chunk in chunks:
+            if not duplicates.add(chunk["text"]):
+                dropped += 1
+                continue
+            chunk["hash"] = text_hash(chunk["text"])
+            if reusable.get(chunk["hash"]):
+                kept.append({"id": reusable[chunk["hash"]].pop(), "hash": chunk["hash"]})
+            else:
+                chunk["id"] = manifest["next_id"]
+                manifest["next_id"] += 1
+                to_embed.append(chunk)
+
+        for ids in reusable.values():
+            removed_ids.extend(ids)
+        new_sources[source] = {"file_hash": current_hash, "simhash": fingerprint, "chunks": kept}
+
+    for source, old_entry in old_sources.items():
+        if source not in new_sources:
+            print(f"Source removed: {source}")
+            removed_ids.extend(entry["id"] for entry in old_entry["chunks"])
+
+    print(f"{unchanged} unchanged files, {len(to_embed)} chunks to embed, {len(removed_ids)} chunks to remove, "
+          f"{duplicate_files} near-duplicate files and {dropped} near-duplicate chunks skipped.")
+    # Metadata is cheap to derive, so it is redone for every changed file and
+    # for all files when the rules in metadata.py change
+    same_metadata = manifest.get("metadata") == METADATA_VERSION
+    crawl_sources = load_crawl_sources()
+    for source, path in source_files:
+        entry = new_sources[source]
+        if "meta" not in entry or not same_metadata:
+            entry["meta"] = describe_source(source, path, crawl_sources)
+
+    # A file can change without changing any chunk that is kept (e.g. its edit
+    # only touched a near-duplicate chunk); its new hash must still be saved,
+    # or it would count as changed on every run
+    if (same_chunker and same_metadata and not to_embed and not removed_ids and index is not None
+            and new_sources == old_sources):
+        if (index_factory.index_type_of(index) == index_factory.resolve_index_type(INDEX_TYPE, index.ntotal)
+                and index_factory.matches_encoding(index, VECTOR_ENCODING)):
+            # A database from before snapshots (or BM25, or partitions) is still republished once
+            if (snapshots.current_version(RAG_DIR) and os.path.isdir(old_paths["partitions"] or "")
+                    and all(os.path.exists(path) for path in index_paths(old_paths["lexical"]).values())):
+                print("Database is already up to date.")
+                return
+
+    # IDs of chunks that keep their existing vector
+    retained_ids = [entry["id"] for source in new_sources.values() for entry in source["chunks"]]
 
-    print("Step 4: Saving to FAISS database...")
-    # Convert to numpy array for FAISS
-    embedding_matrix = np.array(embeddings).astype("float32")
-    
-    # Create FAISS index
-    dimension = len(embeddings[0])
-    index = faiss.IndexFlatL2(dimension)
-    index.add(embedding_matrix)
+    embeddings, kept_chunks = None, []
+    if to_embed:
+        print("Step 3: Generating Embeddings (This calls Gemini API)...")
+        embeddings, kept_chunks = embed_chunks(to_embed)
 
-    # Save to disk
-    faiss.write_index(index, VECTOR_DB_FILE)
-    with open(INDEX_FILE, "wb") as f:
-        pickle.dump(final_docs, f)
+        embedded_ids = {chunk["id"] for chunk in kept_chunks}
+        for chunk in to_embed:
+            entry = new_sources[chunk["source"]]
+            if chunk["id"] in embedded_ids:
+                entry["chunks"].append({"id": chunk["id"], "hash": chunk["hash"]})
+            else:
+                # Forget the file hash so the failed chunks are retried next run
+                entry["file_hash"] = None
+
+    new_ids = [chunk["id"] for chunk in kept_chunks]
+    target_type = index_factory.resolve_index_type(INDEX_TYPE, len(retained_ids) + len(new_ids))
+
+    print("Step 4: Updating FAISS database...")
+    if (index is not None and index_factory.index_type_of(index) == target_type and index_factory.can_remove(target_type)
+            and index_factory.matches_encoding(index, VECTOR_ENCODING)):
+        if removed_ids:
+            index_factory.remove_vectors(index, removed_ids)
+        if new_ids:
+            index_factory.add_vectors(index, embeddings, new_ids)
+    else:
+        # First build, a different index type (e.g. the corpus is now big enough
+        # to train IVF) or VECTOR_ENCODING, or an HNSW graph that can't delete:
+        # rebuild from the stored vectors plus the new ones, without
+        # re-embedding anything. (Vectors read back from a float16 / int8
+        # index are approximate; --full re-embeds them exactly.)
+        if index is not None:
+            old_vectors = index_factory.reconstruct_vectors(index, retained_ids)
+        else:
+            retained_ids, old_vectors = [], None
+        if not retained_ids and not new_ids:
+            print("Failed to generate embeddings.")
+            return
+
+        parts = [v for v in (old_vectors, embeddings) if v is not None and len(v)]
+        print(f"Building '{target_type}' index ({VECTOR_ENCODING}) over {len(retained_ids) + len(new_ids)} vectors...")
+        index = index_factory.build_index(target_type, np.vstack(parts), retained_ids + new_ids, VECTOR_ENCODING)
+
+    manifest["sources"] = new_sources
+    manifest["chunker"] = chunker_settings()
+    manifest["embedding"] = embedding_settings()
+    manifest["metadata"] = METADATA_VERSION
+
+    # Save to disk as a new snapshot. Nothing reads it until it is published,
+    # so the running server never sees a half-written index or chunk store.
+    version, paths = snapshots.new_snapshot(RAG_DIR)
+    faiss.write_index(index, paths["vectors"])
+    partitions = build_partitions(index, new_sources, paths)
+    source_meta = {source: entry["meta"] for source, entry in new_sources.items()}
+    n_chunks = write_chunk_store(
+        stored_chunks(old_store, set(removed_ids), kept_chunks), paths["chunks"], source_meta,
+    )
+    if old_store:
+        old_store.close()
+    build_lexical_index(paths["chunks"], paths["lexical"])
+    with open(paths["manifest"], "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    snapshots.publish_snapshot(RAG_DIR, version, paths, {
+        "vectors": int(index.ntotal),
+        "chunks": n_chunks,
+        "index_type": index_factory.index_type_of(index),
+        "encoding": index_factory.encoding_of(index),
+        "dimension": int(index.d),
+        "partitions": partitions,
+    })
 
     print("SUCCESS: Database built!")
-    print(f"Saved {VECTOR_DB_FILE} and {INDEX_FILE}")
+    print(f"{index.ntotal} chunks indexed. Published snapshot {version}; running servers pick it up on their next reload.")
 
 if __name__ == "__main__":
-    build_vector_store()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build or update the RAG vector store.")
+    parser.add_argument("--full", action="store_true", help="Ignore the manifest and rebuild everything")
+    args = parser.parse_args()
+
+    build_vector_store(full_rebuild=args.full)
\ No newline at end of file
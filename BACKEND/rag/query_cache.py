@@ -0,0 +1,180 @@
+# backend/rag/query_cache.py
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+def normalize_query(query):
+    """
+    Maps trivially different phrasings to one cache key:
+    "  Hostel FEES? " and "hostel fees" are the same question.
+    """
+    query = re.sub(r"\s+", " ", query.lower()).strip()
+    return query.strip(" ?!.,;:")
+
+def make_key(*parts):
+    """Stable short key for any JSON-serializable parts."""
+    raw = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class MemoryCache:
+    """
+    In-process LRU cache with a time-to-live per entry.
+    Thread-safe, because FastAPI runs sync code on a thread pool.
+    """
+
+    def __init__(self, name, max_size, ttl):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (expires_at, value)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.time():
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)  # Most recently used goes last
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.time() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)  # Evict least recently used
+
+    # Memory lookups are instant, so the async path can call them directly
+    async def get_async(self, key):
+        return self.get(key)
+
+    async def set_async(self, key, value):
+        self.set(key, value)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "backend": "memory",
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+class SQLiteCache:
+    """
+    Cache shared by every worker process on the machine, stored in one
+    SQLite file. Same LRU + TTL behaviour as MemoryCache. Hit/miss counts
+    are per process.
+    """
+
+    def __init__(self, name, max_size, ttl, path):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = path
+        self.local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        with self._db() as db:
+            db.execute(
+                f"CREATE TABLE IF NOT EXISTS {name} "
+                "(key TEXT PRIMARY KEY, value TEXT, expires_at REAL, used_at REAL)"
+            )
+
+    def _db(self):
+        # sqlite3 connections can't be shared between threads, so keep one per thread
+        if not hasattr(self.local, "db"):
+            self.local.db = sqlite3.connect(self.path, timeout=5)
+            self.local.db.execute("PRAGMA journal_mode=WAL")
+        return self.local.db
+
+    def get(self, key):
+        now = time.time()
+        try:
+            with self._db() as db:
+                row = db.execute(f"SELECT value FROM {self.name} WHERE key = ? AND expires_at > ?", (key, now)).fetchone()
+                if row:
+                    db.execute(f"UPDATE {self.name} SET used_at = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            print(f"Cache read error ({self.name}): {e}")
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        now = time.time()
+        try:
+            with self._db() as db:
+                db.execute(
+                    f"INSERT OR REPLACE INTO {self.name} (key, value, expires_at, used_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now + self.ttl, now),
+                )
+                self.writes += 1
+                # Trimming costs a scan, so only do it every 100 writes
+                if self.writes % 100 == 0:
+                    db.execute(f"DELETE FROM {self.name} WHERE expires_at <= ?", (now,))
+                    db.execute(
+                        f"DELETE FROM {self.name} WHERE key IN (SELECT key FROM {self.name} "
+                        "ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                        (self.max_size,),
+                    )
+        except sqlite3.Error as e:
+            print(f"Cache write error ({self.name}): {e}")
+
+    # A read or write may wait up to 5s for another worker's lock on the
+    # file, so the async path runs them on a thread, off the event loop
+    async def get_async(self, key):
+        return await asyncio.to_thread(self.get, key)
+
+    async def set_async(self, key, value):
+        await asyncio.to_thread(self.set, key, value)
+
+    def clear(self):
+        with self._db() as db:
+            db.execute(f"DELETE FROM {self.name}")
+
+    def stats(self):
+        total = self.hits + self.misses
+        entries = self._db().execute(f"SELECT COUNT(*) FROM {self.name}").fetchone()[0]
+        return {
+            "backend": "sqlite",
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+def make_cache(name, max_size, ttl, backend="memory", path=None):
+    """
+    Returns a MemoryCache, or a SQLiteCache when backend == "sqlite".
+    Falls back to memory if the shared file can't be opened.
+    """
+    if backend == "sqlite":
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            return SQLiteCache(name, max_size, ttl, path)
+        except sqlite3.Error as e:
+            print(f"Shared cache unavailable ({e}), using in-memory cache for {name}.")
+    return MemoryCache(name, max_size, ttl)
@@ -2,98 +2,676 @@
 
 import faiss
 import pickle
+import asyncio
+import contextvars
 import os
+import threading
+import time
 import numpy as np
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 # Add backend to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from llm.gemini_client import embed_query, ask_gemini
+import metrics
+from llm.gemini_client import (
+    embed_query, ask_gemini, ask_gemini_stream, is_error_reply,
+    ask_gemini_async, ask_gemini_stream_async,
+    embed_texts_async, embed_queries_async, estimate_tokens, EMBED_BATCH_LIMIT,
+)
+from rag.chunk_store import ChunkStore, store_paths
+from rag import index_factory, snapshots
+from rag.metadata import filter_key, partition_matches, today_number
+from rag.bm25_index import BM25Index, index_paths, bm25_scores
+from rag.context_packer import pack_chunks, split_passages, fit_passages
+from rag.live_scraper import fetch_live_page_async, page_cache
+from rag.micro_batcher import MicroBatcher
+from rag.query_cache import make_cache, make_key, normalize_query
+from config import (
+    IVF_NPROBE, HNSW_EF_SEARCH, QUERY_CACHE_BACKEND, QUERY_CACHE_FILE,
+    QUERY_CACHE_SIZE, EMBEDDING_CACHE_TTL, ANSWER_CACHE_TTL, SEARCH_THREADS,
+    RETRIEVAL_MODE, HYBRID_CANDIDATES, LINK_CONTEXT_TOKENS, QUERY_BATCH_SIZE, QUERY_BATCH_WAIT_MS,
+    RECENCY_WEIGHT, RECENCY_HALF_LIFE_DAYS, EMBEDDING_DIM,
+)
 
 # --- Constants ---
 # We use absolute paths relative to this file to avoid "file not found" errors
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-VECTOR_DB_FILE = os.path.join(BASE_DIR, "rag/vector_store.faiss")
-INDEX_FILE = os.path.join(BASE_DIR, "rag/index.pkl")
+RAG_DIR = os.path.join(BASE_DIR, "rag")  # Snapshots live in rag/snapshots (see snapshots.py)
+RRF_K = 60  # Reciprocal rank fusion constant; 60 is the value from the original RRF paper
+AGE_FILTER_OVERSAMPLE = 4  # max_age_days is checked after the search, so fetch more candidates
+LINK_EMBED_RETRY_SECONDS = 60  # After a failed page embedding, Link mode uses BM25 only for this long
 
-# --- Load Database (Global Variables) ---
-# We load these ONCE when the server starts to make chat fast.
-print("Loading RAG Database...")
-index = None
-documents = []
+# --- Caches ---
+# Level 1: normalized question -> query embedding (skips the embedding call)
+# Level 2: (question, retrieved chunk IDs, index version) -> answer (skips Gemini)
+# Because the index version is part of the answer key, a rebuilt database
+# never serves answers that were generated from the old chunks.
+CACHE_PATH = os.path.join(BASE_DIR, QUERY_CACHE_FILE)
+embedding_cache = make_cache("query_embeddings", QUERY_CACHE_SIZE, EMBEDDING_CACHE_TTL, QUERY_CACHE_BACKEND, CACHE_PATH)
+answer_cache = make_cache("answers", QUERY_CACHE_SIZE, ANSWER_CACHE_TTL, QUERY_CACHE_BACKEND, CACHE_PATH)
 
-if os.path.exists(VECTOR_DB_FILE) and os.path.exists(INDEX_FILE):
-    try:
-        index = faiss.read_index(VECTOR_DB_FILE)
-        with open(INDEX_FILE, "rb") as f:
-            documents = pickle.load(f)
-        print(f"Database loaded successfully. {len(documents)} documents indexed.")
-    except Exception as e:
-        print(f"Error loading database: {e}")
-else:
-    print("WARNING: No database found. Run 'process_data.py' first.")
+# FAISS releases the GIL while searching, so async requests run their
+# searches on this pool and the event loop stays free for other users.
+search_pool = ThreadPoolExecutor(max_workers=SEARCH_THREADS, thread_name_prefix="faiss-search")
+
+class Database:
+    """
+    One loaded snapshot: a FAISS index, chunk store and BM25 index that
+    belong together. Requests take the current Database once and use it
+    throughout, so a reload that swaps in a new one never changes the data
+    under a search that is already running.
+    """
+
+    MAX_CACHED_FILTERS = 256
+
+    def __init__(self, version, index, documents, lexical_index, partitions=None):
+        self.version = version  # Part of the answer cache key
+        self.index = index
+        self.documents = documents  # ChunkStore, or a {chunk ID: text} dict for legacy databases
+        self.lexical_index = lexical_index  # BM25Index, if process_data built one
+        self.partitions = partitions or {}  # "campus/type" -> FAISS sub-index (see metadata.py)
+        self._allowed = {}  # (filters, day) -> sorted chunk IDs the filters allow
+
+    def allowed_ids(self, filters):
+        """
+        Sorted IDs of the chunks the filters allow, or None when everything is
+        allowed (no filters, or a database without metadata to filter on).
+        """
+        if not filters or not isinstance(self.documents, ChunkStore):
+            return None
+        key = (filter_key(filters), today_number())
+        # Searches run on several threads and another one may clear the dict
+        # at any point, so only the local reference is trusted
+        allowed = self._allowed.get(key)
+        if allowed is None:
+            allowed = self.documents.ids_matching(filters)
+            if len(self._allowed) >= self.MAX_CACHED_FILTERS:
+                self._allowed.clear()
+            self._allowed[key] = allowed
+        return allowed
+
+    def partitions_for(self, filters):
+        """
+        Keys of the sub-indexes that can hold allowed chunks, or None when the
+        main index is just as good (no filters, or every partition matches).
+        """
+        if not filters or not self.partitions:
+            return None
+        keys = tuple(key for key in sorted(self.partitions) if partition_matches(key, filters))
+        return None if len(keys) == len(self.partitions) else keys
+
+def load_documents(paths):
+    """
+    Opens the memory-mapped chunk store. Falls back to the old index.pkl,
+    which holds a plain list of texts (chunk ID = position).
+    """
+    if all(os.path.exists(path) for path in store_paths(paths["chunks"]).values()):
+        return ChunkStore(paths["chunks"])
+    if paths.get("pickle") and os.path.exists(paths["pickle"]):
+        with open(paths["pickle"], "rb") as f:
+            texts = pickle.load(f)
+        return dict(enumerate(texts)) if isinstance(texts, list) else texts
+    return None
+
+def legacy_version(paths):
+    """Fingerprint of a pre-snapshot database: changes when its files are rewritten."""
+    stamps = []
+    files = [paths["vectors"], paths["pickle"]] + list(store_paths(paths["chunks"]).values()) + list(index_paths(paths["lexical"]).values())
+    for path in files:
+        if os.path.exists(path):
+            stat = os.stat(path)
+            stamps.append((os.path.basename(path), stat.st_mtime_ns, stat.st_size))
+    return make_key(stamps)[:16]
+
+def load_database():
+    """
+    Loads the current snapshot (or a legacy database) into a new Database.
+    Returns None if there is no database; raises if the files don't match.
+    """
+    version, paths = snapshots.current_paths(RAG_DIR)
+    if not os.path.exists(paths["vectors"]):
+        print("WARNING: No database found. Run 'process_data.py' first.")
+        return None
+
+    index = faiss.read_index(paths["vectors"])
+    index_factory.set_search_params(index, nprobe=IVF_NPROBE, ef_search=HNSW_EF_SEARCH)
+    documents = load_documents(paths)
+    if documents is None:
+        print("WARNING: No chunk store found. Run 'process_data.py' first.")
+        return None
+
+    # snapshot.json says what process_data wrote; a mismatch means a damaged snapshot
+    info = snapshots.read_info(paths)
+    if info and (info["vectors"] != index.ntotal or info["chunks"] != len(documents)):
+        raise ValueError(
+            f"Snapshot {version} is inconsistent: {index.ntotal} vectors and {len(documents)} chunks, "
+            f"expected {info['vectors']} and {info['chunks']}"
+        )
+
+    lexical_index = None
+    if all(os.path.exists(path) for path in index_paths(paths["lexical"]).values()):
+        lexical_index = BM25Index(paths["lexical"])
+    else:
+        print("WARNING: No BM25 index found. Using vector search only.")
+
+    partitions = {}
+    for key, count in info.get("partitions", {}).items():
+        partition = faiss.read_index(snapshots.partition_file(paths, key))
+        if partition.ntotal != count:
+            raise ValueError(f"Snapshot {version} is inconsistent: partition {key} has {partition.ntotal} vectors, expected {count}")
+        index_factory.set_search_params(partition, nprobe=IVF_NPROBE, ef_search=HNSW_EF_SEARCH)
+        partitions[key] = partition
+    if EMBEDDING_DIM and EMBEDDING_DIM != index.d:
+        print(f"WARNING: Snapshot {version} has {index.d}-dim vectors but EMBEDDING_DIM is {EMBEDDING_DIM}. "
+              "Using BM25 only until process_data.py rebuilds it.")
+    return Database(version or legacy_version(paths), index, documents, lexical_index, partitions)
+
+# --- Load Database (Global Variable) ---
+# Loaded on first use (the server starts that in the background, see main.py),
+# and replaced whenever a new snapshot is published.
+db = None
+_reload_lock = threading.Lock()
+_loaded = threading.Event()  # Set once the first load has been attempted
+
+def reload_database():
+    """
+    Loads the published snapshot in the calling thread and, if it is new,
+    swaps it in with one assignment. The old Database stays alive (and its
+    files mapped) until the last search using it finishes.
+    Returns a small status dict.
+    """
+    global db
+    with _reload_lock:
+        try:
+            version = snapshots.current_version(RAG_DIR)
+            if db is not None and version is not None and version == db.version:
+                return {"reloaded": False, "version": db.version}
+            try:
+                new_db = load_database()
+            except Exception as e:
+                print(f"Error loading database: {e}")
+                return {"reloaded": False, "version": db.version if db else None, "error": str(e)}
+            if new_db is None:
+                return {"reloaded": False, "version": db.version if db else None, "error": "No database found"}
+
+            db = new_db
+            print(f"Database loaded successfully. Snapshot {db.version}, {len(db.documents)} documents indexed.")
+            return {"reloaded": True, "version": db.version, "chunks": len(db.documents)}
+        finally:
+            _loaded.set()
+
+def ensure_database():
+    """The loaded Database (or None if there is none), loading it on first use."""
+    if not _loaded.is_set():
+        print("Loading RAG Database...")
+        reload_database()
+    return db
+
+async def ensure_database_async():
+    """Async version of ensure_database: a first load runs off the event loop."""
+    if not _loaded.is_set():
+        await asyncio.to_thread(ensure_database)
+    return db
+
+def database_loaded():
+    """True once the first load has finished (even if it found no database)."""
+    return _loaded.is_set()
+
+async def watch_database(interval):
+    """
+    Background task: checks the rag/CURRENT pointer every `interval` seconds
+    and loads a newly published snapshot off the event loop.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            version = snapshots.current_version(RAG_DIR)
+            if version is not None and (db is None or version != db.version):
+                await asyncio.to_thread(reload_database)
+        except Exception as e:
+            # e.g. a half-deleted snapshot folder; the next poll tries again
+            print(f"⚠️ Database watcher error: {e!r}")
+            metrics.count("errors_total", stage="reload")
+
+metrics.register_gauge("index_vectors", "Vectors in the loaded FAISS index.", lambda: db.index.ntotal if db else None)
+metrics.register_gauge("index_chunks", "Chunks in the loaded chunk store.", lambda: len(db.documents) if db else None)
+metrics.register_gauge("index_partitions", "Campus/type sub-indexes in the loaded snapshot.", lambda: len(db.partitions) if db else None)
+metrics.register_gauge("live_cache_pages", "Link mode pages in the page cache.", lambda: page_cache.stats()["pages"])
+
+def get_chunk(chunk_id, database):
+    """Returns the text of one chunk, or None."""
+    if isinstance(database.documents, ChunkStore):
+        chunk = database.documents.get(chunk_id)
+        return chunk["text"] if chunk else None
+    return database.documents.get(chunk_id)
 
-def retrieve_context(query, k=5):
+def embedding_cache_key(query):
+    """Embeddings of another EMBEDDING_DIM must never be served, so a non-default one is part of the key."""
+    key = normalize_query(query)
+    return f"{key}|{EMBEDDING_DIM}" if EMBEDDING_DIM else key
+
+def cached_query_embedding(query):
+    """embed_query with a cache in front; failures are not cached."""
+    key = embedding_cache_key(query)
+    query_emb = embedding_cache.get(key)
+    if query_emb is None:
+        query_emb = embed_query(query)
+        if query_emb:
+            embedding_cache.set(key, query_emb)
+    return query_emb
+
+async def cached_query_embedding_async(query):
     """
-    Searches the FAISS database for the 5 most relevant text chunks.
+    Async version of cached_query_embedding. Cache misses go through
+    embed_batcher, so questions arriving together share one API call.
     """
-    if index is None or not documents:
-        return ""
+    key = embedding_cache_key(query)
+    query_emb = await embedding_cache.get_async(key)
+    if query_emb is None:
+        query_emb = await embed_batcher.submit(query)
+        if query_emb:
+            await embedding_cache.set_async(key, query_emb)
+    return query_emb
+
+def needs_embedding(database):
+    """Lexical-only retrieval doesn't need the embedding call at all."""
+    return RETRIEVAL_MODE != "lexical" or database.lexical_index is None
+
+def search_chunks(query, k=5, database=None, filters=None):
+    """
+    Searches the database for the k most relevant chunks.
+    filters: optional campus / source type / age limits (see metadata.make_filters).
+    Returns a list of (chunk_id, text).
+    """
+    database = database or ensure_database()
+    if database is None or not database.documents:
+        return []
+
+    # 1. Convert user question to vector (an empty list if the call failed)
+    query_emb = cached_query_embedding(query) if needs_embedding(database) else []
+    return rank_chunks(query, query_emb, k, database=database, filters=filters)
+
+async def search_chunks_async(query, k=5, database=None, filters=None):
+    """
+    Async version of search_chunks: the embedding call is awaited and the
+    searches run on the search thread pool.
+    """
+    database = database or await ensure_database_async()
+    if database is None or not database.documents:
+        return []
+
+    query_emb = await cached_query_embedding_async(query) if needs_embedding(database) else []
 
-    # 1. Convert user question to vector
-    query_emb = embed_query(query)
-    if not query_emb:
-        return ""
+    # The FAISS search joins a multi-row search with other requests
+    use_vector, _, depth = retrieval_plan(query_emb, k, None, database, filters)
+    vector_ranking = None
+    if use_vector and vector_batcher.max_batch > 1:
+        vector_ranking = await vector_batcher.submit((query_emb, depth, database, database.partitions_for(filters)))
 
+    # run_in_executor doesn't carry context variables over, so pass them along
+    # explicitly (the per-request spans in metrics.request_timings)
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        search_pool, context.run, rank_chunks, query, query_emb, k, None, database, vector_ranking, filters,
+    )
+
+def search_by_vectors(query_embs, k, database, partitions=None):
+    """
+    One FAISS search for several query embeddings (one row each, so FAISS
+    uses its batched BLAS path). Returns a list of chunk IDs per query, best first.
+    partitions: keys of the sub-indexes to search instead of the main index
+    (see Database.partitions_for); their results are merged by similarity.
+    """
+    indexes = [database.index] if partitions is None else [database.partitions[key] for key in partitions]
+    if not indexes:
+        return [[] for _ in query_embs]
     # 2. Search FAISS
-    # We need a list of vectors, so we wrap it in a list
-    search_vector = np.array([query_emb]).astype("float32")
-    
-    # distances, indices = index.search(vector, k)
-    distances, indices = index.search(search_vector, k)
+    search_vectors = np.array(query_embs).astype("float32")
+    if indexes[0].metric_type == faiss.METRIC_INNER_PRODUCT:
+        # Cosine similarity: the stored vectors are normalized, so the queries must be too
+        search_vectors = index_factory.normalize(search_vectors)
 
-    # 3. Fetch the actual text
-    retrieved_chunks = []
-    for i in indices[0]:
-        if i < len(documents) and i >= 0:
-            retrieved_chunks.append(documents[i])
+    # distances, indices = index.search(vectors, k)
+    with metrics.timed("vector_search"):
+        results = [index.search(search_vectors, k) for index in indexes]
+    if len(results) == 1:
+        distances, indices = results[0]
+    else:
+        # Every sub-index uses inner product, so the similarities are comparable
+        distances = np.hstack([d for d, _ in results])
+        indices = np.hstack([i for _, i in results])
+        order = np.argsort(-np.where(indices >= 0, distances, -np.inf), axis=1, kind="stable")[:, :k]
+        indices = np.take_along_axis(indices, order, axis=1)
+    return [[int(i) for i in row if i >= 0] for row in indices]
 
-    return "\n\n".join(retrieved_chunks)
+def search_by_vector(query_emb, k, database, partitions=None):
+    """
+    FAISS search for one query embedding. Returns chunk IDs, best first.
+    """
+    return search_by_vectors([query_emb], k, database, partitions)[0]
+
+# --- Micro-batching (async path) ---
+async def _embed_query_batch(queries):
+    unique = list(dict.fromkeys(queries))  # The same question twice costs one embedding
+    vectors = dict(zip(unique, await embed_queries_async(unique)))
+    return [vectors[query] for query in queries]
 
-def rag_chat(query):
+async def _vector_search_batch(requests):
     """
-    The main function for 'University Mode'.
-    1. Retrieves data.
-    2. Sends to Gemini with M.O.U.N.I persona instructions.
+    requests: (query_emb, depth, database, partitions) tuples. Requests on
+    the same Database and partitions share one multi-row search at the
+    deepest depth asked for.
+    """
+    groups = {}
+    for position, (_, _, database, partitions) in enumerate(requests):
+        groups.setdefault((id(database), partitions), []).append(position)
+
+    loop = asyncio.get_running_loop()
+    results = [None] * len(requests)
+    for positions in groups.values():
+        _, _, database, partitions = requests[positions[0]]
+        depth = max(requests[position][1] for position in positions)
+        rankings = await loop.run_in_executor(
+            search_pool, search_by_vectors, [requests[position][0] for position in positions], depth, database, partitions,
+        )
+        for position, ranking in zip(positions, rankings):
+            results[position] = ranking[:requests[position][1]]
+    return results
+
+embed_batcher = MicroBatcher("embed_query", _embed_query_batch, min(QUERY_BATCH_SIZE, EMBED_BATCH_LIMIT), QUERY_BATCH_WAIT_MS / 1000)
+vector_batcher = MicroBatcher("vector_search", _vector_search_batch, QUERY_BATCH_SIZE, QUERY_BATCH_WAIT_MS / 1000)
+
+def reciprocal_rank_fusion(rankings, k=5, boosts=None):
+    """
+    Merges ranked lists of chunk IDs. Each list adds 1 / (RRF_K + rank) to a
+    chunk's score, so chunks found by both retrievers rise to the top and
+    the very different BM25 and cosine score scales never need calibrating.
+    boosts: optional {chunk_id: extra score}, e.g. for recent documents.
     """
-    # 1. Get relevant info from our DB
-    context = retrieve_context(query)
-    
+    scores = dict(boosts or {})
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (RRF_K + rank)
+    return sorted(scores, key=scores.get, reverse=True)[:k]
+
+def retrieval_plan(query_emb, k, mode, database, filters=None):
+    """Which retrievers rank_chunks uses, and how deep: (use_vector, use_lexical, depth)."""
+    mode = mode or RETRIEVAL_MODE
+    # A query embedding of another dimension than the index (EMBEDDING_DIM changed) can't be searched
+    use_vector = bool(query_emb) and len(query_emb) == database.index.d and mode != "lexical"
+    use_lexical = database.lexical_index is not None and (mode != "vector" or not use_vector)
+    # Each retriever brings more candidates than we keep, so fusion has something to re-rank
+    depth = max(k, HYBRID_CANDIDATES) if use_vector and use_lexical else k
+    if filters and "max_age_days" in filters:
+        depth *= AGE_FILTER_OVERSAMPLE
+    return use_vector, use_lexical, depth
+
+def recency_boosts(chunk_ids, database):
+    """
+    Extra fusion score for recent documents: up to RECENCY_WEIGHT of a
+    first-place vote, halving every RECENCY_HALF_LIFE_DAYS. Chunks without a
+    known date get none. Returns None when there is nothing to boost.
+    """
+    documents = database.documents
+    if RECENCY_WEIGHT <= 0 or not chunk_ids or not isinstance(documents, ChunkStore) or not documents.has_metadata:
+        return None
+    ages = documents.age_days(chunk_ids)
+    boosts = RECENCY_WEIGHT / (RRF_K + 1) * np.power(0.5, np.maximum(ages, 0) / RECENCY_HALF_LIFE_DAYS)
+    return {chunk_id: float(boost) for chunk_id, boost in zip(chunk_ids, boosts) if not np.isnan(boost)}
+
+def rank_chunks(query, query_emb, k=5, mode=None, database=None, vector_ranking=None, filters=None):
+    """
+    Retrieval according to RETRIEVAL_MODE (or mode):
+    "vector" = FAISS only, "lexical" = BM25 only, "hybrid" = both, fused with RRF.
+    Without a query embedding (the embedding call failed or timed out) we
+    fall back to BM25, so University mode keeps working without the API.
+    vector_ranking: FAISS results already fetched (by vector_batcher).
+    filters: only chunks from matching campuses / source types / ages are
+    returned; FAISS only searches the partitions that can hold them.
+    Recent documents get a small boost in the fusion (see recency_boosts).
+    Returns a list of (chunk_id, text).
+    """
+    database = database or ensure_database()
+    if database is None:
+        return []
+    lexical_index = database.lexical_index
+    use_vector, use_lexical, depth = retrieval_plan(query_emb, k, mode, database, filters)
+    if not use_vector and (mode or RETRIEVAL_MODE) != "lexical":
+        metrics.count("fallbacks_total", kind="lexical_only")
+    allowed = database.allowed_ids(filters)
+
+    rankings = []
+    if use_vector:
+        if vector_ranking is None:
+            vector_ranking = search_by_vector(query_emb, depth, database, database.partitions_for(filters))
+        if allowed is not None:
+            vector_ranking = [chunk_id for chunk_id, keep in zip(vector_ranking, np.isin(vector_ranking, allowed)) if keep]
+        rankings.append(vector_ranking)
+    if use_lexical:
+        with metrics.timed("lexical_search"):
+            rankings.append([chunk_id for chunk_id, _ in lexical_index.search(query, depth, allowed)])
+
+    boosts = recency_boosts(list(set().union(*rankings)), database)
+    if len(rankings) > 1 or boosts:
+        chunk_ids = reciprocal_rank_fusion(rankings, k, boosts)
+    else:
+        chunk_ids = (rankings or [[]])[0][:k]
+
+    # 3. Fetch the actual text (only these k chunks are read from disk)
+    hits = []
+    for chunk_id in chunk_ids:
+        text = get_chunk(chunk_id, database)
+        if text:
+            hits.append((chunk_id, text))
+    return hits
+
+def retrieve_context(query, k=5, filters=None):
+    """
+    Searches the database for the 5 most relevant text chunks,
+    optionally only from some campuses / source types (see search_chunks).
+    """
+    return "\n\n".join(text for _, text in search_chunks(query, k, filters=filters))
+
+def cache_stats():
+    """Hit/miss counters for both cache levels (shown on /api/cache/stats)."""
+    return {
+        "index_version": db.version if db else None,
+        "query_embeddings": embedding_cache.stats(),
+        "answers": answer_cache.stats(),
+        "live_pages": page_cache.stats(),
+    }
+
+def prepare_rag(query, filters=None):
+    """
+    Retrieval half of University mode.
+    Returns (prompt, answer_key, cached_answer); cached_answer is None on a miss.
+    """
+    # 1. Get relevant info from our DB (one snapshot for the whole request)
+    database = ensure_database()
+    hits = search_chunks(query, database=database, filters=filters)
+    # Same question over the same chunks of the same database? Reuse the answer.
+    answer_key = rag_answer_key(query, hits, database)
+    cached_answer = answer_cache.get(answer_key)
+    if cached_answer is not None:
+        return None, answer_key, cached_answer
+    return build_rag_prompt(query, hits), answer_key, None
+
+async def prepare_rag_async(query, filters=None):
+    database = await ensure_database_async()
+    hits = await search_chunks_async(query, database=database, filters=filters)
+    answer_key = rag_answer_key(query, hits, database)
+    cached_answer = await answer_cache.get_async(answer_key)
+    if cached_answer is not None:
+        return None, answer_key, cached_answer
+    return build_rag_prompt(query, hits), answer_key, None
+
+# The M.O.U.N.I. persona prompt: instructs the AI on its identity and how to behave.
+# Kept flush-left so indentation doesn't cost input tokens on every request.
+RAG_PROMPT = """SYSTEM INSTRUCTIONS:
+You are M.O.U.N.I. (Multifunctional Operational Unified Network Interface), the official AI assistant for Vignan University.
+
+GUIDELINES:
+1. If the user greets you (e.g., "hi", "hello", "hey"), START your response by strictly introducing yourself:
+   "Hello! I am M.O.U.N.I (Multifunctional Operational Unified Network Interface), your Vignan University Assistant. How can I help you today?"
+2. For all other questions, answer STRICTLY based on the "CONTEXT DATA" provided below.
+3. If the answer is not in the context, politely say you don't have that information in the university documents.
+4. Do NOT make up facts.
+5. Be professional, helpful, and concise.
+
+CONTEXT DATA:
+{context}
+
+USER QUESTION:
+{query}"""
+
+def rag_answer_key(query, hits, database):
+    """Answer cache key: the question, the retrieved chunk IDs and the database version."""
+    return make_key(normalize_query(query), [chunk_id for chunk_id, _ in hits], database.version if database else None)
+
+def build_rag_prompt(query, hits):
+    """Turns retrieved (chunk_id, text) hits, best first, into the persona prompt."""
+    # Drop repeated spans and fit the chunks to the context budget
+    with metrics.timed("context_pack"):
+        context, used = pack_chunks([text for _, text in hits])
+    if used < len(hits):
+        print(f"Context: used {used} of {len(hits)} retrieved chunks within the token budget.")
+
     # Default context if nothing found or database is empty
     if not context:
         context = "No specific university document found for this query."
 
-    # 2. Create the M.O.U.N.I. Persona Prompt
-    # This instructs the AI on its identity and how to behave.
-    prompt = f"""
-    SYSTEM INSTRUCTIONS:
-    You are M.O.U.N.I. (Multifunctional Operational Unified Network Interface), the official AI assistant for Vignan University.
-    
-    GUIDELINES:
-    1. If the user greets you (e.g., "hi", "hello", "hey"), START your response by strictly introducing yourself: 
-       "Hello! I am M.O.U.N.I (Multifunctional Operational Unified Network Interface), your Vignan University Assistant. How can I help you today?"
-    2. For all other questions, answer STRICTLY based on the "CONTEXT DATA" provided below.
-    3. If the answer is not in the context, politely say you don't have that information in the university documents.
-    4. Do NOT make up facts.
-    5. Be professional, helpful, and concise.
-
-    CONTEXT DATA:
-    {context}
-    
-    USER QUESTION:
-    {query}
+    return RAG_PROMPT.format(context=context, query=query)
+
+def rag_chat(query, filters=None):
     """
+    The main function for 'University Mode'.
+    1. Retrieves data.
+    2. Sends to Gemini with M.O.U.N.I persona instructions.
+    """
+    prompt, answer_key, cached_answer = prepare_rag(query, filters)
+    if cached_answer is not None:
+        return cached_answer
 
     # 3. Get answer from Gemini
-    return ask_gemini(prompt)
\ No newline at end of file
+    answer = ask_gemini(prompt)
+    if not is_error_reply(answer):
+        answer_cache.set(answer_key, answer)
+    return answer
+
+def rag_chat_stream(query, filters=None):
+    """
+    Streaming version of rag_chat: yields the answer piece by piece.
+    A cached answer is yielded in one go.
+    """
+    prompt, answer_key, cached_answer = prepare_rag(query, filters)
+    if cached_answer is not None:
+        yield cached_answer
+        return
+
+    pieces = []
+    for text in ask_gemini_stream(prompt):
+        pieces.append(text)
+        yield text
+
+    answer = "".join(pieces)
+    if not is_error_reply(answer):
+        answer_cache.set(answer_key, answer)
+
+async def rag_chat_async(query, filters=None):
+    """
+    Async version of rag_chat.
+    """
+    prompt, answer_key, cached_answer = await prepare_rag_async(query, filters)
+    if cached_answer is not None:
+        return cached_answer
+
+    answer = await ask_gemini_async(prompt)
+    if not is_error_reply(answer):
+        await answer_cache.set_async(answer_key, answer)
+    return answer
+
+async def rag_chat_stream_async(query, filters=None):
+    """
+    Async version of rag_chat_stream.
+    """
+    prompt, answer_key, cached_answer = await prepare_rag_async(query, filters)
+    if cached_answer is not None:
+        yield cached_answer
+        return
+
+    pieces = []
+    async for text in ask_gemini_stream_async(prompt):
+        pieces.append(text)
+        yield text
+
+    answer = "".join(pieces)
+    if not is_error_reply(answer):
+        await answer_cache.set_async(answer_key, answer)
+
+# --- Link Mode ---
+async def embed_passages_async(passages):
+    """Normalized embeddings of a page's passages, or None if a batch failed."""
+    batches = [passages[i:i + EMBED_BATCH_LIMIT] for i in range(0, len(passages), EMBED_BATCH_LIMIT)]
+    try:
+        results = await asyncio.gather(*(embed_texts_async(batch) for batch in batches))
+    except Exception as e:
+        print(f"❌ Link embedding error: {e}")
+        return None
+    return index_factory.normalize([vector for batch in results for vector in batch])
+
+async def prepare_page_async(page):
+    """
+    Splits a cached page into passages and embeds them, once: concurrent
+    requests for the same page wait for the first one. A failed embedding
+    is not retried for LINK_EMBED_RETRY_SECONDS, so follow-up questions
+    during an outage don't each pay for another attempt.
+    """
+    async with page.lock:
+        if page.passages is None:
+            page.passages = await asyncio.to_thread(split_passages, page.text)
+        if RETRIEVAL_MODE == "lexical" or page.vectors is not None:
+            return
+        if page.embed_failed_at is not None and time.time() - page.embed_failed_at < LINK_EMBED_RETRY_SECONDS:
+            return
+        page.vectors = await embed_passages_async(page.passages)
+        page.embed_failed_at = None if page.vectors is not None else time.time()
+        page_cache.trim()
+
+async def link_context_async(url, question):
+    """
+    Link mode as a mini RAG over one page. Returns the text to answer from,
+    or None if the page can't be read.
+
+    A page that fits LINK_CONTEXT_TOKENS is used whole. Longer pages are cut
+    into passages, ranked by BM25 and by cosine similarity to the question
+    (fused with RRF), and the best ones are packed into the budget, so text
+    far down a long page can still be found. Passages and their embeddings
+    are cached with the page, so follow-up questions cost one query embedding.
+    """
+    page = await fetch_live_page_async(url)
+    if page is None:
+        return None
+    if estimate_tokens(page.text) <= LINK_CONTEXT_TOKENS:
+        return page.text
+
+    await prepare_page_async(page)
+    passages = page.passages
+
+    loop = asyncio.get_running_loop()
+    scores = await loop.run_in_executor(search_pool, bm25_scores, question, passages)
+    rankings = [[i for i in sorted(range(len(passages)), key=lambda i: -scores[i]) if scores[i] > 0]]
+    if RETRIEVAL_MODE != "lexical":
+        query_emb = await cached_query_embedding_async(question)
+        # Without embeddings (API down) we still have the BM25 ranking
+        if page.vectors is not None and query_emb:
+            similarity = page.vectors @ index_factory.normalize([query_emb])[0]
+            rankings.append([int(i) for i in np.argsort(-similarity)])
+
+    # The opening passage (title, intro) first, then by relevance, then page order
+    ranked = reciprocal_rank_fusion(rankings, len(passages))
+    ranked = [0] + [i for i in ranked if i != 0]
+    ranked += sorted(set(range(len(passages))) - set(ranked))
+    return fit_passages(passages, ranked, LINK_CONTEXT_TOKENS)
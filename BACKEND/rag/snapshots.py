@@ -0,0 +1,109 @@
+# backend/rag/snapshots.py
+#
+# Versioned database snapshots. process_data.py writes every build into a
+# fresh folder rag/snapshots/<version>/ and only then points rag/CURRENT at
+# it (temp file + rename). Readers follow the pointer, so they always see a
+# complete FAISS index / chunk store / BM25 index set, never a half-written one.
+
+import json
+import os
+import shutil
+import time
+import uuid
+
+# --- Settings ---
+SNAPSHOT_DIR = "snapshots"   # Inside the rag folder
+CURRENT_FILE = "CURRENT"     # Pointer file, holds the published version
+KEEP_SNAPSHOTS = 3           # Older snapshots are deleted after a publish
+
+def snapshot_paths(directory):
+    """Files (and file prefixes) that make up one snapshot."""
+    return {
+        "vectors": os.path.join(directory, "vector_store.faiss"),
+        "chunks": os.path.join(directory, "chunks"),     # Prefix, see chunk_store.py
+        "lexical": os.path.join(directory, "lexical"),   # Prefix, see bm25_index.py
+        "manifest": os.path.join(directory, "manifest.json"),  # process_data's incremental manifest
+        "partitions": os.path.join(directory, "partitions"),   # One FAISS sub-index per campus/type (see metadata.py)
+        "info": os.path.join(directory, "snapshot.json"),
+    }
+
+def legacy_paths(rag_dir):
+    """Where databases built before snapshots existed keep their files."""
+    return {
+        "vectors": os.path.join(rag_dir, "vector_store.faiss"),
+        "chunks": os.path.join(rag_dir, "chunks"),
+        "lexical": os.path.join(rag_dir, "lexical"),
+        "manifest": os.path.join(rag_dir, "manifest.json"),
+        "pickle": os.path.join(rag_dir, "index.pkl"),
+        "partitions": None,
+        "info": None,
+    }
+
+def current_version(rag_dir):
+    """The published snapshot version, or None."""
+    try:
+        with open(os.path.join(rag_dir, CURRENT_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def current_paths(rag_dir):
+    """
+    (version, paths) of the published snapshot, or (None, legacy paths)
+    when nothing has been published yet.
+    """
+    version = current_version(rag_dir)
+    if version is None:
+        return None, legacy_paths(rag_dir)
+    return version, snapshot_paths(os.path.join(rag_dir, SNAPSHOT_DIR, version))
+
+def new_snapshot(rag_dir):
+    """Creates an empty, unpublished snapshot folder. Returns (version, paths)."""
+    version = time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:6]
+    directory = os.path.join(rag_dir, SNAPSHOT_DIR, version)
+    os.makedirs(directory)
+    return version, snapshot_paths(directory)
+
+def partition_file(paths, key):
+    """Sub-index file of one partition, e.g. "hyderabad/notice" -> partitions/hyderabad__notice.faiss."""
+    return os.path.join(paths["partitions"], key.replace("/", "__") + ".faiss")
+
+def read_info(paths):
+    """The snapshot.json written by publish_snapshot, or {} for legacy databases."""
+    if not paths.get("info") or not os.path.exists(paths["info"]):
+        return {}
+    with open(paths["info"], "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def publish_snapshot(rag_dir, version, paths, info):
+    """
+    Makes a fully written snapshot the current one. snapshot.json records
+    what the files must contain (vector and chunk counts), so a reader can
+    check that the FAISS index and chunk store belong together.
+    """
+    info = dict(info, version=version, created=time.strftime("%Y-%m-%d %H:%M:%S"))
+    with open(paths["info"], "w", encoding="utf-8") as f:
+        json.dump(info, f, indent=2)
+
+    pointer = os.path.join(rag_dir, CURRENT_FILE)
+    with open(pointer + ".tmp", "w", encoding="utf-8") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer + ".tmp", pointer)
+    prune_snapshots(rag_dir, keep=KEEP_SNAPSHOTS)
+
+def prune_snapshots(rag_dir, keep=KEEP_SNAPSHOTS):
+    """
+    Deletes all but the newest `keep` snapshots (the current one is always kept).
+    Servers still searching an old snapshot are fine on Linux: mapped files
+    stay readable until they are unmapped.
+    """
+    root = os.path.join(rag_dir, SNAPSHOT_DIR)
+    if not os.path.isdir(root):
+        return
+    current = current_version(rag_dir)
+    versions = sorted(os.listdir(root), reverse=True)  # Versions start with a timestamp
+    for version in versions[keep:]:
+        if version != current:
+            shutil.rmtree(os.path.join(root, version), ignore_errors=True)
@@ -1,6 +1,5 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
-import axios from 'axios';
 import { BsGlobe, BsSendFill, BsPersonCircle, BsRobot } from 'react-icons/bs';
 import { BiLogOut, BiTrash } from 'react-icons/bi';
 import ReactMarkdown from 'react-markdown';
@@ -75,15 +74,42 @@ export default function Chat() {
       // Determine Mode
       const mode = isWebSearch ? "general" : "university";
 
-      // Call Python Backend
+      // Call Python Backend (streaming endpoint, Server-Sent Events)
       // Ensure your backend is running at http://127.0.0.1:8000
-      const res = await axios.post('https://m-o-u-n-i.onrender.com/api/chat', {
-        message: userMsgText,
-        mode: mode
+      const res = await fetch('https://m-o-u-n-i.onrender.com/api/chat/stream', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ message: userMsgText, mode: mode })
       });
+      if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`);
 
-      // Add Bot Response
-      const botMsg = { text: res.data.response, sender: 'bot', timestamp: new Date().toISOString() };
+      // Add Bot Response, growing it as tokens arrive
+      const botMsg = { text: '', sender: 'bot', timestamp: new Date().toISOString() };
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // Events are separated by a blank line; the last piece may be incomplete
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        for (const event of events) {
+          if (!event.startsWith('data: ')) continue;
+          const data = JSON.parse(event.slice(6));
+          if (data.error) throw new Error(data.error);
+          if (data.token) {
+            botMsg.text += data.token;
+            setLoading(false); // First token arrived: hide the spinner
+            setMessages([...updatedMessages, { ...botMsg }]);
+          }
+        }
+      }
+
+      // Save the finished answer
       saveMessages([...updatedMessages, botMsg]);
 
     } catch (error) {